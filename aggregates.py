@@ -0,0 +1,133 @@
+"""Cubo de conteos de vuelos y vistas agregadas de los dashboards."""
+import calendar
+
+import numpy as np
+import pandas as pd
+
+from expansion import add_calendar_columns
+
+# Dimensiones del cubo: todas las que usan los filtros y los dashboards
+CUBE_DIMENSIONS = ['date', 'station', 'carrier', 'flight_type', 'aircraft_type', 'type', 'source_file', 'hour']
+# Tamaños de franja (minutos) de la distribución horaria
+TIME_BUCKETS = [15, 30, 60]
+
+
+def flight_hours(df):
+    """Hora (0-23) de llegada o salida de cada vuelo según su tipo; -1 si no está disponible."""
+    minutes = df['arrival_time'].where(df['type'] == 'A', df['departure_time'])
+    hours = (minutes // 60).where((minutes >= 0) & (minutes < 24 * 60))
+    return hours.fillna(-1).astype('int8')
+
+
+def build_cube(df):
+    """Cuenta los vuelos por todas las dimensiones del cubo, con columnas de año, mes y semana."""
+    cube = (
+        df.assign(hour=flight_hours(df))
+        .groupby(CUBE_DIMENSIONS, observed=True, dropna=False)
+        .size()
+        .reset_index(name='count')
+    )
+    return add_calendar_columns(cube)
+
+
+def day_label(date):
+    """Etiqueta 'Lunes AAAA-MM-DD' usada en los ejes y selectores de días."""
+    return f"{calendar.day_name[date.weekday()]} {date.strftime('%Y-%m-%d')}"
+
+
+def _counts_by(cube, columns):
+    return cube.groupby(columns, observed=True, dropna=False)['count'].sum().to_dict()
+
+
+def weekly_table(cube, flight_types, aircraft_types):
+    """Tabla del dashboard semanal: vuelos por tipo de vuelo / tipo de avión y día ('-' si no hay)."""
+    days = sorted(cube['date'].unique())
+    data = []
+    for column, labels in (('flight_type', flight_types), ('aircraft_type', aircraft_types)):
+        counts = _counts_by(cube, [column, 'date'])
+        for label in labels:
+            row = {'Tipo': label}
+            for day in days:
+                count = counts.get((label, day), 0)
+                row[day.strftime('%m-%d')] = count if count > 0 else '-'
+            data.append(row)
+    return pd.DataFrame(data)
+
+
+def daily_table(cube, flight_types, aircraft_types):
+    """Tabla del dashboard diario: vuelos por tipo de vuelo / tipo de avión ('-' si no hay)."""
+    data = []
+    for column, labels in (('flight_type', flight_types), ('aircraft_type', aircraft_types)):
+        counts = _counts_by(cube, [column])
+        for label in labels:
+            count = counts.get(label, 0)
+            data.append({'Tipo': label, 'Vuelos': count if count > 0 else '-'})
+    return pd.DataFrame(data)
+
+
+def count_by_aircraft(cube):
+    """Total de vuelos por tipo de avión, con porcentaje, ordenado de mayor a menor."""
+    counts = cube.groupby('aircraft_type', observed=True)['count'].sum()
+    counts = counts[counts > 0].reset_index()
+    counts['aircraft_type'] = counts['aircraft_type'].astype(str)
+    counts['percentage'] = (counts['count'] / counts['count'].sum() * 100).round(2)
+    return counts.sort_values('count', ascending=False)
+
+
+def count_by_day_and_aircraft(cube, days, aircraft_types):
+    """Vuelos por día y tipo de avión para todos los días indicados (0 si no hay vuelos)."""
+    counts = _counts_by(cube, ['date', 'aircraft_type'])
+    data = pd.DataFrame(
+        [(d, a, counts.get((d, a), 0)) for d in days for a in aircraft_types],
+        columns=['date', 'aircraft_type', 'count']
+    )
+    data['count'] = data['count'].astype(int)
+    data['day_label'] = data['date'].apply(day_label)
+    return data
+
+
+def count_by_time_bucket(minutes, arrivals, bucket_minutes=60, days=1):
+    """Llegadas y salidas por franja horaria en formato largo: Franja ('HH:MM'), Tipo, count, daily_mean.
+
+    minutes es el minuto del día de cada vuelo (de llegada o de salida según su tipo) y arrivals si
+    es una llegada; los minutos fuera de 0-1439 se ignoran. days es el número de días del rango.
+    """
+    n_buckets = 24 * 60 // bucket_minutes
+    valid = (minutes >= 0) & (minutes < 24 * 60)
+    buckets = minutes[valid].astype(np.int64) // bucket_minutes
+    # Una sola pasada: llegadas en las posiciones pares y salidas en las impares
+    counts = np.bincount(buckets * 2 + ~arrivals[valid], minlength=n_buckets * 2).reshape(n_buckets, 2)
+    starts = np.arange(n_buckets) * bucket_minutes
+    labels = [f"{m // 60:02d}:{m % 60:02d}" for m in starts]
+    data = pd.DataFrame({
+        'Franja': labels * 2,
+        'Tipo': ['Llegada'] * n_buckets + ['Salida'] * n_buckets,
+        'count': np.concatenate([counts[:, 0], counts[:, 1]])
+    })
+    data['daily_mean'] = (data['count'] / max(days, 1)).round(2)
+    return data
+
+
+def daily_summary(cube):
+    """Vuelos por día y tipo de vuelo / tipo de avión en formato largo, para informes."""
+    frames = []
+    for column, dimension in (('flight_type', 'Tipo Vuelo'), ('aircraft_type', 'Tipo de Avión')):
+        counts = cube.groupby(['date', column], observed=True)['count'].sum().reset_index()
+        counts = counts.rename(columns={column: 'Tipo'})
+        counts['Tipo'] = counts['Tipo'].astype(str)
+        counts.insert(1, 'dimension', dimension)
+        frames.append(counts)
+    return pd.concat(frames, ignore_index=True).sort_values(['date', 'dimension', 'Tipo'], ignore_index=True)
+
+
+def hourly_summary(cube):
+    """Llegadas y salidas por día y hora en formato largo: date, Hora, Tipo, count."""
+    timed = cube[cube['hour'] >= 0]
+    counts = timed.groupby(['date', 'hour', 'type'], observed=True)['count'].sum().reset_index()
+    counts['type'] = counts['type'].map({'A': 'Llegada', 'D': 'Salida'})
+    return counts.rename(columns={'hour': 'Hora', 'type': 'Tipo'})
+
+
+def week_starts(dates):
+    """Lunes de la semana de cada fecha."""
+    return dates - pd.to_timedelta(dates.dt.weekday, unit='D')
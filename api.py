@@ -0,0 +1,354 @@
+"""Servicio HTTP/JSON local con los vuelos y agregados de los dashboards, sin Streamlit.
+
+Uso:
+    python api.py estacion1.xlsx estacion2.xlsx --port 8000
+
+Consultas GET. Los filtros generales (station, flight_type, date, source_file, carrier,
+aircraft_type) se repiten o se separan por comas; unique=1 cuenta una sola copia de las
+operaciones repetidas entre archivos.
+    /health                                         estado, versión de los datos y archivos
+    /options                                        valores disponibles de cada filtro
+    /flights?station=MAD&q=IB123&offset=0&limit=100 vuelos filtrados, ordenados por fecha
+    /weekly?week=2025-03-31                         tabla del Dashboard Semanal
+    /daily?date=2025-04-01                          tabla del Dashboard Diario
+    /hourly?start=2025-04-01&end=2025-04-07&bucket=15  llegadas y salidas por franja
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from aggregates import TIME_BUCKETS, count_by_time_bucket, daily_table, weekly_table
+from cache import LRUCache
+from dataset import FlightDataset
+from expansion import START_DATE_2025, to_display
+from filters import FILTER_COLUMNS, apply_filters
+from ingest import content_hash, ingest_files
+
+logger = logging.getLogger("horario.api")
+
+# Respuestas JSON que se mantienen en caché
+RESPONSE_CACHE_ENTRIES = 1024
+# Segundos entre comprobaciones de cambios en los archivos de horarios
+POLL_SECONDS = 2.0
+FLIGHT_COLUMNS = [
+    'flight_number', 'type', 'day_name', 'date', 'arrival_time', 'departure_time', 'origin', 'destination',
+    'flight_type', 'station', 'aircraft_type', 'carrier', 'source_file'
+]
+MAX_LIMIT = 1000
+
+
+class QueryError(ValueError):
+    """Consulta con parámetros no válidos (respuesta 400)."""
+
+
+class ScheduleSource:
+    """Vuelos de unos archivos de horarios que se recargan al cambiar.
+
+    Sólo se vuelven a leer los archivos con otra fecha de modificación o tamaño y otro contenido;
+    cada cambio del conjunto incrementa version, que forma parte de la clave de las respuestas.
+    """
+
+    def __init__(self, paths, start_date=START_DATE_2025, end_date=None, max_workers=None):
+        self.paths = [Path(path) for path in paths]
+        self.start_date = start_date
+        self.end_date = end_date
+        self.max_workers = max_workers
+        self.dataset = FlightDataset(start_date)
+        self.version = 0
+        self.messages = []
+        self.lock = threading.RLock()  # Protege el conjunto durante las recargas y las consultas
+        self._signatures = {}
+        self.refresh()
+
+    def _signature(self, path):
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self):
+        """Recarga los archivos añadidos, modificados o eliminados. Devuelve True si los datos cambian."""
+        signatures = {path: self._signature(path) for path in self.paths}
+        changed = [p for p in self.paths if signatures[p] is not None and signatures[p] != self._signatures.get(p)]
+        if signatures == self._signatures:
+            return False
+
+        contents = {path: path.read_bytes() for path in changed}
+        keys = {path: content_hash(data) for path, data in contents.items()}
+        # Un archivo modificado con el mismo contenido no se vuelve a leer
+        reread = [path for path in changed if keys[path] != self.dataset.keys.get(path.name)]
+        files = [(path.name, contents[path]) for path in reread]
+        results = ingest_files(files, self.start_date, max_workers=self.max_workers, end_date=self.end_date)
+        with self.lock:
+            # Los archivos sin cambios conservan su clave: sync no los toca y no necesita sus vuelos
+            current = {
+                path.name: (self.dataset.keys[path.name], None) for path in self.paths
+                if signatures[path] is not None and path not in reread and path.name in self.dataset.keys
+            }
+            for result, path in zip(results, reread):
+                if result.flights is not None and not result.flights.empty:
+                    current[result.source_file] = (keys[path], result.flights)
+            self.messages = [r.message for r in results if r.message]
+            self._signatures = signatures
+            if self.dataset.sync(current):
+                self.version += 1
+                logger.info("Datos recargados (versión %d): %d vuelos", self.version, len(self.dataset))
+                return True
+        return False
+
+    def watch(self, interval=POLL_SECONDS):
+        """Comprueba los archivos cada interval segundos en un hilo de fondo."""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                except Exception:
+                    logger.exception("Error al recargar los archivos de horarios")
+        thread = threading.Thread(target=run, name="schedule-watch", daemon=True)
+        thread.start()
+        return thread
+
+
+def _values(params, name):
+    """Valores de un parámetro repetible o separado por comas, sin duplicados y ordenados."""
+    values = [v.strip() for raw in params.get(name, []) for v in raw.split(',') if v.strip()]
+    return sorted(set(values))
+
+
+def _date(params, name, default=None):
+    values = params.get(name)
+    if not values:
+        if default is None:
+            raise QueryError(f"Falta el parámetro {name} (AAAA-MM-DD).")
+        return default
+    try:
+        day = pd.Timestamp(values[0])
+    except ValueError:
+        raise QueryError(f"Fecha no válida en {name}: {values[0]}")
+    if pd.isna(day):
+        raise QueryError(f"Fecha no válida en {name}: {values[0]}")
+    return day.normalize()
+
+
+def _int(params, name, default):
+    try:
+        return int(params.get(name, [default])[0])
+    except ValueError:
+        raise QueryError(f"El parámetro {name} debe ser un número entero.")
+
+
+def _records(df):
+    """Filas de un DataFrame como lista de diccionarios, con las fechas como 'AAAA-MM-DD'."""
+    df = df.copy()
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].dt.strftime('%Y-%m-%d')
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+
+class QueryService:
+    """Respuestas JSON de las consultas sobre un ScheduleSource, en caché por consulta normalizada."""
+
+    def __init__(self, source, cache_entries=RESPONSE_CACHE_ENTRIES):
+        self.source = source
+        self.cache = LRUCache(cache_entries)
+        self.endpoints = {
+            '/health': self.health,
+            '/options': self.options,
+            '/flights': self.flights,
+            '/weekly': self.weekly,
+            '/daily': self.daily,
+            '/hourly': self.hourly
+        }
+
+    def normalize(self, params):
+        """Parámetros como tupla ordenada, igual para cualquier orden o repetición de los valores."""
+        return tuple((name, tuple(_values(params, name))) for name in sorted(params) if _values(params, name))
+
+    def handle(self, path, params):
+        """Estado HTTP y cuerpo JSON (bytes) de una consulta."""
+        path = path.rstrip('/') or '/health'
+        endpoint = self.endpoints.get(path)
+        if endpoint is None:
+            return 404, json.dumps({'error': f"Ruta desconocida: {path}"}).encode('utf-8')
+        key = (self.source.version, path, self.normalize(params))
+        body = self.cache.get(key)
+        if body is not None:
+            return 200, body
+        try:
+            with self.source.lock:
+                payload = endpoint(params)
+                payload['version'] = self.source.version
+        except QueryError as e:
+            return 400, json.dumps({'error': str(e)}).encode('utf-8')
+        except Exception:
+            # El cliente recibe siempre una respuesta; el detalle queda en el log del servidor
+            logger.exception("Error al responder %s", path)
+            return 500, json.dumps({'error': "Error interno al procesar la consulta."}).encode('utf-8')
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        if path != '/health':
+            self.cache.put(key, body)
+        return 200, body
+
+    def _filters(self, params):
+        filters = {column: _values(params, column) for column in FILTER_COLUMNS}
+        # El índice compara las fechas como texto 'AAAA-MM-DD': se validan y se normalizan aquí
+        filters['date'] = sorted({_date({'date': [value]}, 'date').strftime('%Y-%m-%d') for value in filters['date']})
+        return filters
+
+    def _mask(self, params):
+        """Máscara de filas de los filtros generales (y de operaciones únicas), o None si no filtra."""
+        dataset = self.source.dataset
+        mask = dataset.index.mask(self._filters(params))
+        if params.get('unique', ['0'])[0] == '1':
+            mask, _ = dataset.unique_operations(mask)
+        return mask
+
+    def _cube(self, params, start, end):
+        dataset = self.source.dataset
+        cube = dataset.cube
+        if params.get('unique', ['0'])[0] == '1':
+            _, cube = dataset.unique_operations(dataset.index.mask(self._filters(params)))
+        if cube.empty:
+            return cube
+        cube = apply_filters(cube, self._filters(params))
+        return cube[(cube['date'] >= start) & (cube['date'] < end)]
+
+    def health(self, params):
+        dataset = self.source.dataset
+        return {
+            'flights': len(dataset),
+            'files': sorted(dataset.keys),
+            'messages': self.source.messages
+        }
+
+    def options(self, params):
+        index = self.source.dataset.index
+        return {column: index.options(column) for column in FILTER_COLUMNS if column in index.postings}
+
+    def flights(self, params):
+        dataset = self.source.dataset
+        offset = max(_int(params, 'offset', 0), 0)
+        limit = min(max(_int(params, 'limit', 100), 0), MAX_LIMIT)
+        if len(dataset) == 0:
+            return {'total': 0, 'offset': offset, 'limit': limit, 'flights': []}
+        grid = dataset.grid
+        mask = self._mask(params)
+        query = params.get('q', [''])[0]
+        rows = dataset.search.find(query)
+        if rows is None:
+            rows = grid.order if mask is None else grid.order[mask[grid.order]]
+        else:
+            rows = grid.sort(rows if mask is None else rows[mask[rows]], 'date')
+        page = to_display(grid.take(rows[offset:offset + limit], FLIGHT_COLUMNS))
+        return {'total': len(rows), 'offset': offset, 'limit': limit, 'flights': _records(page)}
+
+    def weekly(self, params):
+        day = _date(params, 'week')
+        start = day - pd.Timedelta(days=day.weekday())
+        cube = self._cube(params, start, start + pd.Timedelta(days=7))
+        if cube.empty:
+            return {'week': start.strftime('%Y-%m-%d'), 'rows': []}
+        table = weekly_table(cube, sorted(cube['flight_type'].unique()), sorted(cube['aircraft_type'].unique()))
+        return {'week': start.strftime('%Y-%m-%d'), 'rows': _records(table)}
+
+    def daily(self, params):
+        day = _date(params, 'date')
+        cube = self._cube(params, day, day + pd.Timedelta(days=1))
+        if cube.empty:
+            return {'date': day.strftime('%Y-%m-%d'), 'rows': []}
+        table = daily_table(cube, sorted(cube['flight_type'].unique()), sorted(cube['aircraft_type'].unique()))
+        return {'date': day.strftime('%Y-%m-%d'), 'rows': _records(table)}
+
+    def hourly(self, params):
+        start = _date(params, 'start')
+        end = _date(params, 'end', start) + pd.Timedelta(days=1)
+        bucket = _int(params, 'bucket', 60)
+        if bucket not in TIME_BUCKETS:
+            raise QueryError(f"bucket debe ser uno de {TIME_BUCKETS}.")
+        if end <= start:
+            raise QueryError("end no puede ser anterior a start.")
+        dataset = self.source.dataset
+        rows = dataset.grid.date_rows(start, end, self._mask(params))
+        minutes, arrivals = dataset.grid.event_minutes(rows)
+        counts = count_by_time_bucket(minutes, arrivals, bucket, (end - start).days)
+        return {
+            'start': start.strftime('%Y-%m-%d'),
+            'end': (end - pd.Timedelta(days=1)).strftime('%Y-%m-%d'),
+            'bucket': bucket,
+            'rows': _records(counts)
+        }
+
+
+def make_handler(service):
+    """Clase de manejador HTTP que responde con el servicio indicado."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Conexiones persistentes entre consultas
+        # Cabeceras y cuerpo van en escrituras separadas: sin esto cada respuesta espera al ACK retrasado
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            status, body = service.handle(url.path, parse_qs(url.query))
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("X-Dataset-Version", str(service.source.version))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+    return Handler
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON local con los agregados de los horarios.")
+    parser.add_argument("files", nargs="+", help="Archivos de horarios (Excel, CSV o Parquet)")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección en la que escuchar")
+    parser.add_argument("--port", type=int, default=8000, help="Puerto en el que escuchar")
+    parser.add_argument("--start", type=pd.Timestamp, default=START_DATE_2025,
+                        help="Primera fecha de la ventana de consulta (AAAA-MM-DD, por defecto 2025-01-01)")
+    parser.add_argument("--end", type=pd.Timestamp, help="Fecha final de la ventana de consulta, excluida (AAAA-MM-DD)")
+    parser.add_argument("--workers", type=int, help="Procesos para leer archivos en paralelo")
+    parser.add_argument("--poll", type=float, default=POLL_SECONDS,
+                        help="Segundos entre comprobaciones de cambios en los archivos (0 = no comprobar)")
+    parser.add_argument("--cache-entries", type=int, default=RESPONSE_CACHE_ENTRIES,
+                        help="Respuestas que se mantienen en caché")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=os.environ.get("HORARIO_LOG_LEVEL", "INFO"))
+    source = ScheduleSource(args.files, args.start, args.end, args.workers)
+    for message in source.messages:
+        print(message, file=sys.stderr)
+    if args.poll > 0:
+        source.watch(args.poll)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(QueryService(source, args.cache_entries)))
+    print(f"Sirviendo {len(source.dataset)} vuelos en http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""Banco de pruebas de rendimiento con horarios sintéticos; emite los tiempos por etapa en JSON.
+
+Uso:
+    python bench.py --rows 1000 10000 100000 --stations 1 50 --output bench.json
+"""
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from aggregates import build_cube, daily_table, weekly_table
+from expansion import START_DATE_2025, add_calendar_columns, expand_flight_dates
+from export import export_flights
+from filters import FilterIndex
+from ingest import read_schedule
+
+CARRIERS = ['IB', 'VY', 'UX', 'FR', 'U2', 'LH', 'AF', 'BA', 'KL', 'TP']
+AIRCRAFT_TYPES = ['A320', 'A321', 'B738', 'E190', 'A333', 'B789', 'AT76']
+FLIGHT_TYPES = ['PAX', 'CARGO', 'CHARTER']
+SEASON_START = pd.Timestamp('2024-10-27')
+
+
+def station_codes(n):
+    """Códigos de estación sintéticos de tres letras: AAA, AAB, ..."""
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    return [letters[i // 676 % 26] + letters[i // 26 % 26] + letters[i % 26] for i in range(n)]
+
+
+def make_schedule(rows, stations=1, seed=0):
+    """Horario sintético con las columnas requeridas, al estilo de un SSIM: una fila por regla de vuelo."""
+    rng = np.random.default_rng(seed)
+    codes = station_codes(stations)
+    station = rng.choice(codes, rows)
+    from_date = SEASON_START + pd.to_timedelta(rng.integers(0, 210, rows), unit='D')
+    until_date = from_date + pd.to_timedelta(rng.integers(0, 180, rows), unit='D')
+    # Días de operación como en el Excel original: dígitos 1-7 sin repetir, p. ej. 1357
+    day_bits = rng.integers(1, 128, rows)
+    weekday = [int(''.join(str(d + 1) for d in range(7) if bits >> d & 1)) for bits in day_bits]
+
+    def hhmm(n):
+        return rng.integers(0, 24, n) * 100 + rng.integers(0, 60, n)
+
+    return pd.DataFrame({
+        'A/D': rng.choice(['A', 'D'], rows),
+        'fltno': rng.integers(100, 9999, rows),
+        'departure_time': hhmm(rows),
+        'arrival_time': hhmm(rows),
+        'origin': rng.choice(codes + ['MAD', 'BCN'], rows),
+        'dest': rng.choice(codes + ['MAD', 'BCN'], rows),
+        'STATION': station,
+        'weekday': weekday,
+        'from_date': from_date,
+        'until_date': until_date,
+        'flight_type': rng.choice(FLIGHT_TYPES, rows),
+        'actypeadv': rng.choice(AIRCRAFT_TYPES, rows),
+        'carrier': rng.choice(CARRIERS, rows)
+    })
+
+
+def schedule_workbook(df):
+    """Contenido de un archivo Excel con el horario, como el que se sube en la aplicación."""
+    out = io.BytesIO()
+    df.to_excel(out, index=False)
+    return out.getvalue()
+
+
+def timed(func, repeat):
+    """Ejecuta func repeat veces; devuelve (último resultado, mejor tiempo, mediana) en segundos."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - started)
+    return result, min(times), float(np.median(times))
+
+
+def run_case(rows, stations, repeat=3, seed=0):
+    """Mide cada etapa para un horario de rows filas repartido en stations estaciones."""
+    schedule = make_schedule(rows, stations, seed)
+    data = schedule_workbook(schedule)
+    stages = {}
+
+    def record(name, func, times=repeat):
+        result, best, median = timed(func, times)
+        stages[name] = {'best_s': round(best, 6), 'median_s': round(median, 6)}
+        return result
+
+    # La lectura de Excel domina en archivos grandes: se mide una sola vez
+    raw = record('ingest', lambda: read_schedule(data, 'bench.xlsx'), times=1)
+    flights, _ = record('expand', lambda: expand_flight_dates(raw, 'bench.xlsx', START_DATE_2025))
+    flights = add_calendar_columns(flights)
+    flights = flights[flights['date'] >= START_DATE_2025].reset_index(drop=True)
+
+    cube = record('cube', lambda: build_cube(flights))
+    index = record('index', lambda: FilterIndex(flights))
+    filters = {
+        'station': station_codes(stations)[:max(1, stations // 2)],
+        'carrier': CARRIERS[:3],
+        'flight_type': [],
+        'date': [],
+        'source_file': [],
+        'aircraft_type': []
+    }
+    filtered = record('filter', lambda: index.select(flights, filters))
+
+    flight_types = sorted(cube['flight_type'].unique())
+    aircraft_types = sorted(cube['aircraft_type'].unique())
+    month = cube[(cube['year'] == 2025) & (cube['month'] == 3)]
+    week = month[month['week'] == month['week'].min()]
+    day = week[week['date'] == week['date'].min()]
+    record('weekly', lambda: weekly_table(week, flight_types, aircraft_types))
+    record('daily', lambda: daily_table(day, flight_types, aircraft_types))
+    record('export_csv', lambda: export_flights(filtered, 'CSV').close())
+    record('export_parquet', lambda: export_flights(filtered, 'Parquet').close())
+
+    return {
+        'rows': rows,
+        'stations': stations,
+        'flights': len(flights),
+        'filtered_flights': len(filtered),
+        'stages': stages
+    }
+
+
+def git_commit():
+    """Commit actual del repositorio, si se ejecuta dentro de uno."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=Path(__file__).parent,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide el rendimiento de cada etapa con horarios sintéticos.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="Filas del horario")
+    parser.add_argument("--stations", type=int, nargs="+", default=[1, 50], help="Número de estaciones")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones de cada etapa")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla del generador")
+    parser.add_argument("--output", help="Archivo JSON de resultados (por defecto, salida estándar)")
+    args = parser.parse_args(argv)
+
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'cases': []
+    }
+    for rows in args.rows:
+        for stations in args.stations:
+            print(f"{rows} filas, {stations} estaciones...", file=sys.stderr)
+            results['cases'].append(run_case(rows, stations, args.repeat, args.seed))
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+"""Caché LRU acotada y segura entre hilos, para resultados compartidos entre ejecuciones y sesiones."""
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Caché LRU acotada y segura entre hilos: archivos expandidos y cubos del almacén de la
+    aplicación, o respuestas del servicio JSON."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,163 @@
+"""Figuras Plotly de los dashboards, construidas a partir de las tablas agregadas."""
+import plotly.express as px
+
+FONT = dict(family="Montserrat, Arial, sans-serif", size=12)
+
+
+def aircraft_bar(aircraft_counts, title):
+    """Barras del total por tipo de avión (con paleta de alto contraste)."""
+    fig = px.bar(
+        aircraft_counts,
+        x='aircraft_type',
+        y='count',
+        title=title,
+        color='aircraft_type',
+        color_discrete_sequence=px.colors.qualitative.Plotly,
+        text='count',
+        hover_data={'count': True, 'percentage': ':.2f%'}
+    )
+    # Personalizar el diseño
+    fig.update_layout(
+        xaxis_title="Tipo de Avión",
+        yaxis_title="Número de Vuelos",
+        showlegend=True,
+        font=FONT,
+        plot_bgcolor="white",
+        paper_bgcolor="white",
+        xaxis_tickangle=45,
+        margin=dict(l=50, r=50, t=100, b=100),
+        yaxis=dict(gridcolor="lightgray"),
+        hoverlabel=dict(bgcolor="white", font_size=12)
+    )
+    fig.update_traces(
+        textposition='auto',
+        textfont=dict(size=12, color="black")
+    )
+    return fig
+
+
+def daily_aircraft_line(daily_aircraft_counts, title, day_labels):
+    """Líneas de vuelos por día y tipo de avión, con los días en el orden de day_labels."""
+    fig = px.line(
+        daily_aircraft_counts,
+        x='day_label',
+        y='count',
+        color='aircraft_type',
+        title=title,
+        markers=True,
+        color_discrete_sequence=px.colors.qualitative.Plotly,
+        hover_data={'count': True, 'aircraft_type': True}
+    )
+    fig.update_layout(
+        xaxis_title="Día de la Semana",
+        yaxis_title="Número de Vuelos",
+        showlegend=True,
+        font=FONT,
+        plot_bgcolor="white",
+        paper_bgcolor="white",
+        xaxis_tickangle=45,
+        margin=dict(l=50, r=50, t=100, b=100),
+        yaxis=dict(gridcolor="lightgray"),
+        hoverlabel=dict(bgcolor="white", font_size=12),
+        xaxis=dict(
+            categoryorder='array',
+            categoryarray=day_labels
+        )
+    )
+    fig.update_traces(
+        mode='lines+markers+text',
+        line=dict(width=4),
+        marker=dict(size=12),
+        text=daily_aircraft_counts['count'].where(daily_aircraft_counts['count'] > 0),
+        textposition='top center',
+        textfont=dict(size=12, color="black")
+    )
+    return fig
+
+
+def time_bucket_bar(bucket_counts, title, value='count', value_title="Número de Vuelos"):
+    """Barras apiladas de llegadas y salidas por franja horaria."""
+    fig = px.bar(
+        bucket_counts,
+        x='Franja',
+        y=value,
+        color='Tipo',
+        title=title,
+        barmode='stack',
+        color_discrete_sequence=px.colors.qualitative.Plotly[:2],
+        # Con franjas de 15 minutos hay demasiadas barras para rotularlas
+        text=value if bucket_counts['Franja'].nunique() <= 48 else None,
+        hover_data={'count': True, 'daily_mean': ':.2f'}
+    )
+    fig.update_layout(
+        xaxis_title="Hora del Día",
+        yaxis_title=value_title,
+        showlegend=True,
+        font=FONT,
+        plot_bgcolor="white",
+        paper_bgcolor="white",
+        xaxis=dict(type='category', categoryorder='array', categoryarray=list(bucket_counts['Franja'].unique())),
+        margin=dict(l=50, r=50, t=100, b=100),
+        yaxis=dict(gridcolor="lightgray"),
+        hoverlabel=dict(bgcolor="white", font_size=12)
+    )
+    fig.update_traces(
+        textposition='auto',
+        textfont=dict(size=12, color="black")
+    )
+    return fig
+
+
+def occupancy_step(timeline, title, capacity=None):
+    """Escalones de aeronaves en tierra a lo largo del día, una línea por estación."""
+    data = timeline.assign(hour=timeline['minute'] / 60)
+    fig = px.line(
+        data,
+        x='hour',
+        y='level',
+        color='station',
+        line_shape='hv',
+        title=title,
+        color_discrete_sequence=px.colors.qualitative.Plotly,
+        hover_data={'hour': ':.2f', 'level': True}
+    )
+    fig.update_layout(
+        xaxis_title="Hora del Día",
+        yaxis_title="Aeronaves en Tierra",
+        showlegend=True,
+        font=FONT,
+        plot_bgcolor="white",
+        paper_bgcolor="white",
+        xaxis=dict(tickmode='linear', tick0=0, dtick=1, range=[0, 24]),
+        margin=dict(l=50, r=50, t=100, b=100),
+        yaxis=dict(gridcolor="lightgray"),
+        hoverlabel=dict(bgcolor="white", font_size=12)
+    )
+    if capacity:
+        fig.add_hline(y=capacity, line_dash="dash", line_color="red", annotation_text="Capacidad")
+    return fig
+
+
+def daily_flights_line(daily_counts, title):
+    """Líneas de llegadas y salidas por día a lo largo de todo el rango de fechas."""
+    fig = px.line(
+        daily_counts,
+        x='date',
+        y='count',
+        color='Tipo',
+        title=title,
+        color_discrete_sequence=px.colors.qualitative.Plotly[:2],
+        hover_data={'date': '|%Y-%m-%d', 'count': True}
+    )
+    fig.update_layout(
+        xaxis_title="Fecha",
+        yaxis_title="Número de Vuelos",
+        showlegend=True,
+        font=FONT,
+        plot_bgcolor="white",
+        paper_bgcolor="white",
+        margin=dict(l=50, r=50, t=100, b=100),
+        yaxis=dict(gridcolor="lightgray"),
+        hoverlabel=dict(bgcolor="white", font_size=12)
+    )
+    return fig
@@ -0,0 +1,198 @@
+"""Modo por lotes: expande archivos de horarios y escribe vuelos y resúmenes a disco sin Streamlit.
+
+Uso:
+    python cli.py estacion1.xlsx estacion2.xlsx -o salida/ --station MAD --format parquet
+    python cli.py *.xlsx -o salida/ --store almacen/ --out-of-core --memory-budget 128
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from aggregates import daily_summary, hourly_summary, week_starts, weekly_table
+from dataset import FlightDataset
+from expansion import START_DATE_2025
+from export import EXPORT_FORMATS, export_flights
+from filters import apply_filters
+from ingest import content_hash, ingest_errors, ingest_files, ingest_report, load_schedule_result
+from occupancy import daily_occupancy
+from outofcore import MEMORY_BUDGET_MB, StoreQuery
+from store import build_store, write_store
+
+# Opción de línea de comandos -> columna de los filtros generales
+FILTER_OPTIONS = {
+    'station': 'station',
+    'flight_type': 'flight_type',
+    'date': 'date',
+    'source_file': 'source_file',
+    'carrier': 'carrier',
+    'aircraft_type': 'aircraft_type'
+}
+
+
+def load_dataset(paths, start_date=START_DATE_2025, max_workers=None, end_date=None):
+    """Lee y expande los archivos indicados entre start_date y end_date (excluida).
+
+    Devuelve (FlightDataset, informe de carga, errores por fila).
+    """
+    files = [(Path(path).name, Path(path).read_bytes()) for path in paths]
+    results = ingest_files(files, start_date, max_workers=max_workers, end_date=end_date)
+    dataset = FlightDataset(start_date)
+    dataset.sync({
+        result.source_file: (content_hash(data), result.flights)
+        for result, (_, data) in zip(results, files)
+        if result.flights is not None and not result.flights.empty
+    })
+    return dataset, ingest_report(results), ingest_errors(results)
+
+
+def spill_to_store(paths, store_path, start_date=START_DATE_2025, end_date=None):
+    """Expande los archivos de uno en uno y los escribe en el almacén sin juntarlos en memoria.
+
+    Devuelve (vuelos escritos, informe de carga, errores por fila).
+    """
+    reports, errors = [], []
+
+    def frames():
+        for path in paths:
+            result = load_schedule_result(Path(path).name, Path(path).read_bytes(), start_date, end_date)
+            # Del archivo sólo se conservan su informe y sus errores: los vuelos van al almacén
+            reports.append(ingest_report([result]))
+            errors.append(ingest_errors([result]))
+            if result.flights is not None:
+                yield result.flights
+
+    written = build_store(frames(), store_path)
+    return written, pd.concat(reports, ignore_index=True), pd.concat(errors, ignore_index=True)
+
+
+def write_summaries(cube, output_dir):
+    """Escribe los resúmenes diario y horario y una tabla semanal por semana a partir del cubo."""
+    output_dir = Path(output_dir)
+    (output_dir / "semanas").mkdir(parents=True, exist_ok=True)
+    daily_summary(cube).to_csv(output_dir / "resumen_diario.csv", index=False)
+    hourly_summary(cube).to_csv(output_dir / "resumen_horario.csv", index=False)
+
+    # Una tabla por semana, igual que la del Dashboard Semanal
+    for week_start, week_cube in cube.groupby(week_starts(cube['date'])):
+        table = weekly_table(
+            week_cube,
+            sorted(week_cube['flight_type'].unique()),
+            sorted(week_cube['aircraft_type'].unique())
+        )
+        table.to_csv(output_dir / "semanas" / f"semana_{week_start.strftime('%Y-%m-%d')}.csv", index=False)
+
+
+def write_outputs(dataset, output_dir, filters=None, fmt='CSV', capacity=None, unique=False):
+    """Escribe los vuelos filtrados, los resúmenes diario, horario y semanal, la ocupación en tierra y
+    las operaciones repetidas entre archivos.
+
+    Con unique sólo se cuenta una copia de cada operación repetida entre archivos.
+    """
+    filters = filters or {}
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    mask = dataset.index.mask(filters)
+    cube = dataset.cube
+    if unique:
+        mask, cube = dataset.unique_operations(mask)
+    flights = dataset.flights if mask is None else dataset.flights[mask]
+    cube = apply_filters(cube, filters)
+
+    duplicates = dataset.operations.report(dataset.flights)
+    if not duplicates.empty:
+        duplicates.to_csv(output_dir / "duplicados.csv", index=False)
+
+    extension, _ = EXPORT_FORMATS[fmt]
+    with open(output_dir / f"vuelos.{extension}", "wb") as out:
+        out.write(export_flights(flights, fmt).read())
+
+    daily_occupancy(flights, capacity).to_csv(output_dir / "ocupacion_diaria.csv", index=False)
+    write_summaries(cube, output_dir)
+    return len(flights)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Expande horarios de vuelos y genera resúmenes sin interfaz.")
+    parser.add_argument("files", nargs="+", help="Archivos de horarios (Excel, CSV o Parquet)")
+    parser.add_argument("-o", "--output", required=True, help="Directorio de salida")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="CSV", help="Formato de los vuelos expandidos")
+    parser.add_argument("--store", help="Guardar además los vuelos en este almacén Parquet (sólo se reemplazan las particiones de estación y mes escritas)")
+    parser.add_argument("--out-of-core", action="store_true",
+                        help="Expandir los archivos de uno en uno en el almacén (--store) y calcular los resúmenes "
+                             "por lotes, sin cargar todos los vuelos en memoria")
+    parser.add_argument("--memory-budget", type=float, default=MEMORY_BUDGET_MB,
+                        help=f"Memoria por consulta en MB con --out-of-core (por defecto {MEMORY_BUDGET_MB})")
+    parser.add_argument("--capacity", type=int, help="Puestos de estacionamiento para los minutos sobre capacidad")
+    parser.add_argument("--workers", type=int, help="Procesos para leer archivos en paralelo")
+    parser.add_argument("--unique", action="store_true",
+                        help="Contar una sola copia de las operaciones repetidas entre archivos")
+    parser.add_argument("--start", type=pd.Timestamp, default=START_DATE_2025,
+                        help="Primera fecha de la ventana de consulta (AAAA-MM-DD, por defecto 2025-01-01)")
+    parser.add_argument("--end", type=pd.Timestamp, help="Fecha final de la ventana de consulta, excluida (AAAA-MM-DD)")
+    for option in FILTER_OPTIONS:
+        parser.add_argument(f"--{option.replace('_', '-')}", dest=option, action="append", default=[],
+                            help=f"Filtrar por {option} (repetible)")
+    return parser
+
+
+def main_out_of_core(args):
+    """Modo fuera de memoria: los vuelos quedan en el almacén y sólo se escriben los resúmenes."""
+    parser = build_parser()
+    if not args.store:
+        parser.error("--out-of-core necesita --store")
+    if args.unique or args.capacity:
+        parser.error("--unique y --capacity necesitan todos los vuelos en memoria: no se admiten con --out-of-core")
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    written, report, errors = spill_to_store(args.files, args.store, args.start, args.end)
+    report.to_csv(output_dir / "informe_carga.csv", index=False)
+    if not errors.empty:
+        errors.to_csv(output_dir / "errores.csv", index=False)
+    for message in report['message'].dropna():
+        print(message, file=sys.stderr)
+    if written == 0:
+        print("No se generaron vuelos a partir de los datos proporcionados.", file=sys.stderr)
+        return 1
+
+    filters = {column: getattr(args, option) for option, column in FILTER_OPTIONS.items()}
+    # El almacén conserva las particiones de otras cargas: los resúmenes son de los archivos indicados
+    if not filters['source_file']:
+        filters['source_file'] = sorted(report.loc[report['flights'] > 0, 'source_file'])
+    query = StoreQuery(args.store, args.memory_budget)
+    write_summaries(query.cube(filters), output_dir)
+    print(f"{query.count(filters)} vuelos de los archivos en el almacén {args.store}; resúmenes escritos en {output_dir}")
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.out_of_core:
+        return main_out_of_core(args)
+    dataset, report, errors = load_dataset(args.files, args.start, args.workers, args.end)
+
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    report.to_csv(output_dir / "informe_carga.csv", index=False)
+    if not errors.empty:
+        errors.to_csv(output_dir / "errores.csv", index=False)
+    for message in report['message'].dropna():
+        print(message, file=sys.stderr)
+
+    if len(dataset) == 0:
+        print("No se generaron vuelos a partir de los datos proporcionados.", file=sys.stderr)
+        return 1
+
+    if args.store:
+        write_store(dataset.flights, args.store)
+
+    filters = {column: getattr(args, option) for option, column in FILTER_OPTIONS.items()}
+    written = write_outputs(dataset, output_dir, filters, args.format, args.capacity, args.unique)
+    print(f"{written} vuelos escritos en {output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Conjunto de vuelos cargados, por archivo de origen, con actualización incremental."""
+import numpy as np
+import pandas as pd
+
+from aggregates import build_cube
+from duplicates import OperationIndex
+from expansion import START_DATE_2025, add_calendar_columns, concat_flights
+from filters import FilterIndex
+from grid import DetailGrid
+from search import FlightSearch
+
+
+class FlightDataset:
+    """Vuelos de varios archivos con sus columnas de calendario, cubo de conteos, índice de filtros y
+    orden por fecha para la vista de detalle.
+
+    Añadir o quitar un archivo sólo procesa las filas de ese archivo: los vuelos y el cubo se
+    concatenan o recortan por source_file y el índice de filtros se extiende o compacta.
+    """
+
+    def __init__(self, start_date=START_DATE_2025):
+        self.start_date = start_date
+        self.keys = {}  # source_file -> clave del contenido cargado
+        self.flights = pd.DataFrame()
+        self.cube = pd.DataFrame()
+        self.index = FilterIndex(pd.DataFrame(columns=[]), columns=[])
+        self._grid = None
+        self._operations = None
+        self._unique_cube = None
+        self._unique_filtered = None  # (máscara, filas, cubo) de la última consulta filtrada
+        self._search = None
+
+    def __len__(self):
+        return len(self.flights)
+
+    @property
+    def grid(self):
+        """Orden por fecha y límites de cada mes para la vista de detalle, calculado al pedirlo."""
+        if self._grid is None:
+            self._grid = DetailGrid(self.flights)
+        return self._grid
+
+    @property
+    def search(self):
+        """Índices de prefijos de número de vuelo, compañía y ruta, calculados al pedirlos."""
+        if self._search is None:
+            self._search = FlightSearch(self.flights)
+        return self._search
+
+    @property
+    def operations(self):
+        """Operaciones repetidas entre archivos, calculadas al pedirlas."""
+        if self._operations is None:
+            self._operations = OperationIndex(self.flights)
+        return self._operations
+
+    @property
+    def unique_cube(self):
+        """Cubo de conteos con una sola copia de cada operación (modo de operaciones únicas)."""
+        if self._unique_cube is None:
+            self._unique_cube = build_cube(self.flights[self.operations.unique]) if len(self.flights) else self.cube
+        return self._unique_cube
+
+    def unique_operations(self, mask=None):
+        """Filas y cubo de conteos con una sola copia de cada operación entre las filas de mask.
+
+        Las copias se descartan después de filtrar, así que una salida de MAD que repite una
+        llegada de BCN cuenta si el filtro deja sólo MAD. Se guarda el resultado de la última máscara.
+        """
+        if mask is None:
+            return self.operations.unique, self.unique_cube
+        cached = self._unique_filtered
+        if cached is not None and np.array_equal(cached[0], mask):
+            return cached[1], cached[2]
+        unique = self.operations.first_rows(mask)
+        cube = build_cube(self.flights[unique]) if unique.any() else self.cube.iloc[:0]
+        self._unique_filtered = (mask, unique, cube)
+        return unique, cube
+
+    def _invalidate(self):
+        self._grid = None
+        self._operations = None
+        self._unique_cube = None
+        self._unique_filtered = None
+        self._search = None
+
+    def _prepare(self, flights):
+        """Columnas de calendario y filtro desde la fecha de inicio (si hay) de un archivo nuevo."""
+        flights = add_calendar_columns(flights)
+        if self.start_date is not None:
+            flights = flights[flights['date'] >= self.start_date]
+        return flights.reset_index(drop=True)
+
+    def add(self, source_file, key, flights):
+        """Añade (o reemplaza) los vuelos de un archivo."""
+        if source_file in self.keys:
+            self.remove([source_file])
+        part = self._prepare(flights)
+        self.keys[source_file] = key
+        if part.empty:
+            return
+        if self.flights.empty:
+            self.flights = part
+            self.cube = build_cube(part)
+            self.index = FilterIndex(part)
+        else:
+            self.flights = concat_flights([self.flights, part])
+            self.cube = concat_flights([self.cube, build_cube(part)])
+            self.index.extend(part)
+        self._invalidate()
+
+    def remove(self, source_files):
+        """Quita los vuelos de los archivos indicados."""
+        source_files = [s for s in source_files if s in self.keys]
+        for source_file in source_files:
+            del self.keys[source_file]
+        if not source_files or self.flights.empty:
+            return
+        keep = ~self.flights['source_file'].isin(source_files).to_numpy()
+        self.flights = self.flights[keep].reset_index(drop=True)
+        self.cube = self.cube[~self.cube['source_file'].isin(source_files)].reset_index(drop=True)
+        self.index.drop(keep)
+        self._invalidate()
+
+    def sync(self, files):
+        """Sincroniza con los archivos cargados: {source_file: (clave, vuelos)}.
+
+        Sólo se procesan los archivos nuevos o con clave distinta y se quitan los que ya no están.
+        Devuelve True si el conjunto ha cambiado.
+        """
+        removed = [s for s, key in self.keys.items() if s not in files or files[s][0] != key]
+        self.remove(removed)
+        added = [s for s in files if s not in self.keys]
+        for source_file in added:
+            key, flights = files[source_file]
+            self.add(source_file, key, flights)
+        return bool(removed or added)
@@ -0,0 +1,181 @@
+"""Comparación de dos versiones de un horario sobre sus reglas compactas, sin expandir a vuelo-día."""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from expansion import DAY_NS, concat_flights, format_minutes, parse_rules
+from ingest import read_schedule
+
+# Una operación es un vuelo de una compañía en una estación, de llegada o de salida
+KEY_COLUMNS = ['station', 'type', 'carrier', 'flight_number']
+# Atributos de un día de operación; un cambio en ellos se informa por campo: campo -> columnas
+CHANGE_FIELDS = {'hora': ['time'], 'avión': ['aircraft_type'], 'ruta': ['origin', 'destination']}
+ATTRIBUTE_COLUMNS = ['time', 'aircraft_type', 'origin', 'destination']
+IMPACT_COLUMNS = ['station', 'week', 'ops_before', 'ops_after', 'added', 'cancelled', 'changed', 'net']
+OPERATION_COLUMNS = KEY_COLUMNS + [
+    'status', 'changes', 'ops_before', 'ops_after', 'added', 'cancelled', 'changed',
+    'time_before', 'time_after', 'aircraft_before', 'aircraft_after'
+]
+# Número de días activos de cada máscara semanal de 7 bits
+POPCOUNT = np.array([bin(m).count('1') for m in range(128)], dtype=np.int64)
+
+ScheduleDiff = namedtuple('ScheduleDiff', ['operations', 'impact'])
+
+
+def _operation_rules(rules, version):
+    """Reglas con la hora de la operación (llegada o salida según su tipo) y la versión (0 anterior, 1 nueva)."""
+    time = rules['arrival_time'].where(rules['type'] == 'A', rules['departure_time'])
+    return rules.assign(time=time.fillna(-1).astype('int16'), version=np.int8(version))
+
+
+def rule_weeks(rules):
+    """Una fila por regla y semana con la máscara de días que opera en esa semana (bit 0 = lunes).
+
+    Devuelve (posición de la regla, lunes de la semana en días desde 1970-01-01, máscara); las
+    semanas sin ningún día de operación se descartan.
+    """
+    from_days = rules['from_date'].to_numpy().view('int64') // DAY_NS
+    until_days = rules['until_date'].to_numpy().view('int64') // DAY_NS
+    first = from_days - (from_days + 3) % 7  # 1970-01-01 fue jueves
+    last = until_days - (until_days + 3) % 7
+    n_weeks = np.where(until_days >= from_days, (last - first) // 7 + 1, 0)
+
+    rule = np.repeat(np.arange(len(rules)), n_weeks)
+    offsets = np.arange(len(rule)) - np.repeat(np.cumsum(n_weeks) - n_weeks, n_weeks)
+    week = first[rule] + offsets * 7
+    # Días de la semana dentro del rango de fechas de la regla
+    lo = np.clip(from_days[rule] - week, 0, 7)
+    hi = np.clip(until_days[rule] - week, -1, 6)
+    in_range = ((1 << (hi + 1)) - 1) & ~((1 << lo) - 1)
+    mask = rules['days'].to_numpy().astype(np.int64)[rule] & in_range
+    keep = mask != 0
+    return rule[keep], week[keep], mask[keep]
+
+
+def _or_by(groups, masks, n_groups):
+    out = np.zeros(n_groups, dtype=np.int64)
+    np.bitwise_or.at(out, groups, masks)
+    return out
+
+
+def _changed_fields(rules, key_ids):
+    """Campos de CHANGE_FIELDS con algún valor presente sólo en una de las versiones, por operación."""
+    changed = {}
+    for field, columns in CHANGE_FIELDS.items():
+        values = rules[columns].assign(key=key_ids, version=rules['version'].to_numpy())
+        values = values.drop_duplicates()
+        single = values.groupby(['key'] + columns, observed=True, dropna=False)['version'].transform('size') == 1
+        changed[field] = values.loc[single, 'key'].unique()
+    return changed
+
+
+def _value_lists(rules, key_ids, column, keys):
+    """Valores distintos de una columna por operación, como texto 'a, b': (anterior, nueva)."""
+    values = rules[[column, 'version']].assign(key=key_ids)
+    values = values[values['key'].isin(keys)].drop_duplicates()
+    if column == 'time':
+        values[column] = format_minutes(values[column].where(values[column] >= 0))
+    values[column] = values[column].astype(str)
+    values = values.sort_values(['key', 'version', column]).set_index(['key', 'version'])[column]
+    # Casi todas las operaciones tienen un único valor: sólo se unen las que tienen varios
+    repeated = values.index.duplicated(keep=False)
+    joined = pd.concat([values[~repeated], values[repeated].groupby(level=[0, 1]).agg(', '.join)])
+    joined = joined.unstack('version').reindex(index=keys, columns=[0, 1]).fillna('')
+    return joined[0], joined[1]
+
+
+def _group_ids(ids, week):
+    """Código denso de cada par (id, semana); devuelve (códigos, id de cada grupo, semana de cada grupo)."""
+    first = week.min() if len(week) else 0
+    n_weeks = (week.max() - first) // 7 + 1 if len(week) else 1
+    codes, uniques = pd.factorize(ids.astype(np.int64) * n_weeks + (week - first) // 7)
+    return codes, uniques // n_weeks, uniques % n_weeks * 7 + first
+
+
+def compare_rules(old_rules, new_rules):
+    """Compara dos versiones de un horario dadas como reglas (ver expansion.parse_rules).
+
+    Cada operación (estación, tipo, compañía, vuelo) se compara semana a semana con máscaras de
+    7 bits: un día es añadido si sólo opera en la nueva versión, cancelado si sólo opera en la
+    anterior y cambiado si opera en ambas pero con otra hora, avión o ruta.
+    """
+    rules = concat_flights([_operation_rules(old_rules, 0), _operation_rules(new_rules, 1)])
+    if rules.empty:
+        return ScheduleDiff(pd.DataFrame(columns=OPERATION_COLUMNS), pd.DataFrame(columns=IMPACT_COLUMNS))
+
+    key_ids = rules.groupby(KEY_COLUMNS, observed=True, dropna=False, sort=False).ngroup().to_numpy()
+    attribute_ids = rules.groupby(
+        KEY_COLUMNS + ATTRIBUTE_COLUMNS, observed=True, dropna=False, sort=False
+    ).ngroup().to_numpy()
+    versions = rules['version'].to_numpy()
+
+    rule, week, mask = rule_weeks(rules)
+    version = versions[rule]
+    # Grupos (operación, semana) y (operación con sus atributos, semana)
+    key_week_ids, week_keys, weeks = _group_ids(key_ids[rule], week)
+    attribute_week_ids, _, _ = _group_ids(attribute_ids[rule], week)
+    n_key_weeks = len(week_keys)
+    n_attribute_weeks = attribute_week_ids.max(initial=-1) + 1
+
+    old = _or_by(key_week_ids[version == 0], mask[version == 0], n_key_weeks)
+    new = _or_by(key_week_ids[version == 1], mask[version == 1], n_key_weeks)
+    old_attribute = _or_by(attribute_week_ids[version == 0], mask[version == 0], n_attribute_weeks)
+    new_attribute = _or_by(attribute_week_ids[version == 1], mask[version == 1], n_attribute_weeks)
+    # Días que operan en ambas versiones con los mismos atributos
+    parent = np.zeros(n_attribute_weeks, dtype=np.int64)
+    parent[attribute_week_ids] = key_week_ids
+    same = _or_by(parent, old_attribute & new_attribute, n_key_weeks)
+
+    weekly = pd.DataFrame({
+        'key': week_keys,
+        'week': (weeks * DAY_NS).view('datetime64[ns]'),
+        'ops_before': POPCOUNT[old],
+        'ops_after': POPCOUNT[new],
+        'added': POPCOUNT[new & ~old],
+        'cancelled': POPCOUNT[old & ~new],
+        'changed': POPCOUNT[old & new & ~same]
+    })
+    first_rule = pd.Series(np.arange(len(rules))).groupby(key_ids).first()
+    keys = rules[KEY_COLUMNS].iloc[first_rule.to_numpy()].reset_index(drop=True)
+    weekly['station'] = keys['station'].to_numpy()[weekly['key'].to_numpy()]
+
+    impact = weekly.groupby(['station', 'week'], observed=True)[
+        ['ops_before', 'ops_after', 'added', 'cancelled', 'changed']
+    ].sum().reset_index()
+    impact = impact[impact[['added', 'cancelled', 'changed']].sum(axis=1) > 0].reset_index(drop=True)
+    impact['net'] = impact['ops_after'] - impact['ops_before']
+
+    totals = weekly.groupby('key')[['ops_before', 'ops_after', 'added', 'cancelled', 'changed']].sum()
+    totals = totals[totals[['added', 'cancelled', 'changed']].sum(axis=1) > 0]
+    operations = keys.iloc[totals.index].reset_index(drop=True)
+    for column in totals.columns:
+        operations[column] = totals[column].to_numpy()
+    operations['status'] = np.select(
+        [operations['ops_before'] == 0, operations['ops_after'] == 0],
+        ['nueva', 'cancelada'], 'modificada'
+    )
+
+    # Campos cambiados de cada operación modificada: días si alguno se añade o cancela, y los
+    # atributos con algún valor presente sólo en una versión si algún día cambia
+    modified = (operations['status'] == 'modificada').to_numpy()
+    labels = [np.where(modified & (totals['added'].gt(0) | totals['cancelled'].gt(0)).to_numpy(), 'días', '')]
+    for field, field_keys in _changed_fields(rules, key_ids).items():
+        hit = modified & totals['changed'].gt(0).to_numpy() & totals.index.isin(field_keys)
+        labels.append(np.where(hit, field, ''))
+    operations['changes'] = [', '.join(f for f in row if f) for row in zip(*labels)]
+
+    for column, prefix in (('time', 'time'), ('aircraft_type', 'aircraft')):
+        before, after = _value_lists(rules, key_ids, column, totals.index)
+        operations[f'{prefix}_before'] = before.to_numpy()
+        operations[f'{prefix}_after'] = after.to_numpy()
+
+    operations = operations[OPERATION_COLUMNS].sort_values(KEY_COLUMNS, ignore_index=True)
+    return ScheduleDiff(operations, impact[IMPACT_COLUMNS])
+
+
+def diff_schedules(old_data, old_name, new_data, new_name):
+    """Lee dos versiones de un horario (Excel, CSV o Parquet) y las compara sin expandirlas."""
+    old_rules, _ = parse_rules(read_schedule(old_data, old_name), old_name)
+    new_rules, _ = parse_rules(read_schedule(new_data, new_name), new_name)
+    return compare_rules(old_rules, new_rules)
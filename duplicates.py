@@ -0,0 +1,113 @@
+"""Detección de operaciones repetidas entre archivos de horarios mediante claves hash."""
+import numpy as np
+import pandas as pd
+
+# Una operación es un vuelo de una compañía en una fecha y ruta: la llegada del archivo de una
+# estación y la salida del archivo de la estación de origen son la misma operación
+OPERATION_COLUMNS = ['carrier', 'flight_number', 'date', 'origin', 'destination']
+# Columnas que deben coincidir (si ambas copias las tienen) para que un duplicado sea exacto
+CHECK_COLUMNS = ['aircraft_type', 'flight_type', 'departure_time', 'arrival_time']
+REPORT_COLUMNS = OPERATION_COLUMNS + ['source_file', 'station', 'type', 'status', 'conflicts']
+
+
+def operation_keys(df):
+    """Hash de 64 bits de la operación de cada vuelo."""
+    return pd.util.hash_pandas_object(df[OPERATION_COLUMNS], index=False).to_numpy()
+
+
+def _codes(values):
+    """Códigos enteros de una columna (-1 si no hay valor)."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy().astype(np.int64)
+    codes, _ = pd.factorize(values)
+    return codes.astype(np.int64)
+
+
+def _several_per_group(group, codes, n_groups):
+    """True en los grupos con más de un valor distinto (sin contar los vacíos) de codes.
+
+    Basta comparar cada fila con el primer valor de su grupo, sin ordenar ni volver a agrupar.
+    """
+    present = np.flatnonzero(codes >= 0)
+    first = np.full(n_groups, -1, dtype=np.int64)
+    # En una asignación con índices repetidos gana la última: al revés, gana la primera fila
+    first[group[present][::-1]] = codes[present][::-1]
+    differs = codes[present] != first[group[present]]
+    return np.bincount(group[present][differs], minlength=n_groups) > 0
+
+
+class OperationIndex:
+    """Agrupación de los vuelos por clave de operación, con un único recorrido hash de las filas.
+
+    Una operación está duplicada si aparece en más de un source_file; el duplicado es exacto si
+    todas las copias coinciden en CHECK_COLUMNS (ignorando las que no tienen valor, como la hora de
+    salida de una llegada) y conflictivo si no.
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        if self.n_rows == 0:
+            self.group = np.zeros(0, dtype=np.int64)
+            self.n_groups = 0
+            self.shared = self.conflict = self.unique = np.zeros(0, dtype=bool)
+            self._conflict_columns = {}
+            return
+        group, uniques = pd.factorize(operation_keys(df))
+        self.group = group.astype(np.int64)
+        self.n_groups = n_groups = len(uniques)
+
+        shared_groups = _several_per_group(self.group, _codes(df['source_file']), n_groups)
+        self._conflict_columns = {}
+        conflict_groups = np.zeros(n_groups, dtype=bool)
+        for column in CHECK_COLUMNS:
+            differs = shared_groups & _several_per_group(self.group, _codes(df[column]), n_groups)
+            self._conflict_columns[column] = differs
+            conflict_groups |= differs
+
+        self.shared = shared_groups[self.group]
+        self.conflict = conflict_groups[self.group]
+        # Primera fila de cada operación: las demás copias no cuentan en el modo de operaciones únicas.
+        # factorize numera las claves por orden de aparición, así que es la fila que supera el máximo anterior
+        self.unique = np.ones(self.n_rows, dtype=bool)
+        self.unique[1:] = self.group[1:] > np.maximum.accumulate(self.group)[:-1]
+
+    def first_rows(self, keep=None):
+        """Primera fila de cada operación entre las filas de keep (todas si es None).
+
+        Se deduplica después de filtrar: si la primera copia no está en keep cuenta la siguiente.
+        """
+        if keep is None:
+            return self.unique
+        rows = np.flatnonzero(keep)
+        first = np.full(self.n_groups, -1, dtype=np.int64)
+        # En una asignación con índices repetidos gana la última: al revés, gana la primera fila
+        first[self.group[rows][::-1]] = rows[::-1]
+        unique = np.zeros(self.n_rows, dtype=bool)
+        unique[first[first >= 0]] = True
+        return unique
+
+    def summary(self):
+        """Operaciones y filas duplicadas entre archivos, exactas y conflictivas."""
+        exact = self.shared & ~self.conflict
+        return {
+            'operations': int(self.unique.sum()),
+            'duplicated_rows': int((self.shared & ~self.unique).sum()),
+            'exact_operations': int((exact & self.unique).sum()),
+            'conflicting_operations': int((self.conflict & self.unique).sum())
+        }
+
+    def report(self, df, conflicts_only=False):
+        """Filas de las operaciones duplicadas entre archivos, agrupadas por operación.
+
+        status es 'exacto' o 'conflicto' y conflicts las columnas en las que difieren las copias.
+        """
+        rows = np.flatnonzero(self.conflict if conflicts_only else self.shared)
+        rows = rows[np.argsort(self.group[rows], kind='stable')]
+        report = df.iloc[rows][OPERATION_COLUMNS + ['source_file', 'station', 'type']].reset_index(drop=True)
+        report['status'] = np.where(self.conflict[rows], 'conflicto', 'exacto')
+        # Columnas en conflicto de cada operación, una vez por operación y no por fila
+        groups, inverse = np.unique(self.group[rows], return_inverse=True)
+        labels = [np.where(differs[groups], column, '') for column, differs in self._conflict_columns.items()]
+        conflicts = np.array([', '.join(c for c in row if c) for row in zip(*labels)], dtype=object)
+        report['conflicts'] = conflicts[inverse] if len(rows) else ''
+        return report[REPORT_COLUMNS]
@@ -0,0 +1,244 @@
+"""Motor vectorizado de expansión de horarios de vuelos."""
+import calendar
+
+import numpy as np
+import pandas as pd
+
+# Fecha de inicio
+START_DATE_2025 = pd.to_datetime("2025-01-01")
+
+DAY_NS = 86_400_000_000_000
+DAY_NAMES = list(calendar.day_name)
+
+# Etiquetas repetidas por vuelo-día: se guardan como categóricas
+CATEGORY_COLUMNS = [
+    'flight_number', 'day_name', 'origin', 'destination', 'flight_type', 'station',
+    'type', 'aircraft_type', 'source_file', 'carrier'
+]
+# Horas como minutos desde medianoche (Int16, nulo si no aplica)
+TIME_COLUMNS = ['departure_time', 'arrival_time']
+TIME_LABELS = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(24 * 60 + 1)] + ["N/A"], dtype=object)
+
+OUTPUT_COLUMNS = [
+    'flight_number', 'date', 'day_name', 'departure_time', 'arrival_time', 'origin',
+    'destination', 'flight_type', 'station', 'type', 'aircraft_type', 'source_file', 'carrier'
+]
+ERROR_COLUMNS = ['source_file', 'row', 'error']
+# Reglas sin expandir: una por fila del horario, con la máscara de días (bit 0 = lunes)
+RULE_COLUMNS = [
+    'row', 'flight_number', 'departure_time', 'arrival_time', 'origin', 'destination', 'flight_type',
+    'station', 'type', 'aircraft_type', 'source_file', 'carrier', 'from_date', 'until_date', 'days'
+]
+
+
+def time_to_minutes(time_value):
+    """Convierte formato de tiempo numérico (HHMM) a minutos desde medianoche.
+
+    Las horas que no existen (minutos >= 60, como 1275, o más de 2400, como 2530) devuelven None y
+    se muestran como 'N/A'. El script original las mostraba tal cual ('12:75'), pero ya las
+    descartaba en la distribución horaria.
+    """
+    if pd.isna(time_value):
+        return None
+    try:
+        hhmm = int(time_value)
+    except (ValueError, TypeError):
+        return None
+    if hhmm < 0 or hhmm % 100 >= 60 or hhmm > 2400:
+        return None
+    return hhmm // 100 * 60 + hhmm % 100
+
+
+def format_minutes(values):
+    """Convierte minutos desde medianoche a texto HH:MM ('N/A' si falta)."""
+    values = pd.Series(values)
+    return pd.Series(TIME_LABELS[values.fillna(len(TIME_LABELS) - 1).astype(int)], index=values.index)
+
+
+def to_display(df):
+    """Copia de los vuelos con las horas en formato HH:MM, para tablas y exportación."""
+    return df.assign(**{col: format_minutes(df[col]) for col in TIME_COLUMNS if col in df.columns})
+
+
+def compact_flights(df):
+    """Aplica el esquema compacto (categóricas) a un DataFrame de vuelos leído de otra fuente."""
+    return df.assign(**{
+        col: df[col].astype('category') for col in CATEGORY_COLUMNS
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype)
+    })
+
+
+def add_calendar_columns(df):
+    """Añade columnas de año, mes y semana ISO con enteros estrechos."""
+    dates = pd.to_datetime(df['date'])
+    return df.assign(
+        date=dates,
+        year=dates.dt.year.astype('int16'),
+        month=dates.dt.month.astype('int8'),
+        week=dates.dt.isocalendar().week.astype('int8')
+    )
+
+
+def concat_flights(frames):
+    """Concatena DataFrames de vuelos unificando categorías para no perder el esquema compacto."""
+    frames = list(frames)
+    if len(frames) > 1:
+        categories = {
+            col: sorted(set().union(*(f[col].cat.categories for f in frames)))
+            for col in CATEGORY_COLUMNS
+            if all(col in f.columns and isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames)
+        }
+        frames = [
+            f.assign(**{col: f[col].cat.set_categories(cats) for col, cats in categories.items()})
+            for f in frames
+        ]
+    return pd.concat(frames, ignore_index=True)
+
+
+def _parse_dates(values):
+    """Convierte una columna de fechas a int64 (ns) y devuelve también el error de cada fila."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        parsed = pd.to_datetime(values).astype('datetime64[ns]')
+        nat = parsed.isna().to_numpy()
+        errors = np.where(nat, "fecha vacía", None)
+        return parsed.to_numpy().view('int64'), errors
+
+    # Las fechas de una temporada se repiten mucho: se convierten sólo los valores únicos
+    codes, uniques = pd.factorize(values)
+    unique_ns = np.zeros(len(uniques), dtype='int64')
+    unique_errors = np.full(len(uniques), None, dtype=object)
+    for i, value in enumerate(uniques):
+        try:
+            ts = pd.to_datetime(value)
+        except (ValueError, TypeError) as e:
+            unique_errors[i] = str(e)
+            continue
+        if pd.isna(ts):
+            unique_errors[i] = "fecha vacía"
+        else:
+            unique_ns[i] = pd.Timestamp(ts).as_unit('ns').value
+
+    ns = np.where(codes >= 0, unique_ns[codes], 0)
+    errors = np.where(codes >= 0, unique_errors[codes], "fecha vacía")
+    return ns, errors
+
+
+def _weekday_masks(values):
+    """Convierte el patrón de días ('1357') en una máscara de bits (bit 0 = lunes)."""
+    codes, uniques = pd.factorize(values)
+    unique_masks = np.zeros(len(uniques) + 1, dtype='int64')
+    for i, value in enumerate(uniques):
+        for d in str(value):
+            if d.isdigit() and 1 <= int(d) <= 7:
+                unique_masks[i] |= 1 << (int(d) - 1)
+    # El código -1 (valor vacío) apunta a la última posición, sin días
+    return unique_masks[codes]
+
+
+def _parse_minutes(values):
+    """Aplica time_to_minutes una sola vez por valor distinto. Devuelve (minutos, máscara de nulos)."""
+    codes, uniques = pd.factorize(values)
+    minutes = [time_to_minutes(v) for v in uniques] + [None]
+    unique_mask = np.array([m is None for m in minutes])
+    unique_values = np.array([0 if m is None else m for m in minutes], dtype='int16')
+    return unique_values[codes], unique_mask[codes]
+
+
+def _categorical(values, row_idx):
+    """Categórica de las filas expandidas a partir de los códigos de las filas originales."""
+    codes, uniques = pd.factorize(values, sort=True)
+    return pd.Categorical.from_codes(codes[row_idx], categories=uniques)
+
+
+def parse_rules(df, source_file):
+    """Reglas compactas de un horario, sin expandir: una por fila válida, con fechas, horas, etiquetas
+    y máscara de días ya interpretadas.
+
+    Devuelve (reglas, errores por fila). Las filas con fechas no válidas van a los errores.
+    """
+    from_ns, from_errors = _parse_dates(df['from_date'])
+    until_ns, until_errors = _parse_dates(df['until_date'])
+    from_bad = pd.notna(from_errors)
+    until_bad = pd.notna(until_errors)
+    row_idx = np.flatnonzero(~(from_bad | until_bad))
+
+    ad = df['A/D'].to_numpy()
+    times = {}
+    for col, kind in (('departure_time', 'D'), ('arrival_time', 'A')):
+        minutes, missing = _parse_minutes(df[col])
+        missing = missing | (ad != kind)
+        times[col] = pd.arrays.IntegerArray(minutes[row_idx], missing[row_idx])
+
+    if 'actypeadv' in df.columns:
+        aircraft_types = _categorical(df['actypeadv'], row_idx)
+    else:
+        aircraft_types = pd.Categorical.from_codes(np.zeros(len(row_idx), dtype='int8'), categories=['N/A'])
+
+    rules = pd.DataFrame({
+        'row': df.index.to_numpy()[row_idx],
+        'flight_number': _categorical(df['fltno'], row_idx),
+        'departure_time': times['departure_time'],
+        'arrival_time': times['arrival_time'],
+        'origin': _categorical(df['origin'], row_idx),
+        'destination': _categorical(df['dest'], row_idx),
+        'flight_type': _categorical(df['flight_type'], row_idx),
+        'station': _categorical(df['STATION'], row_idx),
+        'type': _categorical(df['A/D'], row_idx),
+        'aircraft_type': aircraft_types,
+        'source_file': pd.Categorical.from_codes(np.zeros(len(row_idx), dtype='int8'), categories=[source_file]),
+        'carrier': _categorical(df['carrier'], row_idx),
+        'from_date': from_ns[row_idx].view('datetime64[ns]'),
+        'until_date': until_ns[row_idx].view('datetime64[ns]'),
+        'days': _weekday_masks(df['weekday'])[row_idx].astype('int8')
+    }, columns=RULE_COLUMNS)
+
+    bad = np.flatnonzero(from_bad | until_bad)
+    errors = pd.DataFrame({
+        'source_file': source_file,
+        'row': df.index.to_numpy()[bad],
+        'error': [
+            f"from_date: {from_errors[i]}" if from_bad[i] else f"until_date: {until_errors[i]}"
+            for i in bad
+        ]
+    }, columns=ERROR_COLUMNS)
+    return rules, errors
+
+
+def expand_rules(rules, start_date=START_DATE_2025, end_date=None):
+    """Expande las reglas a una fila por vuelo y día de operación entre start_date y end_date (excluida)."""
+    if len(rules) == 0:
+        return pd.DataFrame(columns=OUTPUT_COLUMNS)
+
+    from_ns = np.maximum(rules['from_date'].to_numpy().view('int64'), pd.Timestamp(start_date).as_unit('ns').value)
+    until_ns = rules['until_date'].to_numpy().view('int64')
+    if end_date is not None:
+        until_ns = np.minimum(until_ns, pd.Timestamp(end_date).as_unit('ns').value - DAY_NS)
+
+    # Número de días de cada rango (0 si el rango está vacío)
+    span = np.where(until_ns >= from_ns, (until_ns - from_ns) // DAY_NS + 1, 0)
+
+    # Expansión de todos los rangos a la vez
+    row_idx = np.repeat(np.arange(len(rules)), span)
+    offsets = np.arange(len(row_idx)) - np.repeat(np.cumsum(span) - span, span)
+    dates_ns = from_ns[row_idx] + offsets * DAY_NS
+    weekday = (dates_ns // DAY_NS + 3) % 7  # 1970-01-01 fue jueves
+
+    keep = (rules['days'].to_numpy()[row_idx].astype('int64') >> weekday) & 1 == 1
+    row_idx = row_idx[keep]
+    dates_ns = dates_ns[keep]
+    weekday = weekday[keep]
+
+    flights = {col: rules[col].array.take(row_idx) for col in OUTPUT_COLUMNS if col in rules.columns}
+    flights['date'] = dates_ns.view('datetime64[ns]')
+    flights['day_name'] = pd.Categorical.from_codes(weekday, categories=DAY_NAMES)
+    return pd.DataFrame(flights, columns=OUTPUT_COLUMNS)
+
+
+def expand_flight_dates(df, source_file, start_date=START_DATE_2025):
+    """Expande fechas de vuelos, añadiendo la fuente del archivo y la compañía.
+
+    Devuelve el DataFrame de vuelos (esquema compacto: etiquetas categóricas y horas en
+    minutos desde medianoche) y un DataFrame con los errores por fila.
+    """
+    rules, errors = parse_rules(df, source_file)
+    return expand_rules(rules, start_date), errors
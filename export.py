@@ -0,0 +1,75 @@
+"""Exportación de vuelos a CSV, Parquet y Excel por bloques."""
+import tempfile
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+from expansion import to_display
+
+# Formato -> (extensión, tipo MIME)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+}
+CHUNK_ROWS = 50_000
+# Por encima de este tamaño el archivo exportado se escribe en disco en vez de en memoria
+SPOOL_BYTES = 32 * 1024 * 1024
+EXCEL_MAX_ROWS = 1_048_575
+
+
+def iter_chunks(df, chunk_rows=CHUNK_ROWS):
+    """Recorre los vuelos en bloques ya formateados para mostrar (horas en HH:MM)."""
+    for start in range(0, len(df), chunk_rows):
+        yield to_display(df.iloc[start:start + chunk_rows])
+
+
+def write_csv(df, out, chunk_rows=CHUNK_ROWS):
+    """Escribe los vuelos como CSV, bloque a bloque."""
+    out.write(df.iloc[:0].to_csv(index=False).encode('utf-8'))
+    for chunk in iter_chunks(df, chunk_rows):
+        out.write(chunk.to_csv(index=False, header=False).encode('utf-8'))
+
+
+def write_parquet(df, out, chunk_rows=CHUNK_ROWS):
+    """Escribe los vuelos como Parquet, un grupo de filas por bloque."""
+    writer = None
+    for chunk in iter_chunks(df, chunk_rows):
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(out, table.schema)
+        writer.write_table(table.cast(writer.schema))
+    if writer is None:
+        pq.write_table(pa.Table.from_pandas(to_display(df), preserve_index=False), out)
+    else:
+        writer.close()
+
+
+def write_excel(df, out, chunk_rows=CHUNK_ROWS):
+    """Escribe los vuelos como Excel en modo sólo escritura, sin modelo de celdas en memoria."""
+    if len(df) > EXCEL_MAX_ROWS:
+        raise ValueError(f"Excel admite como máximo {EXCEL_MAX_ROWS} filas; exporta a CSV o Parquet.")
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Vuelos")
+    sheet.append(list(df.columns))
+    for chunk in iter_chunks(df, chunk_rows):
+        for row in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False):
+            sheet.append(list(row))
+    workbook.save(out)
+
+
+WRITERS = {'CSV': write_csv, 'Parquet': write_parquet, 'Excel': write_excel}
+
+
+def export_flights(df, fmt):
+    """Genera el archivo exportado en el formato indicado y lo devuelve como archivo abierto."""
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    WRITERS[fmt](df, out)
+    out.seek(0)
+    return out
+
+
+def export_rows(df, rows, fmt):
+    """Exporta sólo las filas indicadas (posiciones) de df."""
+    return export_flights(df.iloc[rows], fmt)
@@ -0,0 +1,156 @@
+"""Filtros generales sobre los vuelos y sobre el cubo de conteos."""
+import numpy as np
+import pandas as pd
+
+# Columna filtrada por cada multiselect de "Filtros Generales"
+FILTER_COLUMNS = ['station', 'flight_type', 'date', 'source_file', 'carrier', 'aircraft_type']
+
+
+def apply_filters(df, filters):
+    """Aplica los filtros generales (columna -> valores seleccionados); una selección vacía no filtra.
+
+    Las fechas se indican como texto 'YYYY-MM-DD'.
+    """
+    mask = None
+    for column, values in filters.items():
+        if not values:
+            continue
+        if column == 'date':
+            values = pd.to_datetime(list(values))
+        condition = df[column].isin(values)
+        mask = condition if mask is None else mask & condition
+    return df if mask is None else df[mask]
+
+
+class FilterIndex:
+    """Índice invertido por valor para cada columna de filtro, construido una vez al cargar los datos.
+
+    Los valores frecuentes se guardan como mapas de bits empaquetados y los poco frecuentes como
+    listas de posiciones; cualquier combinación de filtros se resuelve con OR dentro de cada
+    columna y AND entre columnas sobre los mapas de bits.
+    """
+
+    # Un valor con más de 1/32 de las filas ocupa menos como mapa de bits que como posiciones int32
+    DENSE_FRACTION = 32
+
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        self.n_rows = len(df)
+        self.postings = {column: self._build_column(df[column]) for column in columns}
+
+    def _build_column(self, values):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()
+            uniques = values.cat.categories
+        else:
+            codes, uniques = pd.factorize(values)
+        if pd.api.types.is_datetime64_any_dtype(uniques):
+            # Las fechas se filtran por su texto 'YYYY-MM-DD', como en el multiselect
+            uniques = pd.DatetimeIndex(uniques).strftime('%Y-%m-%d')
+
+        counts = np.bincount(codes + 1, minlength=len(uniques) + 1)[1:]
+        order = np.argsort(codes, kind='stable').astype(np.int64)
+        # Las filas sin valor (código -1) quedan al principio del orden y se descartan
+        starts = np.cumsum(counts) - counts + (len(codes) - counts.sum())
+
+        column_postings = {}
+        for code, key in enumerate(uniques):
+            if counts[code] == 0:
+                continue
+            column_postings[key] = self._store(order[starts[code]:starts[code] + counts[code]])
+        return column_postings
+
+    def _store(self, positions):
+        """Guarda las posiciones de un valor como mapa de bits o como lista, según su densidad."""
+        if len(positions) * self.DENSE_FRACTION >= self.n_rows:
+            return self._to_bitmap(positions)
+        return positions.astype(np.int32)
+
+    def _to_bitmap(self, positions):
+        bits = np.zeros(self.n_rows, dtype=bool)
+        bits[positions] = True
+        return np.packbits(bits)
+
+    @staticmethod
+    def _positions(entry, n_rows):
+        if entry.dtype == np.uint8:
+            return np.flatnonzero(np.unpackbits(entry, count=n_rows))
+        return entry.astype(np.int64)
+
+    def extend(self, df):
+        """Añade al índice las filas de df, que se concatenan al final del DataFrame indexado."""
+        added = FilterIndex(df, list(self.postings))
+        offset = self.n_rows
+        self.n_rows += added.n_rows
+        for column, postings in self.postings.items():
+            new_postings = added.postings[column]
+            merged = {}
+            for key in set(postings) | set(new_postings):
+                parts = []
+                if key in postings:
+                    parts.append(self._positions(postings[key], offset))
+                if key in new_postings:
+                    parts.append(self._positions(new_postings[key], added.n_rows) + offset)
+                merged[key] = self._store(np.concatenate(parts))
+            self.postings[column] = merged
+
+    def drop(self, keep):
+        """Elimina del índice las filas con keep == False, conservando el orden de las demás."""
+        keep = np.asarray(keep, dtype=bool)
+        old_rows = self.n_rows
+        new_position = np.cumsum(keep) - 1
+        self.n_rows = int(keep.sum())
+        for column, postings in self.postings.items():
+            kept = {}
+            for key, entry in postings.items():
+                positions = self._positions(entry, old_rows)
+                positions = new_position[positions[keep[positions]]]
+                if len(positions):
+                    kept[key] = self._store(positions)
+            self.postings[column] = kept
+
+    def _column_bitmap(self, column, values):
+        """OR de los valores seleccionados de una columna."""
+        postings = self.postings[column]
+        bitmap = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        sparse = []
+        for value in values:
+            entry = postings.get(value)
+            if entry is None:
+                continue
+            if entry.dtype == np.uint8:
+                bitmap |= entry
+            else:
+                sparse.append(entry)
+        if sparse:
+            bitmap |= self._to_bitmap(np.concatenate(sparse))
+        return bitmap
+
+    def options(self, column):
+        """Valores disponibles de una columna, ordenados, para las opciones del multiselect."""
+        return sorted(self.postings[column])
+
+    def _bitmap(self, filters):
+        result = None
+        for column, values in filters.items():
+            if not values:
+                continue
+            bitmap = self._column_bitmap(column, values)
+            result = bitmap if result is None else result & bitmap
+        return result
+
+    def mask(self, filters):
+        """Máscara booleana de las filas que cumplen los filtros (None si no hay ningún filtro activo)."""
+        bitmap = self._bitmap(filters)
+        return None if bitmap is None else np.unpackbits(bitmap, count=self.n_rows).view(bool)
+
+    def positions(self, filters):
+        """Posiciones de las filas que cumplen los filtros (None si no hay ningún filtro activo)."""
+        bitmap = self._bitmap(filters)
+        if bitmap is None:
+            return None
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.n_rows))
+
+    def select(self, df, filters):
+        """Filtra el DataFrame indexado con los filtros generales."""
+        positions = self.positions(filters)
+        return df if positions is None else df.iloc[positions]
@@ -0,0 +1,147 @@
+"""Vista de detalle por ventanas: sólo se calculan el mes y la página visibles."""
+import numpy as np
+import pandas as pd
+
+from expansion import TIME_COLUMNS, TIME_LABELS
+
+# Minutos de las horas nulas en los arrays de búsqueda y orden (apunta a 'N/A' en TIME_LABELS)
+MISSING_MINUTES = len(TIME_LABELS) - 1
+
+
+class DetailGrid:
+    """Orden por fecha y límites de cada mes de los vuelos, calculados una vez por conjunto cargado.
+
+    Con ellos la vista de un mes es un corte del orden global, y la búsqueda y la ordenación sólo
+    recorren las filas de ese mes, por muchos meses que haya cargados.
+    """
+
+    def __init__(self, flights):
+        self.flights = flights
+        self.n_rows = len(flights)
+        if self.n_rows == 0:
+            self.order = np.zeros(0, dtype=np.int32)
+            self.months = {}
+            return
+        dates = flights['date'].to_numpy()
+        self.order = np.argsort(dates, kind='stable').astype(np.int32)
+        sorted_months = dates[self.order].astype('datetime64[M]')
+        starts = np.flatnonzero(np.r_[True, sorted_months[1:] != sorted_months[:-1]])
+        ends = np.r_[starts[1:], self.n_rows]
+        self.months = {}  # (año, mes) -> (inicio, fin) en self.order
+        for start, end in zip(starts, ends):
+            period = pd.Timestamp(sorted_months[start])
+            self.months[(period.year, period.month)] = (int(start), int(end))
+        self._dates = dates.view('int64')
+        self._sorted_dates = self._dates[self.order]
+        self._weeks = flights['week'].to_numpy()
+        self._minutes = {
+            col: flights[col].to_numpy(dtype='int16', na_value=MISSING_MINUTES) for col in TIME_COLUMNS
+        }
+
+    def month_rows(self, year, month, keep=None, kind=None):
+        """Posiciones de los vuelos del mes en orden de fecha, limitadas a la máscara keep y al tipo A/D."""
+        start, end = self.months.get((year, month), (0, 0))
+        positions = self.order[start:end]
+        if keep is not None:
+            positions = positions[keep[positions]]
+        if kind is not None:
+            types = self.flights['type']
+            if kind not in types.cat.categories:
+                return positions[:0]
+            codes = types.cat.codes.to_numpy()
+            positions = positions[codes[positions] == types.cat.categories.get_loc(kind)]
+        return positions
+
+    def date_rows(self, start, end, keep=None):
+        """Posiciones de los vuelos con fecha en [start, end), en orden de fecha, limitadas a keep."""
+        if self.n_rows == 0:
+            return self.order
+        bounds = pd.DatetimeIndex([start, end]).as_unit('ns').asi8
+        lo, hi = np.searchsorted(self._sorted_dates, bounds)
+        positions = self.order[lo:hi]
+        return positions if keep is None else positions[keep[positions]]
+
+    def event_minutes(self, positions):
+        """Minuto del día de cada vuelo (el de llegada o el de salida según su tipo) y si es una llegada."""
+        types = self.flights['type']
+        arrivals = np.zeros(len(positions), dtype=bool)
+        if 'A' in types.cat.categories:
+            arrivals = types.cat.codes.to_numpy()[positions] == types.cat.categories.get_loc('A')
+        minutes = np.where(
+            arrivals,
+            self._minutes['arrival_time'][positions],
+            self._minutes['departure_time'][positions]
+        )
+        return minutes, arrivals
+
+    def week_ranges(self, positions):
+        """Semanas presentes en las filas (en orden de fecha), con su primera y última fecha."""
+        if len(positions) == 0:
+            return []
+        weeks = self._weeks[positions]
+        dates = self._dates[positions]
+        ranges = []
+        for week in pd.unique(weeks):
+            week_dates = dates[weeks == week]
+            ranges.append((int(week), pd.Timestamp(week_dates.min()), pd.Timestamp(week_dates.max())))
+        return ranges
+
+    def in_weeks(self, positions, weeks):
+        """Filas de las semanas indicadas."""
+        return positions[np.isin(self._weeks[positions], weeks)]
+
+    def _column_labels(self, column, positions):
+        """Texto mostrado de cada fila en una columna, evaluado sobre los valores distintos."""
+        if column in TIME_COLUMNS:
+            return TIME_LABELS, self._minutes[column][positions]
+        if column == 'date':
+            codes, uniques = pd.factorize(self._dates[positions])
+            return pd.DatetimeIndex(uniques.view('datetime64[ns]')).strftime('%Y-%m-%d').to_numpy(), codes
+        values = self.flights[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()[positions]
+            # El código -1 (valor nulo) apunta a la etiqueta vacía añadida al final
+            return np.append(values.cat.categories.astype(str).to_numpy(), ''), codes
+        codes, uniques = pd.factorize(values.to_numpy()[positions])
+        return np.append(np.asarray(uniques, dtype=str), ''), codes
+
+    def search(self, positions, columns, text):
+        """Filas en las que alguna de las columnas contiene el texto (sin distinguir mayúsculas)."""
+        text = text.strip().lower()
+        if not text or len(positions) == 0:
+            return positions
+        found = np.zeros(len(positions), dtype=bool)
+        for column in columns:
+            labels, codes = self._column_labels(column, positions)
+            matches = np.array([text in str(label).lower() for label in labels])
+            found |= matches[codes]
+        return positions[found]
+
+    def _sort_key(self, column, positions):
+        if column in TIME_COLUMNS:
+            return self._minutes[column][positions]
+        if column == 'date':
+            return self._dates[positions]
+        values = self.flights[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Las categorías están ordenadas, así que el código sigue el orden alfabético
+            return values.cat.codes.to_numpy()[positions]
+        return values.to_numpy()[positions]
+
+    def sort(self, positions, column, ascending=True):
+        """Ordena las filas por una columna; los empates conservan el orden de fecha."""
+        if column is None or len(positions) == 0:
+            return positions
+        key = self._sort_key(column, positions)
+        if not ascending:
+            if column in TIME_COLUMNS:
+                # Las horas nulas quedan al final también en orden descendente
+                key = np.where(key == MISSING_MINUTES, -1, key)
+            key = -key.astype(np.int64)
+        order = np.argsort(key, kind='stable')
+        return positions[order]
+
+    def take(self, positions, columns=None):
+        """Filas indicadas del conjunto de vuelos."""
+        rows = self.flights.iloc[positions]
+        return rows if columns is None else rows[columns]
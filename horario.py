@@ -1,15 +1,71 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
 import calendar
-import plotly.express as px
+from functools import partial
 from pathlib import Path
+
+from aggregates import (TIME_BUCKETS, count_by_aircraft, count_by_day_and_aircraft, count_by_time_bucket, daily_table,
+                        day_label, weekly_table)
+from cache import LRUCache
+from charts import aircraft_bar, daily_aircraft_line, daily_flights_line, occupancy_step, time_bucket_bar
+from diff import diff_schedules
+from expansion import START_DATE_2025, to_display
+from export import EXPORT_FORMATS, export_flights, export_rows
+from filters import apply_filters
+from ingest import IngestJob, cancelled_result, content_hash, ingest_errors, ingest_report, window_result
+from occupancy import daily_occupancy, occupancy_timeline
+from outofcore import MEMORY_BUDGET_MB, StoreQuery
+from profiling import StageProfiler, configure_logging, to_json_lines
+from readers import UPLOAD_TYPES
+from registry import DatasetRegistry
+from rules import RuleSet
+from store import list_partitions, read_store, store_version, write_store
  
 # Configuración inicial
 st.set_page_config(page_title="Calendario de Vuelos 2025", layout="wide")
  
-# Fecha de inicio
-START_DATE_2025 = pd.to_datetime("2025-01-01")
+# Tiempo (y memoria, en modo depuración) de cada etapa de esta ejecución, también en el log
+configure_logging()
+profiler = StageProfiler(trace_memory=st.session_state.get("profile_debug", False))
+profiler.mark("estilos")
+ 
+# Número máximo de archivos expandidos que se mantienen en caché
+PARSE_CACHE_ENTRIES = 64
+ 
+# Ruta por defecto del almacén columnar de vuelos expandidos
+STORE_PATH = "flights_store"
+ 
+# Cubos de conteos del almacén consultado sin cargarlo que se mantienen en caché
+STORE_CUBE_ENTRIES = 16
+ 
+# Figuras de cada tipo que se mantienen en caché
+FIGURE_CACHE_ENTRIES = 128
+ 
+# Comparaciones de versiones de horarios que se mantienen en caché
+DIFF_CACHE_ENTRIES = 16
+ 
+# Segundos entre comprobaciones del progreso de una carga en segundo plano
+INGEST_POLL_SECONDS = 1.0
+ 
+# Mediciones de rendimiento que se conservan por sesión para exportarlas
+PROFILE_LOG_RECORDS = 500
+ 
+# Encabezados de las columnas de las tablas de vuelos
+FLIGHT_COLUMN_LABELS = {
+    'flight_number': 'Nº Vuelo',
+    'day_name': 'Día',
+    'date': 'Fecha',
+    'arrival_time': 'Llegada',
+    'departure_time': 'Salida',
+    'origin': 'Origen',
+    'destination': 'Destino',
+    'flight_type': 'Tipo Vuelo',
+    'station': 'Estación',
+    'aircraft_type': 'Tipo de Avión',
+    'source_file': 'Archivo',
+    'carrier': 'Compañía',
+    'type': 'Tipo'
+}
  
 # Cargar CSS
 css_path = Path("styles.css")
@@ -107,578 +163,955 @@ else:
     """, unsafe_allow_html=True)
  
 # Funciones auxiliares
-def convert_time_format(time_str):
-    """Convierte formato de tiempo numérico a HH:MM."""
-    if pd.isna(time_str):
-        return "N/A"
-    try:
-        time_str = str(int(time_str)).zfill(4)
-        return f"{time_str[:2]}:{time_str[2:]}"
-    except (ValueError, TypeError):
-        return "N/A"
+@st.cache_resource
+def get_parse_cache():
+    """Caché de archivos expandidos por hash de contenido, compartida entre ejecuciones y sesiones."""
+    return LRUCache(PARSE_CACHE_ENTRIES)
+ 
+# Figuras memorizadas por tabla agregada y título: si no cambian, no se vuelven a construir
+cached_aircraft_bar = st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)(aircraft_bar)
+cached_daily_aircraft_line = st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)(daily_aircraft_line)
+cached_time_bucket_bar = st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)(time_bucket_bar)
+cached_occupancy_step = st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)(occupancy_step)
+cached_daily_flights_line = st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)(daily_flights_line)
+ 
+# Comparaciones memorizadas por contenido de los dos archivos
+cached_diff_schedules = st.cache_data(max_entries=DIFF_CACHE_ENTRIES, show_spinner="Comparando versiones...")(diff_schedules)
  
-def parse_time(time_str):
-    """Convierte hora en formato HH:MM a datetime para cálculos horarios."""
-    if time_str == "N/A":
-        return None
-    try:
-        return datetime.strptime(time_str, "%H:%M")
-    except (ValueError, TypeError):
-        return None
+@st.fragment(run_every=INGEST_POLL_SECONDS)
+def render_ingest_progress(job, seen):
+    """Progreso de la carga en segundo plano; relanza la página cuando termina algún archivo."""
+    if job.done != seen or not job.running:
+        st.rerun()
+    st.progress(job.done / job.total, text=f"Cargando archivos... ({job.done}/{job.total})")
+    if st.button(
+        "Cancelar carga",
+        key="ingest_cancel",
+        help="Los archivos que ya se están leyendo terminan; sólo se omiten los que aún no han empezado."
+    ):
+        job.cancel()
+        st.rerun()
  
-def expand_flight_dates(df, source_file):
-    """Expande fechas de vuelos, añadiendo la fuente del archivo y la compañía."""
-    all_flights = []
+@st.cache_resource
+def get_store_cubes():
+    """Cubos de conteos calculados por lotes sobre el almacén, por versión, ventana y selección."""
+    return LRUCache(STORE_CUBE_ENTRIES)
+ 
+@st.cache_resource
+def get_dataset_registry():
+    """Conjuntos de vuelos compartidos por las sesiones que cargan los mismos archivos."""
+    # Los vuelos llegan ya recortados a la ventana de consulta: el conjunto no aplica otra fecha de inicio
+    return DatasetRegistry(start_date=None)
+ 
+def render_download(df, label, file_stem, key, rows=None):
+    """Botón de descarga en CSV, Parquet o Excel; el archivo sólo se genera al pulsarlo.
    
-    for _, row in df.iterrows():
-        try:
-            start_date = max(pd.to_datetime(row['from_date']), START_DATE_2025)
-            end_date = pd.to_datetime(row['until_date'])
-            weekdays = [int(d) for d in str(row['weekday']) if d.isdigit()]
-           
-            date_range = pd.date_range(start_date, end_date, freq='D')
-            valid_dates = [d for d in date_range if (d.weekday() + 1) in weekdays]
-           
-            for date in valid_dates:
-                all_flights.append({
-                    'flight_number': row['fltno'],
-                    'date': date,
-                    'day_name': calendar.day_name[date.weekday()],
-                    'departure_time': convert_time_format(row['departure_time']) if row['A/D'] == 'D' else 'N/A',
-                    'arrival_time': convert_time_format(row['arrival_time']) if row['A/D'] == 'A' else 'N/A',
-                    'origin': row['origin'],
-                    'destination': row['dest'],
-                    'flight_type': row['flight_type'],
-                    'station': row['STATION'],
-                    'type': row['A/D'],
-                    'aircraft_type': row.get('actypeadv', 'N/A'),
-                    'source_file': source_file,
-                    'carrier': row['carrier']
-                })
-        except (ValueError, TypeError) as e:
-            st.warning(f"Error al procesar fila en {source_file}: {e}")
-            continue
+    rows (posiciones de df) permite exportar una selección sin copiarla en cada ejecución.
+    """
+    col_format, col_button = st.columns([1, 3])
+    with col_format:
+        fmt = st.selectbox("Formato", options=list(EXPORT_FORMATS), key=f"{key}_format", label_visibility="collapsed")
+    extension, mime = EXPORT_FORMATS[fmt]
+    with col_button:
+        st.download_button(
+            label=f"Descargar {fmt} de {label}",
+            data=partial(export_flights, df, fmt) if rows is None else partial(export_rows, df, rows, fmt),
+            file_name=f"{file_stem}.{extension}",
+            mime=mime,
+            key=f"{key}_download"
+        )
+ 
+def render_rows_page(grid, rows, columns, key_prefix):
+    """Página visible de las filas indicadas (posiciones ya ordenadas), con tamaño de página y selector."""
+    total_rows = len(rows)
+    page_size = st.slider("Filas por página", 10, 1000, 100, step=10, key=f"{key_prefix}_size")
+    total_pages = (total_rows + page_size - 1) // page_size
+    page_key = f"{key_prefix}_page"
+    if st.session_state.get(page_key, 1) > total_pages:
+        st.session_state[page_key] = 1
+    page = st.number_input("Página", 1, total_pages, 1, key=page_key)
+   
+    start_idx = (page - 1) * page_size
+    end_idx = min(start_idx + page_size, total_rows)
    
-    return pd.DataFrame(all_flights)
+    st.dataframe(
+        to_display(grid.take(rows[start_idx:end_idx], columns)),
+        column_config=FLIGHT_COLUMN_LABELS,
+        hide_index=True,
+        height=400
+    )
+   
+    st.write(f"Mostrando filas {start_idx + 1} a {end_idx} de {total_rows}")
  
-def render_flight_table(df, title, columns, key_prefix):
-    """Función reutilizable para mostrar tablas de vuelos."""
-    if len(df) == 0:
+def render_flight_search(dataset, keep, columns, key_prefix):
+    """Búsqueda de vuelos de todos los meses por número, compañía o ruta con los índices de prefijos."""
+    search_index = dataset.search
+    query = st.text_input(
+        "Buscar vuelos",
+        key=f"{key_prefix}_query",
+        placeholder="IB123, 123, MAD-BCN, IB MAD..."
+    )
+    rows = search_index.find(query)
+    if rows is None:
+        st.caption("Busca por compañía y número de vuelo (IB123), número (123), ruta (MAD-BCN) o código (MAD).")
+        return
+    if keep is not None:
+        rows = rows[keep[rows]]
+    if len(rows) == 0:
+        st.info("No hay vuelos que coincidan con la búsqueda.")
+        return
+    grid = dataset.grid
+    rows = grid.sort(rows, 'date')
+    render_rows_page(grid, rows, columns, key_prefix)
+    render_download(grid.flights, "resultados de la búsqueda", "horario_busqueda", f"{key_prefix}_export", rows=rows)
+ 
+def render_flight_table(grid, cube, keep, kind, title, columns, key_prefix):
+    """Tabla de vuelos paginada por mes: sólo se calculan el mes y la página visibles."""
+    months = cube.loc[cube['type'] == kind, ['year', 'month']].drop_duplicates().sort_values(['year', 'month'])
+    if len(months) == 0:
         st.info(f"No hay datos para {title.lower()}.")
         return
    
-    months = sorted(df['month'].unique())
-    month_tabs = st.tabs([calendar.month_name[m] + f" {df[df['month'] == m]['year'].iloc[0]}" for m in months])
+    month_keys = list(months.itertuples(index=False, name=None))
+    year, month = st.selectbox(
+        "Mes",
+        options=month_keys,
+        format_func=lambda key: f"{calendar.month_name[key[1]]} {key[0]}",
+        key=f"{key_prefix}_month"
+    )
+    rows = grid.month_rows(year, month, keep, kind)
+   
+    col_weeks, col_search = st.columns(2)
+    with col_weeks:
+        week_options = {
+            f"Semana {w} ({first.strftime('%Y-%m-%d')} - {last.strftime('%Y-%m-%d')})": w
+            for w, first, last in grid.week_ranges(rows)
+        }
+        selected_weeks = st.multiselect("Seleccionar semanas", list(week_options), key=f"{key_prefix}_weeks_{year}_{month}")
+    with col_search:
+        search = st.text_input("Buscar", key=f"{key_prefix}_search", placeholder="Vuelo, origen, compañía...")
+    if selected_weeks:
+        rows = grid.in_weeks(rows, [week_options[w] for w in selected_weeks])
+    rows = grid.search(rows, columns, search)
+   
+    col_sort, col_order = st.columns([3, 1])
+    with col_sort:
+        sort_column = st.selectbox(
+            "Ordenar por",
+            options=columns,
+            index=columns.index('date'),
+            format_func=FLIGHT_COLUMN_LABELS.get,
+            key=f"{key_prefix}_sort"
+        )
+    with col_order:
+        descending = st.checkbox("Descendente", key=f"{key_prefix}_desc")
+    rows = grid.sort(rows, sort_column, ascending=not descending)
+   
+    if len(rows) == 0:
+        st.info("No hay vuelos que coincidan con la búsqueda.")
+        return
+    render_rows_page(grid, rows, columns, key_prefix)
+   
+    render_download(
+        grid.flights,
+        f"{calendar.month_name[month]} ({title})",
+        f"horario_{title.lower()}_{year}_{month}",
+        f"{key_prefix}_export",
+        rows=rows
+    )
+ 
+def render_store_query(query, store_filters):
+    """Dashboards sobre el almacén sin cargarlo: cubo, franjas horarias y páginas de vuelos calculados por lotes."""
+    store_cubes = get_store_cubes()
+    cube_key = (query.path, query.version, query.window, tuple((k, tuple(v)) for k, v in store_filters.items()))
+    cube = store_cubes.get(cube_key)
+    if cube is None:
+        profiler.mark("cubo del almacén")
+        with st.spinner("Agregando el almacén por lotes..."):
+            cube = query.cube(store_filters)
+        store_cubes.put(cube_key, cube)
+    if len(cube) == 0:
+        st.warning("No hay vuelos en la ventana de consulta.")
+        return
+   
+    # Filtros generales: se aplican al cubo y se envían al almacén en las consultas de vuelos
+    st.subheader("Filtros Generales")
+    general_filters = {}
+    filter_labels = {
+        'flight_type': "Tipo de vuelo",
+        'date': "Fechas",
+        'source_file': "Archivo",
+        'carrier': "Compañía",
+        'aircraft_type': "Tipo de Avión"
+    }
+    for col, (column, label) in zip(st.columns(len(filter_labels)), filter_labels.items()):
+        values = cube[column].dropna().unique()
+        options = sorted(pd.DatetimeIndex(values).strftime('%Y-%m-%d') if column == 'date' else map(str, values))
+        with col:
+            general_filters[column] = st.multiselect(label, options=options, key=f"store_filter_{column}")
+    filters = {**store_filters, **general_filters}
+    filtered_cube = apply_filters(cube, general_filters)
+    st.metric("Vuelos", int(filtered_cube['count'].sum()))
+   
+    # Dashboard Semanal sobre el cubo agregado
+    profiler.mark("tabla semanal")
+    st.subheader("Dashboard Semanal")
+    months = filtered_cube[['year', 'month']].drop_duplicates().sort_values(['year', 'month'])
+    if len(months) == 0:
+        st.warning("No hay datos disponibles para los filtros seleccionados.")
+        return
+    year, month = st.selectbox(
+        "Selecciona un mes",
+        options=list(months.itertuples(index=False, name=None)),
+        format_func=lambda key: f"{calendar.month_name[key[1]]} {key[0]}",
+        key="store_month"
+    )
+    month_cube = filtered_cube[(filtered_cube['year'] == year) & (filtered_cube['month'] == month)]
+    week_bounds = month_cube.groupby('week')['date'].agg(['min', 'max'])
+    week_options = {
+        f"Semana {w} ({bounds['min'].strftime('%Y-%m-%d')} - {bounds['max'].strftime('%Y-%m-%d')})": w
+        for w, bounds in week_bounds.iterrows()
+    }
+    selected_week = st.selectbox("Selecciona una semana", options=list(week_options), key="store_week")
+    week_number = week_options[selected_week]
+    week_cube = month_cube[month_cube['week'] == week_number]
+    week_start = week_cube['date'].min()
+    week_end = week_cube['date'].max() + pd.Timedelta(days=1)
+   
+    st.dataframe(
+        weekly_table(week_cube, sorted(week_cube['flight_type'].unique()), sorted(week_cube['aircraft_type'].unique())),
+        use_container_width=True,
+        column_config={'Tipo': st.column_config.TextColumn('Tipo', width="medium")}
+    )
+    st.plotly_chart(
+        cached_aircraft_bar(count_by_aircraft(week_cube), f"Total por Tipo de Avión ({selected_week})"),
+        use_container_width=True
+    )
    
-    for tab, month in zip(month_tabs, months):
-        with tab:
-            month_df = df[df['month'] == month].sort_values('date')
-            weeks = sorted(month_df['week'].unique())
-            week_options = [
-                f"Semana {w} ({month_df[month_df['week'] == w]['date'].min().strftime('%Y-%m-%d')} - "
-                f"{month_df[month_df['week'] == w]['date'].max().strftime('%Y-%m-%d')})"
-                for w in weeks
-            ]
+    # Distribución horaria de la semana: sólo se leen el tipo y las horas de los vuelos filtrados
+    profiler.mark("distribución horaria")
+    st.subheader("Distribución Horaria")
+    bucket_minutes = st.selectbox(
+        "Franja (minutos)", TIME_BUCKETS, index=len(TIME_BUCKETS) - 1, key="store_hourly_bucket"
+    )
+    bucket_counts = query.time_buckets(bucket_minutes, filters, week_start, week_end)
+    if bucket_counts['count'].sum() > 0:
+        st.plotly_chart(
+            cached_time_bucket_bar(
+                bucket_counts,
+                f"Distribución de Vuelos por Franja de {bucket_minutes} min (Semana {week_number})",
+                'count',
+                "Número de Vuelos"
+            ),
+            use_container_width=True
+        )
+    else:
+        st.info("No hay datos horarios disponibles para la semana seleccionada.")
+   
+    # Vuelos de la semana, página a página: se cuentan en el almacén y sólo se lee la página visible
+    profiler.mark("vuelos del almacén")
+    st.subheader("Vuelos de la Semana")
+    kind = st.radio("Tipo", ["Llegadas", "Salidas"], horizontal=True, key="store_kind")
+    kind_filters = {**filters, 'type': ['A' if kind == "Llegadas" else 'D']}
+    columns = ['flight_number', 'date', 'arrival_time', 'departure_time', 'origin', 'destination',
+               'flight_type', 'station', 'aircraft_type', 'carrier', 'source_file']
+    total_rows = query.count(kind_filters, week_start, week_end)
+    if total_rows == 0:
+        st.info(f"No hay {kind.lower()} en la semana seleccionada.")
+        return
+    page_size = st.slider("Filas por página", 10, 1000, 100, step=10, key="store_page_size")
+    total_pages = (total_rows + page_size - 1) // page_size
+    if st.session_state.get("store_page", 1) > total_pages:
+        st.session_state["store_page"] = 1
+    page = st.number_input("Página", 1, total_pages, 1, key="store_page")
+    start_idx = (page - 1) * page_size
+    page_df = query.page(start_idx, page_size, columns, kind_filters, week_start, week_end)
+    st.dataframe(to_display(page_df), column_config=FLIGHT_COLUMN_LABELS, hide_index=True, height=400)
+    st.write(f"Mostrando filas {start_idx + 1} a {start_idx + len(page_df)} de {total_rows}")
+ 
+# Las etapas se cierran aunque la ejecución se interrumpa (st.rerun, una nueva interacción)
+try:
+    # Configuración de la interfaz
+    profiler.mark("interfaz")
+    st.title(" Calendario de Vuelos ")
+    st.write("Visualiza y filtra horarios de vuelos de múltiples estaciones por semana, día y hora.")
+     
+    # Estado de la sesión
+    dataset_registry = get_dataset_registry()
+    if 'dataset_handle' not in st.session_state:
+        st.session_state.dataset_handle = dataset_registry.acquire({})  # Referencia al conjunto compartido
+        st.session_state.store_key = None  # Selección del almacén cargada en el conjunto
+     
+    # Almacén columnar persistente
+    with st.sidebar:
+        st.subheader("Almacén de horarios")
+        store_path = st.text_input("Ruta del almacén", value=STORE_PATH, key="store_path")
+        store_out_of_core = st.checkbox(
+            "Consultar sin cargarlo en memoria",
+            key="store_out_of_core",
+            help="Los dashboards se calculan leyendo el almacén por lotes; sólo los resultados se cargan en memoria."
+        )
+        store_budget = st.number_input(
+            "Memoria por consulta (MB)", min_value=16, value=MEMORY_BUDGET_MB, step=16,
+            key="store_budget", disabled=not store_out_of_core
+        )
+    store_query = None  # Consultas por lotes sobre el almacén, en lugar del conjunto en memoria
+     
+    # Ventana de consulta: sólo se expanden las reglas que solapan estas fechas; las reglas de cada
+    # archivo se conservan y al cambiar la ventana se vuelven a expandir sin leer otra vez los archivos
+    with st.sidebar:
+        st.subheader("Ventana de consulta")
+        query_mode = st.radio(
+            "Expandir", ["Un mes", "Rango de fechas"], index=1, horizontal=True, key="query_mode",
+            help="Con un mes, la memoria depende del número de reglas y de los vuelos de ese mes, no de todo el horario."
+        )
+        if query_mode == "Un mes":
+            col1, col2 = st.columns(2)
+            query_month = col1.selectbox(
+                "Mes", range(1, 13), index=START_DATE_2025.month - 1,
+                format_func=lambda m: calendar.month_name[m], key="query_month"
+            )
+            query_year = col2.number_input("Año", min_value=1970, max_value=2100, value=START_DATE_2025.year, key="query_year")
+            query_start = pd.Timestamp(year=int(query_year), month=query_month, day=1)
+            query_window = (query_start, query_start + pd.offsets.MonthBegin())
+        else:
+            query_start = st.date_input("Desde", value=START_DATE_2025, key="query_start")
+            query_end = st.date_input("Hasta (vacío = sin límite)", value=None, key="query_end")
+            query_window = (
+                pd.Timestamp(query_start),
+                None if query_end is None else pd.Timestamp(query_end) + pd.Timedelta(days=1)
+            )
+     
+    # Cargar múltiples archivos
+    uploaded_files = st.file_uploader("Carga tus archivos de horarios (Excel, CSV o Parquet)", type=UPLOAD_TYPES, accept_multiple_files=True, key="excel_uploader")
+     
+    if uploaded_files:
+        try:
+            parse_cache = get_parse_cache()
+            # Huella de cada archivo subido, calculada una vez por subida: file_id cambia al volver a subirlo
+            known_hashes = st.session_state.get('upload_hashes', {})
+            st.session_state.upload_hashes = {
+                f.file_id: known_hashes.get(f.file_id) or content_hash(f.getvalue()) for f in uploaded_files
+            }
+            cache_keys = [(st.session_state.upload_hashes[f.file_id], f.name) for f in uploaded_files]
            
-            selected_weeks = st.multiselect("Seleccionar semanas", week_options, key=f"{key_prefix}_weeks_{month}")
-            if selected_weeks:
-                selected_week_numbers = [int(w.split()[1]) for w in selected_weeks]
-                month_df = month_df[month_df['week'].isin(selected_week_numbers)]
+            # Sólo se leen los archivos nuevos o modificados, en segundo plano y en paralelo; los demás
+            # salen de la caché y la página se actualiza según va terminando cada archivo
+            job = st.session_state.get('ingest_job')
+            job_results = {job.keys[i]: r for i, r in job.results().items()} if job is not None else {}
+            pending = [i for i, key in enumerate(cache_keys) if key not in job_results and parse_cache.get(key) is None]
+            job_covers = job is not None and all(cache_keys[i] in job.keys for i in pending)
+            if pending and not (job_covers and (job.running or job.cancelled)):
+                profiler.mark("lectura y expansión")
+                if job is not None:
+                    job.cancel()
+                job = IngestJob(
+                    [(uploaded_files[i].name, uploaded_files[i].getvalue()) for i in pending],
+                    [cache_keys[i] for i in pending], parse_cache,
+                    start_date=query_window[0], end_date=query_window[1]
+                )
+                st.session_state.ingest_job = job
            
-            page_size = st.slider("Filas por página", 10, 1000, 100, step=10, key=f"{key_prefix}_size_{month}")
-            total_rows = len(month_df)
-            total_pages = (total_rows + page_size - 1) // page_size
-            page = st.number_input("Página", 1, total_pages, 1, key=f"{key_prefix}_page_{month}")
+            if pending and job.running:
+                render_ingest_progress(job, job.done)
+            elif pending and job.cancelled:
+                st.warning(f"Carga cancelada: {len(pending)} archivo(s) sin procesar.")
+                if st.button("Reanudar carga", key="ingest_resume"):
+                    st.session_state.ingest_job = None
+                    st.rerun()
            
-            start_idx = (page - 1) * page_size
-            end_idx = min(start_idx + page_size, total_rows)
+            profiler.mark("informe de carga")
+            results = []
+            for uploaded_file, key in zip(uploaded_files, cache_keys):
+                result = parse_cache.get(key) or job_results.get(key)
+                if result is not None and result.rules is not None and result.window != query_window:
+                    # Misma versión del archivo con otra ventana: se expande de sus reglas y se guarda
+                    # aparte, sin reemplazar la entrada del archivo que usan otras sesiones
+                    window_key = key + (query_window,)
+                    windowed = parse_cache.get(window_key)
+                    if windowed is None:
+                        windowed = window_result(result, *query_window)
+                        parse_cache.put(window_key, windowed)
+                    result = windowed
+                if result is None and job is not None and job.cancelled:
+                    result = cancelled_result(uploaded_file.name)
+                if result is not None:
+                    results.append((key, result))
+            loaded_files = {
+                r.source_file: ((key[0], query_window), r.flights) for key, r in results
+                if r.flights is not None and not r.flights.empty
+            }
+            results = [r for _, r in results]
            
-            st.dataframe(
-                month_df.iloc[start_idx:end_idx][columns],
-                column_config={
-                    'flight_number': 'Nº Vuelo',
-                    'day_name': 'Día',
-                    'date': 'Fecha',
-                    'arrival_time': 'Llegada',
-                    'departure_time': 'Salida',
-                    'origin': 'Origen',
-                    'destination': 'Destino',
-                    'flight_type': 'Tipo Vuelo',
-                    'station': 'Estación',
-                    'aircraft_type': 'Tipo de Avión',
-                    'source_file': 'Archivo',
-                    'carrier': 'Compañía'
-                },
-                hide_index=True,
-                height=400
-            )
+            # Avisos y errores de la carga agrupados en un único informe
+            report_df = ingest_report(results)
+            errors_df = ingest_errors(results)
+            problem_files = (report_df['status'] != "ok").sum()
+            if problem_files or not errors_df.empty:
+                st.warning(
+                    f"{problem_files} archivo(s) con problemas y {len(errors_df)} fila(s) omitidas por errores."
+                )
+            with st.expander("Informe de carga"):
+                st.dataframe(
+                    report_df,
+                    column_config={
+                        'source_file': 'Archivo',
+                        'status': 'Estado',
+                        'flights': 'Vuelos',
+                        'row_errors': 'Filas con error',
+                        'message': 'Mensaje',
+                        'seconds': st.column_config.NumberColumn('Segundos', format="%.2f")
+                    },
+                    hide_index=True
+                )
+                if not errors_df.empty:
+                    st.dataframe(
+                        errors_df,
+                        column_config={'source_file': 'Archivo', 'row': 'Fila', 'error': 'Error'},
+                        hide_index=True
+                    )
            
-            st.write(f"Mostrando filas {start_idx + 1} a {end_idx} de {total_rows}")
+            # Vuelos por día de todas las reglas cargadas, fuera y dentro de la ventana, sin expandirlas
+            rule_set = RuleSet([r.rules for r in results])
+            if len(rule_set) > 0:
+                with st.expander("Vuelos por día de todas las reglas"):
+                    profiler.mark("resumen de reglas")
+                    first_date, last_date = rule_set.date_range()
+                    st.caption(
+                        f"{len(rule_set)} reglas del {first_date.strftime('%Y-%m-%d')} al {last_date.strftime('%Y-%m-%d')}; "
+                        f"{len(rule_set.overlapping(*query_window))} solapan la ventana de consulta."
+                    )
+                    rule_counts = rule_set.daily_counts(by='type')
+                    rule_counts['Tipo'] = rule_counts['type'].map({'A': 'Llegada', 'D': 'Salida'})
+                    st.plotly_chart(
+                        cached_daily_flights_line(rule_counts, "Vuelos por Día (todas las reglas)"),
+                        use_container_width=True
+                    )
            
-            csv = month_df.to_csv(index=False)
-            st.download_button(
-                label=f"Descargar CSV de {calendar.month_name[month]} ({title})",
-                data=csv,
-                file_name=f"horario_{title.lower()}_{month}.csv",
-                mime='text/csv'
-            )
- 
-# Configuración de la interfaz
-st.title(" Calendario de Vuelos ")
-st.write("Visualiza y filtra horarios de vuelos de múltiples estaciones por semana, día y hora.")
- 
-# Estado de la sesión
-if 'flights_df' not in st.session_state:
-    st.session_state.flights_df = pd.DataFrame()  # Inicializar como DataFrame vacío
- 
-# Cargar múltiples archivos
-uploaded_files = st.file_uploader("Carga tus archivos Excel", type=['xlsx'], accept_multiple_files=True, key="excel_uploader")
- 
-if uploaded_files:
-    try:
-        all_dfs = []
-        required_columns = ['A/D', 'fltno', 'departure_time', 'arrival_time', 'origin',
-                           'dest', 'STATION', 'weekday', 'from_date', 'until_date', 'flight_type', 'actypeadv', 'carrier']
-       
-        for uploaded_file in uploaded_files:
-            try:
-                df = pd.read_excel(uploaded_file)
-                if not all(col in df.columns for col in required_columns):
-                    st.warning(f"El archivo {uploaded_file.name} no contiene todas las columnas requeridas (incluyendo 'carrier').")
-                    continue
-               
-                file_df = expand_flight_dates(df, uploaded_file.name)
-                if not file_df.empty:
-                    all_dfs.append(file_df)
-                else:
-                    st.warning(f"No se generaron vuelos para el archivo {uploaded_file.name}.")
+            if not loaded_files and not (pending and job.running):
+                st.error("No se pudieron procesar los archivos cargados.")
            
-            except Exception as e:
-                st.warning(f"Error al procesar el archivo {uploaded_file.name}: {e}")
-                continue
-       
-        if not all_dfs:
-            st.error("No se pudieron procesar los archivos cargados.")
-            st.session_state.flights_df = pd.DataFrame()
+            # Conjunto compartido con las sesiones que cargan los mismos archivos; si sólo lo usa esta
+            # sesión, se actualiza añadiendo los archivos nuevos o modificados y quitando los eliminados
+            profiler.mark("actualizar conjunto")
+            st.session_state.dataset_handle = dataset_registry.acquire(loaded_files, st.session_state.dataset_handle)
+            st.session_state.store_key = None
+            if job is not None and job.finished:
+                # Los vuelos de la carga ya están en la caché y en el conjunto: la sesión no guarda otra copia
+                job.release()
+                if not job.cancelled:
+                    st.session_state.ingest_job = None
+        except Exception as e:
+            st.error(f"Error general al procesar los archivos: {e}")
+            st.session_state.dataset_handle = dataset_registry.acquire({}, st.session_state.dataset_handle)
+    else:
+        # Sin archivos cargados: abrir el almacén columnar si existe
+        store_partitions = list_partitions(store_path)
+        if store_partitions.empty:
+            st.info("Por favor, carga uno o más archivos de horarios para comenzar.")
         else:
-            # Combinar todos los DataFrames
-            st.session_state.flights_df = pd.concat(all_dfs, ignore_index=True)
-            flights_df = st.session_state.flights_df
-    except Exception as e:
-        st.error(f"Error general al procesar los archivos: {e}")
-        st.session_state.flights_df = pd.DataFrame()
-else:
-    st.info("Por favor, carga uno o más archivos Excel para comenzar.")
- 
-# Procesamiento de datos
-flights_df = st.session_state.flights_df
- 
-if len(flights_df) == 0:
-    st.warning("No se generaron vuelos a partir de los datos proporcionados.")
-else:
-    flights_df['date'] = pd.to_datetime(flights_df['date'])
-    flights_df['year'] = flights_df['date'].dt.year
-    flights_df['month'] = flights_df['date'].dt.month
-    flights_df['week'] = flights_df['date'].dt.isocalendar().week
-               
-    # Filtrar a partir de 2025
-    flights_df = flights_df[flights_df['date'] >= START_DATE_2025]
-               
-    if len(flights_df) == 0:
-        st.warning("No hay vuelos a partir de 2025.")
+            st.info("Mostrando datos del almacén de horarios. Carga archivos de horarios para reemplazarlos.")
+            col1, col2 = st.columns(2)
+            with col1:
+                store_stations = st.multiselect("Estaciones del almacén", options=sorted(store_partitions['station'].unique()), key="store_stations")
+            with col2:
+                store_periods = st.multiselect("Meses del almacén", options=sorted(store_partitions['period'].unique()), key="store_periods")
+            store_key = (store_path, store_version(store_path), tuple(store_stations), tuple(store_periods), query_window)
+            if store_out_of_core:
+                # Los vuelos se quedan en disco: se suelta el conjunto en memoria y se consulta por lotes
+                if st.session_state.store_key is not None:
+                    st.session_state.dataset_handle = dataset_registry.acquire({}, st.session_state.dataset_handle)
+                    st.session_state.store_key = None
+                store_query = StoreQuery(store_path, store_budget, *query_window)
+                store_filters = {'station': store_stations, 'period': store_periods}
+            elif st.session_state.store_key != store_key:
+                profiler.mark("lectura del almacén")
+                store_df = read_store(store_path, store_stations, store_periods)
+                in_window = store_df['date'] >= query_window[0]
+                if query_window[1] is not None:
+                    in_window &= store_df['date'] < query_window[1]
+                store_df = store_df[in_window]
+                st.session_state.dataset_handle = dataset_registry.acquire({
+                    source_file: (store_key, part)
+                    for source_file, part in store_df.groupby('source_file', observed=True)
+                }, st.session_state.dataset_handle)
+                st.session_state.store_key = store_key
+     
+    # Guardar los vuelos cargados en el almacén
+    if uploaded_files and len(st.session_state.dataset_handle.dataset) > 0:
+        if st.sidebar.button("Guardar en almacén", key="store_save"):
+            write_store(st.session_state.dataset_handle.dataset.flights, store_path)
+            st.sidebar.success(f"Vuelos guardados en {store_path}.")
+     
+    # Procesamiento de datos
+    profiler.mark("filtros")
+    dataset = st.session_state.dataset_handle.dataset
+     
+    if store_query is not None:
+        render_store_query(store_query, store_filters)
+    elif not dataset.keys:
+        st.warning("No se generaron vuelos a partir de los datos proporcionados.")
     else:
-        # Filtros generales
-        st.subheader("Filtros Generales")
-        col1, col2, col3, col4, col5, col6 = st.columns(6)
-        with col1:
-            stations = st.multiselect("Estación", options=sorted(flights_df['station'].unique()), key="stations")
-        with col2:
-            flight_types = st.multiselect("Tipo de vuelo", options=sorted(flights_df['flight_type'].unique()), key="flight_types")
-        with col3:
-            dates = st.multiselect("Fechas", options=sorted(flights_df['date'].dt.strftime('%Y-%m-%d').unique()), key="dates")
-        with col4:
-            sources = st.multiselect("Archivo", options=sorted(flights_df['source_file'].unique()), key="sources")
-        with col5:
-            carriers = st.multiselect("Compañía", options=sorted(flights_df['carrier'].unique()), key="carriers")
-        with col6:
-            aircraft_types = st.multiselect("Tipo de Avión", options=sorted(flights_df['aircraft_type'].unique()), key="aircraft_types")
+        # Vuelos de la ventana de consulta con columnas derivadas, cubo de conteos e índice de filtros (mantenidos por archivo)
+        flights_df = dataset.flights
+        flights_cube = dataset.cube
+        flights_index = dataset.index
                    
-        # Aplicar filtros
-        filtered_df = flights_df
-        if stations:
-            filtered_df = filtered_df[filtered_df['station'].isin(stations)]
-        if flight_types:
-            filtered_df = filtered_df[filtered_df['flight_type'].isin(flight_types)]
-        if dates:
-            filtered_df = filtered_df[filtered_df['date'].dt.strftime('%Y-%m-%d').isin(dates)]
-        if sources:
-            filtered_df = filtered_df[filtered_df['source_file'].isin(sources)]
-        if carriers:
-            filtered_df = filtered_df[filtered_df['carrier'].isin(carriers)]
-        if aircraft_types:
-            filtered_df = filtered_df[filtered_df['aircraft_type'].isin(aircraft_types)]
-                   
-        # Dashboard Semanal
-        st.subheader("Dashboard Semanal")
-        months = filtered_df[['year', 'month']].drop_duplicates().reset_index(drop=True)
-        months['month_name'] = months.apply(lambda x: f"{calendar.month_name[x['month']]} {x['year']}", axis=1)
-        month_options = sorted(months['month_name'].tolist())
-                   
-        if not month_options:
-            st.warning("No hay datos disponibles para los filtros seleccionados.")
+        if len(flights_df) == 0:
+            st.warning("No hay vuelos en la ventana de consulta.")
         else:
-            selected_month = st.selectbox("Selecciona un mes", options=month_options, key="month_select")
-            selected_year = int(selected_month.split()[-1])
-            selected_month_num = list(calendar.month_name).index(selected_month.split()[0])
+            # Filtros generales
+            st.subheader("Filtros Generales")
+            col1, col2, col3, col4, col5, col6 = st.columns(6)
+            with col1:
+                stations = st.multiselect("Estación", options=flights_index.options('station'), key="stations")
+            with col2:
+                flight_types = st.multiselect("Tipo de vuelo", options=flights_index.options('flight_type'), key="flight_types")
+            with col3:
+                dates = st.multiselect("Fechas", options=flights_index.options('date'), key="dates")
+            with col4:
+                sources = st.multiselect("Archivo", options=flights_index.options('source_file'), key="sources")
+            with col5:
+                carriers = st.multiselect("Compañía", options=flights_index.options('carrier'), key="carriers")
+            with col6:
+                aircraft_types = st.multiselect("Tipo de Avión", options=flights_index.options('aircraft_type'), key="aircraft_types")
+            unique_operations = st.checkbox(
+                "Contar operaciones únicas (una sola copia de los vuelos repetidos entre archivos)", key="unique_operations"
+            )
+                       
+            # Aplicar filtros
+            general_filters = {
+                'station': stations,
+                'flight_type': flight_types,
+                'date': dates,
+                'source_file': sources,
+                'carrier': carriers,
+                'aircraft_type': aircraft_types
+            }
+            filter_mask = flights_index.mask(general_filters)
+            if unique_operations:
+                # La llegada de una estación y la salida de la de origen cuentan como una sola operación
+                profiler.mark("operaciones únicas")
+                filter_mask, flights_cube = dataset.unique_operations(filter_mask)
+            filtered_cube = apply_filters(flights_cube, general_filters)
+           
+            # Operaciones repetidas entre archivos: exactas o con datos en conflicto
+            with st.expander("Duplicados entre archivos"):
+                profiler.mark("duplicados")
+                duplicates_summary = dataset.operations.summary()
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Operaciones únicas", duplicates_summary['operations'])
+                col2.metric("Filas repetidas", duplicates_summary['duplicated_rows'])
+                col3.metric("Duplicados exactos", duplicates_summary['exact_operations'])
+                col4.metric("Duplicados en conflicto", duplicates_summary['conflicting_operations'])
+                if duplicates_summary['conflicting_operations']:
+                    conflicts_df = dataset.operations.report(flights_df, conflicts_only=True)
+                    st.dataframe(
+                        conflicts_df,
+                        column_config={
+                            'carrier': 'Compañía',
+                            'flight_number': 'Vuelo',
+                            'date': st.column_config.DateColumn('Fecha', format="YYYY-MM-DD"),
+                            'origin': 'Origen',
+                            'destination': 'Destino',
+                            'source_file': 'Archivo',
+                            'station': 'Estación',
+                            'type': 'Tipo',
+                            'status': 'Estado',
+                            'conflicts': 'Columnas en conflicto'
+                        },
+                        hide_index=True,
+                        use_container_width=True
+                    )
+                    render_download(conflicts_df, "duplicados en conflicto", "duplicados_conflicto", "duplicates")
                        
-            month_df = filtered_df[(filtered_df['year'] == selected_year) & (filtered_df['month'] == selected_month_num)]
+            # Dashboard Semanal
+            profiler.mark("tabla semanal")
+            st.subheader("Dashboard Semanal")
+            months = filtered_cube[['year', 'month']].drop_duplicates().reset_index(drop=True)
+            months['month_name'] = months.apply(lambda x: f"{calendar.month_name[x['month']]} {x['year']}", axis=1)
+            month_options = sorted(months['month_name'].tolist())
                        
-            if len(month_df) == 0:
-                st.warning("No hay vuelos para el mes seleccionado.")
+            if not month_options:
+                st.warning("No hay datos disponibles para los filtros seleccionados.")
             else:
-                weeks = sorted(month_df['week'].unique())
-                week_options = [
-                    f"Semana {w} ({month_df[month_df['week'] == w]['date'].min().strftime('%Y-%m-%d')} - "
-                    f"{month_df[month_df['week'] == w]['date'].max().strftime('%Y-%m-%d')})"
-                    for w in weeks
-                ]
+                selected_month = st.selectbox("Selecciona un mes", options=month_options, key="month_select")
+                selected_year = int(selected_month.split()[-1])
+                selected_month_num = list(calendar.month_name).index(selected_month.split()[0])
                            
-                selected_week = st.selectbox("Selecciona una semana", options=week_options, key="week_select")
-                selected_week_number = int(selected_week.split()[1])
+                month_cube = filtered_cube[(filtered_cube['year'] == selected_year) & (filtered_cube['month'] == selected_month_num)]
                            
-                week_df = month_df[month_df['week'] == selected_week_number]
-                           
-                if len(week_df) == 0:
-                    st.warning("No hay vuelos para la semana seleccionada.")
+                if len(month_cube) == 0:
+                    st.warning("No hay vuelos para el mes seleccionado.")
                 else:
-                    # Tabla del dashboard semanal
-                    days = sorted(week_df['date'].dt.strftime('%Y-%m-%d').unique())
-                    flight_types_unique = sorted(week_df['flight_type'].unique())
-                    aircraft_types_unique = sorted(week_df['aircraft_type'].unique())
-                               
-                    data = []
-                    for ftype in flight_types_unique + aircraft_types_unique:
-                        row = {'Tipo': ftype}
-                        for day in days:
-                            if ftype in flight_types_unique:
-                                count = len(week_df[(week_df['date'].dt.strftime('%Y-%m-%d') == day) &
-                                                   (week_df['flight_type'] == ftype)])
-                            else:
-                                count = len(week_df[(week_df['date'].dt.strftime('%Y-%m-%d') == day) &
-                                                   (week_df['aircraft_type'] == ftype)])
-                            row[day[-5:]] = count if count > 0 else '-'
-                        data.append(row)
-                               
-                    st.dataframe(
-                        pd.DataFrame(data),
-                        use_container_width=True,
-                        column_config={'Tipo': st.column_config.TextColumn('Tipo', width="medium")}
-                    )
-                               
-                    # Gráfico de resumen semanal (con paleta de alto contraste)
-                    aircraft_counts = week_df['aircraft_type'].value_counts().reset_index()
-                    aircraft_counts.columns = ['aircraft_type', 'count']
-                    # Calcular el porcentaje
-                    total_flights = aircraft_counts['count'].sum()
-                    aircraft_counts['percentage'] = (aircraft_counts['count'] / total_flights * 100).round(2)
-                    # Ordenar por conteo descendente
-                    aircraft_counts = aircraft_counts.sort_values('count', ascending=False)
-                               
-                    # Crear el gráfico
-                    fig = px.bar(
-                        aircraft_counts,
-                        x='aircraft_type',
-                        y='count',
-                        title=f"Total por Tipo de Avión (Semana {selected_week_number}: "
-                              f"{week_df['date'].min().strftime('%Y-%m-%d')} - "
-                              f"{week_df['date'].max().strftime('%Y-%m-%d')})",
-                        color='aircraft_type',
-                        color_discrete_sequence=px.colors.qualitative.Plotly,
-                        text='count',
-                        hover_data={'count': True, 'percentage': ':.2f%'}
-                    )
-                    # Personalizar el diseño
-                    fig.update_layout(
-                        xaxis_title="Tipo de Avión",
-                        yaxis_title="Número de Vuelos",
-                        showlegend=True,
-                        font=dict(family="Montserrat, Arial, sans-serif", size=12),
-                        plot_bgcolor="white",
-                        paper_bgcolor="white",
-                        xaxis_tickangle=45,
-                        margin=dict(l=50, r=50, t=100, b=100),
-                        yaxis=dict(gridcolor="lightgray"),
-                        hoverlabel=dict(bgcolor="white", font_size=12)
-                    )
-                    fig.update_traces(
-                        textposition='auto',
-                        textfont=dict(size=12, color="black")
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                               
-                    # Gráfico: Distribución día a día por tipo de avión (con paleta de alto contraste)
-                    # Generar todos los días de la semana seleccionada
-                    week_start = week_df['date'].min()
-                    week_end = week_df['date'].max()
-                    week_days = pd.date_range(start=week_start, end=week_end, freq='D')
-                    all_days_df = pd.DataFrame({'date': week_days})
-                    all_days_df['day_label'] = all_days_df['date'].apply(
-                        lambda x: f"{calendar.day_name[x.weekday()]} {x.strftime('%Y-%m-%d')}"
-                    )
-                   
-                    # Obtener conteos por día y tipo de avión
-                    daily_aircraft_counts = week_df.groupby(['date', 'aircraft_type']).size().reset_index(name='count')
-                   
-                    # Crear DataFrame con todas las combinaciones de días y tipos de avión
-                    all_combinations = pd.DataFrame(
-                        [(d, a) for d in week_days for a in aircraft_types_unique],
-                        columns=['date', 'aircraft_type']
-                    )
-                   
-                    # Unir con los conteos, rellenando con 0 donde no hay datos
-                    daily_aircraft_counts = all_combinations.merge(
-                        daily_aircraft_counts,
-                        on=['date', 'aircraft_type'],
-                        how='left'
-                    ).fillna({'count': 0})
-                    daily_aircraft_counts['count'] = daily_aircraft_counts['count'].astype(int)
-                    daily_aircraft_counts['day_label'] = daily_aircraft_counts['date'].apply(
-                        lambda x: f"{calendar.day_name[x.weekday()]} {x.strftime('%Y-%m-%d')}"
-                    )
-                   
-                    # Mostrar tabla de depuración para verificar datos
-                    st.subheader("Datos para el Gráfico (Depuración)")
-                    st.dataframe(
-                        daily_aircraft_counts[['day_label', 'aircraft_type', 'count']],
-                        column_config={
-                            'day_label': 'Día',
-                            'aircraft_type': 'Tipo de Avión',
-                            'count': 'Número de Vuelos'
-                        },
-                        hide_index=True
-                    )
-                   
-                    # Crear el gráfico lineal
-                    fig_daily = px.line(
-                        daily_aircraft_counts,
-                        x='day_label',
-                        y='count',
-                        color='aircraft_type',
-                        title=f"Distribución de Vuelos por Día y Tipo de Avión (Semana {selected_week_number}: "
-                              f"{week_df['date'].min().strftime('%Y-%m-%d')} - "
-                              f"{week_df['date'].max().strftime('%Y-%m-%d')})",
-                        markers=True,
-                        color_discrete_sequence=px.colors.qualitative.Plotly,
-                        hover_data={'count': True, 'aircraft_type': True}
-                    )
-                    fig_daily.update_layout(
-                        xaxis_title="Día de la Semana",
-                        yaxis_title="Número de Vuelos",
-                        showlegend=True,
-                        font=dict(family="Montserrat, Arial, sans-serif", size=12),
-                        plot_bgcolor="white",
-                        paper_bgcolor="white",
-                        xaxis_tickangle=45,
-                        margin=dict(l=50, r=50, t=100, b=100),
-                        yaxis=dict(gridcolor="lightgray"),
-                        hoverlabel=dict(bgcolor="white", font_size=12),
-                        xaxis=dict(
-                            categoryorder='array',
-                            categoryarray=[
-                                f"{calendar.day_name[d.weekday()]} {d.strftime('%Y-%m-%d')}"
-                                for d in week_days
-                            ]
-                        )
-                    )
-                    fig_daily.update_traces(
-                        mode='lines+markers+text',
-                        line=dict(width=4),
-                        marker=dict(size=12),
-                        text=daily_aircraft_counts['count'].where(daily_aircraft_counts['count'] > 0),
-                        textposition='top center',
-                        textfont=dict(size=12, color="black")
-                    )
-                    st.plotly_chart(fig_daily, use_container_width=True)
-                               
-                    # Dashboard Diario
-                    st.subheader("Dashboard Diario")
-                    day_options = [
-                        f"{calendar.day_name[pd.to_datetime(day).weekday()]} {day}"
-                        for day in sorted(week_df['date'].dt.strftime('%Y-%m-%d').unique())
+                    week_bounds = month_cube.groupby('week')['date'].agg(['min', 'max'])
+                    week_options = [
+                        f"Semana {w} ({bounds['min'].strftime('%Y-%m-%d')} - {bounds['max'].strftime('%Y-%m-%d')})"
+                        for w, bounds in week_bounds.iterrows()
                     ]
                                
-                    selected_day = st.selectbox("Selecciona un día", options=day_options, key="day_select")
-                    selected_day_date = selected_day.split()[-1]
+                    selected_week = st.selectbox("Selecciona una semana", options=week_options, key="week_select")
+                    selected_week_number = int(selected_week.split()[1])
                                
-                    day_df = week_df[week_df['date'].dt.strftime('%Y-%m-%d') == selected_day_date]
+                    week_cube = month_cube[month_cube['week'] == selected_week_number]
                                
-                    if len(day_df) == 0:
-                        st.warning("No hay vuelos para el día seleccionado.")
+                    if len(week_cube) == 0:
+                        st.warning("No hay vuelos para la semana seleccionada.")
                     else:
-                        # Tabla del dashboard diario
-                        data_day = []
-                        for ftype in flight_types_unique + aircraft_types_unique:
-                            row = {'Tipo': ftype}
-                            if ftype in flight_types_unique:
-                                count = len(day_df[day_df['flight_type'] == ftype])
-                            else:
-                                count = len(day_df[day_df['aircraft_type'] == ftype])
-                            row['Vuelos'] = count if count > 0 else '-'
-                            data_day.append(row)
+                        # Tabla del dashboard semanal
+                        flight_types_unique = sorted(week_cube['flight_type'].unique())
+                        aircraft_types_unique = sorted(week_cube['aircraft_type'].unique())
+                        week_start = week_cube['date'].min()
+                        week_end = week_cube['date'].max()
                                    
                         st.dataframe(
-                            pd.DataFrame(data_day),
+                            weekly_table(week_cube, flight_types_unique, aircraft_types_unique),
                             use_container_width=True,
-                            column_config={
-                                'Tipo': st.column_config.TextColumn('Tipo', width="medium"),
-                                'Vuelos': st.column_config.TextColumn('Vuelos')
-                            }
+                            column_config={'Tipo': st.column_config.TextColumn('Tipo', width="medium")}
                         )
                                    
-                        # Gráfico de resumen diario (con paleta de alto contraste)
-                        aircraft_counts_day = day_df['aircraft_type'].value_counts().reset_index()
-                        aircraft_counts_day.columns = ['aircraft_type', 'count']
-                        # Calcular el porcentaje
-                        total_flights_day = aircraft_counts_day['count'].sum()
-                        aircraft_counts_day['percentage'] = (aircraft_counts_day['count'] / total_flights_day * 100).round(2)
-                        # Ordenar por conteo descendente
-                        aircraft_counts_day = aircraft_counts_day.sort_values('count', ascending=False)
+                        # Gráfico de resumen semanal (con paleta de alto contraste)
+                        profiler.mark("gráfico semanal")
+                        aircraft_counts = count_by_aircraft(week_cube)
                                    
-                        fig_day = px.bar(
-                            aircraft_counts_day,
-                            x='aircraft_type',
-                            y='count',
-                            title=f"Total por Tipo de Avión ({selected_day})",
-                            color='aircraft_type',
-                            color_discrete_sequence=px.colors.qualitative.Plotly,
-                            text='count',
-                            hover_data={'count': True, 'percentage': ':.2f%'}
-                        )
-                        # Personalizar el diseño
-                        fig_day.update_layout(
-                            xaxis_title="Tipo de Avión",
-                            yaxis_title="Número de Vuelos",
-                            showlegend=True,
-                            font=dict(family="Montserrat, Arial, sans-serif", size=12),
-                            plot_bgcolor="white",
-                            paper_bgcolor="white",
-                            xaxis_tickangle=45,
-                            margin=dict(l=50, r=50, t=100, b=100),
-                            yaxis=dict(gridcolor="lightgray"),
-                            hoverlabel=dict(bgcolor="white", font_size=12)
-                        )
-                        fig_day.update_traces(
-                            textposition='auto',
-                            textfont=dict(size=12, color="black")
+                        st.plotly_chart(
+                            cached_aircraft_bar(
+                                aircraft_counts,
+                                f"Total por Tipo de Avión (Semana {selected_week_number}: "
+                                f"{week_start.strftime('%Y-%m-%d')} - "
+                                f"{week_end.strftime('%Y-%m-%d')})"
+                            ),
+                            use_container_width=True
                         )
-                        st.plotly_chart(fig_day, use_container_width=True)
                                    
-                        # Visualización adicional 1: Tabla detallada de vuelos por día
-                        st.subheader(f"Vuelos Detallados - {selected_day}")
-                        day_detail_df = day_df.sort_values(['arrival_time', 'departure_time'])
+                        # Gráfico: Distribución día a día por tipo de avión (con paleta de alto contraste)
+                        # Generar todos los días de la semana seleccionada
+                        profiler.mark("gráfico por día")
+                        week_days = pd.date_range(start=week_start, end=week_end, freq='D')
+                       
+                        # Conteos por día y tipo de avión, con 0 donde no hay datos
+                        daily_aircraft_counts = count_by_day_and_aircraft(week_cube, week_days, aircraft_types_unique)
+                       
+                        # Mostrar tabla de depuración para verificar datos
+                        st.subheader("Datos para el Gráfico (Depuración)")
                         st.dataframe(
-                            day_detail_df[[
-                                'flight_number', 'day_name', 'date', 'arrival_time', 'departure_time',
-                                'origin', 'destination', 'flight_type', 'station', 'aircraft_type', 'carrier', 'source_file'
-                            ]],
+                            daily_aircraft_counts[['day_label', 'aircraft_type', 'count']],
                             column_config={
-                                'flight_number': 'Nº Vuelo',
-                                'day_name': 'Día',
-                                'date': 'Fecha',
-                                'arrival_time': 'Llegada',
-                                'departure_time': 'Salida',
-                                'origin': 'Origen',
-                                'destination': 'Destino',
-                                'flight_type': 'Tipo Vuelo',
-                                'station': 'Estación',
+                                'day_label': 'Día',
                                 'aircraft_type': 'Tipo de Avión',
-                                'carrier': 'Compañía',
-                                'source_file': 'Archivo'
+                                'count': 'Número de Vuelos'
                             },
-                            hide_index=True,
+                            hide_index=True
+                        )
+                       
+                        # Crear el gráfico lineal
+                        st.plotly_chart(
+                            cached_daily_aircraft_line(
+                                daily_aircraft_counts,
+                                f"Distribución de Vuelos por Día y Tipo de Avión (Semana {selected_week_number}: "
+                                f"{week_start.strftime('%Y-%m-%d')} - "
+                                f"{week_end.strftime('%Y-%m-%d')})",
+                                [day_label(d) for d in week_days]
+                            ),
                             use_container_width=True
                         )
                                    
-                        # Descargar CSV de vuelos diarios
-                        csv_day = day_detail_df.to_csv(index=False)
-                        st.download_button(
-                            label=f"Descargar CSV de Vuelos ({selected_day})",
-                            data=csv_day,
-                            file_name=f"vuelos_{selected_day_date}.csv",
-                            mime='text/csv'
-                        )
+                        # Dashboard Diario
+                        profiler.mark("tabla diaria")
+                        st.subheader("Dashboard Diario")
+                        day_options = [day_label(day) for day in sorted(week_cube['date'].unique())]
+                                   
+                        selected_day = st.selectbox("Selecciona un día", options=day_options, key="day_select")
+                        selected_day_date = selected_day.split()[-1]
                                    
-                        # Visualización adicional 2: Distribución horaria (con paleta de alto contraste)
-                        st.subheader(f"Distribución Horaria - {selected_day}")
-                        hourly_data = []
-                        for _, row in day_df.iterrows():
-                            if row['type'] == 'A' and row['arrival_time'] != 'N/A':
-                                time = parse_time(row['arrival_time'])
-                                if time:
-                                    hourly_data.append({'Hora': time.hour, 'Tipo': 'Llegada'})
-                            elif row['type'] == 'D' and row['departure_time'] != 'N/A':
-                                time = parse_time(row['departure_time'])
-                                if time:
-                                    hourly_data.append({'Hora': time.hour, 'Tipo': 'Salida'})
+                        day_start = pd.Timestamp(selected_day_date)
+                        day_end = day_start + pd.Timedelta(days=1)
+                        day_cube = week_cube[(week_cube['date'] >= day_start) & (week_cube['date'] < day_end)]
                                    
-                        if hourly_data:
-                            hourly_df = pd.DataFrame(hourly_data)
-                            # Asegurar que todas las horas (0-23) estén presentes
-                            all_hours = pd.DataFrame({'Hora': range(24)})
-                            hourly_counts = hourly_df.groupby(['Hora', 'Tipo']).size().unstack(fill_value=0).reset_index()
-                            hourly_counts = all_hours.merge(hourly_counts, on='Hora', how='left').fillna(0)
-                            hourly_counts = hourly_counts.melt(id_vars='Hora', value_vars=['Llegada', 'Salida'],
-                                                             var_name='Tipo', value_name='count')
+                        if len(day_cube) == 0:
+                            st.warning("No hay vuelos para el día seleccionado.")
+                        else:
+                            # Tabla del dashboard diario
+                            st.dataframe(
+                                daily_table(day_cube, flight_types_unique, aircraft_types_unique),
+                                use_container_width=True,
+                                column_config={
+                                    'Tipo': st.column_config.TextColumn('Tipo', width="medium"),
+                                    'Vuelos': st.column_config.TextColumn('Vuelos')
+                                }
+                            )
+                                       
+                            # Gráfico de resumen diario (con paleta de alto contraste)
+                            profiler.mark("gráfico diario")
+                            aircraft_counts_day = count_by_aircraft(day_cube)
                                        
-                            fig_hourly = px.bar(
-                                hourly_counts,
-                                x='Hora',
-                                y='count',
-                                color='Tipo',
-                                title=f"Distribución de Vuelos por Hora ({selected_day})",
-                                barmode='stack',
-                                color_discrete_sequence=px.colors.qualitative.Plotly[:2],
-                                text='count',
-                                hover_data={'count': True}
+                            st.plotly_chart(
+                                cached_aircraft_bar(aircraft_counts_day, f"Total por Tipo de Avión ({selected_day})"),
+                                use_container_width=True
                             )
-                            fig_hourly.update_layout(
-                                xaxis_title="Hora del Día",
-                                yaxis_title="Número de Vuelos",
-                                showlegend=True,
-                                font=dict(family="Montserrat, Arial, sans-serif", size=12),
-                                plot_bgcolor="white",
-                                paper_bgcolor="white",
-                                xaxis=dict(tickmode='linear', tick0=0, dtick=1, range=[-0.5, 23.5]),
-                                margin=dict(l=50, r=50, t=100, b=100),
-                                yaxis=dict(gridcolor="lightgray"),
-                                hoverlabel=dict(bgcolor="white", font_size=12)
+                                       
+                            # Visualización adicional 1: Tabla detallada de vuelos por día
+                            profiler.mark("vuelos del día")
+                            st.subheader(f"Vuelos Detallados - {selected_day}")
+                            day_rows = dataset.grid.date_rows(day_start, day_end, filter_mask)
+                            day_detail_df = dataset.grid.take(day_rows).sort_values(['arrival_time', 'departure_time'])
+                            st.dataframe(
+                                to_display(day_detail_df[[
+                                    'flight_number', 'day_name', 'date', 'arrival_time', 'departure_time',
+                                    'origin', 'destination', 'flight_type', 'station', 'aircraft_type', 'carrier', 'source_file'
+                                ]]),
+                                column_config=FLIGHT_COLUMN_LABELS,
+                                hide_index=True,
+                                use_container_width=True
                             )
-                            fig_hourly.update_traces(
-                                textposition='auto',
-                                textfont=dict(size=12, color="black")
+                                       
+                            # Descargar vuelos diarios
+                            render_download(
+                                day_detail_df,
+                                f"Vuelos ({selected_day})",
+                                f"vuelos_{selected_day_date}",
+                                "day_export"
                             )
-                            st.plotly_chart(fig_hourly, use_container_width=True)
-                        else:
-                            st.info("No hay datos horarios disponibles para el día seleccionado.")
-                   
-        # Detalles de vuelos
-        st.subheader("Detalles de Vuelos")
-        view_tabs = st.tabs(["Llegadas", "Salidas"])
-                   
-        with view_tabs[0]:
-            render_flight_table(
-                filtered_df[filtered_df['type'] == 'A'],
-                "Llegadas",
-                ['flight_number', 'day_name', 'date', 'arrival_time', 'origin', 'destination',
-                 'flight_type', 'station', 'aircraft_type', 'carrier', 'source_file'],
-                "arr"
-            )
-                   
-        with view_tabs[1]:
-            render_flight_table(
-                filtered_df[filtered_df['type'] == 'D'],
-                "Salidas",
-                ['flight_number', 'day_name', 'date', 'departure_time', 'origin', 'destination',
-                 'flight_type', 'station', 'aircraft_type', 'carrier', 'source_file'],
-                "dep"
-            )
\ No newline at end of file
+                                       
+                            # Visualización adicional 2: Distribución horaria (con paleta de alto contraste)
+                            profiler.mark("distribución horaria")
+                            st.subheader("Distribución Horaria")
+                            col_range, col_bucket, col_value = st.columns(3)
+                            with col_range:
+                                hourly_range = st.selectbox(
+                                    "Rango", ["Día seleccionado", "Semana seleccionada", "Fechas"], key="hourly_range"
+                                )
+                            with col_bucket:
+                                bucket_minutes = st.selectbox(
+                                    "Franja (minutos)", TIME_BUCKETS, index=len(TIME_BUCKETS) - 1, key="hourly_bucket"
+                                )
+                            with col_value:
+                                hourly_value = st.radio("Valor", ["Total", "Media por día"], horizontal=True, key="hourly_value")
+                                       
+                            if hourly_range == "Día seleccionado":
+                                range_start, range_end = day_start, day_end
+                                range_label = selected_day
+                            elif hourly_range == "Semana seleccionada":
+                                range_start, range_end = week_start, week_end + pd.Timedelta(days=1)
+                                range_label = f"Semana {selected_week_number}"
+                            else:
+                                # Siete días desde el día seleccionado, recortados a las fechas cargadas
+                                min_date = flights_df['date'].min()
+                                max_date = flights_df['date'].max()
+                                default_start = max(day_start, min_date)
+                                default_end = min(max(day_start + pd.Timedelta(days=6), default_start), max_date)
+                                selected_range = st.date_input(
+                                    "Fechas",
+                                    value=(default_start.date(), default_end.date()),
+                                    min_value=min_date.date(),
+                                    max_value=max_date.date(),
+                                    key="hourly_dates"
+                                )
+                                # Mientras sólo se ha elegido la primera fecha, el rango es ese día; sin
+                                # ninguna (el campo vaciado), el rango por defecto
+                                if not selected_range:
+                                    selected_range = (default_start.date(), default_end.date())
+                                range_start = pd.Timestamp(selected_range[0])
+                                range_end = pd.Timestamp(selected_range[-1]) + pd.Timedelta(days=1)
+                                range_label = f"{range_start.strftime('%Y-%m-%d')} - {(range_end - pd.Timedelta(days=1)).strftime('%Y-%m-%d')}"
+                            range_days = (range_end - range_start).days
+                                       
+                            # Llegadas y salidas por franja en una sola pasada sobre los minutos del rango
+                            range_rows = dataset.grid.date_rows(range_start, range_end, filter_mask)
+                            event_minutes, event_arrivals = dataset.grid.event_minutes(range_rows)
+                            bucket_counts = count_by_time_bucket(event_minutes, event_arrivals, bucket_minutes, range_days)
+                                       
+                            if bucket_counts['count'].sum() > 0:
+                                per_day = hourly_value == "Media por día"
+                                st.plotly_chart(
+                                    cached_time_bucket_bar(
+                                        bucket_counts,
+                                        f"Distribución de Vuelos por Franja de {bucket_minutes} min ({range_label})",
+                                        'daily_mean' if per_day else 'count',
+                                        "Vuelos por Día (media)" if per_day else "Número de Vuelos"
+                                    ),
+                                    use_container_width=True
+                                )
+                            else:
+                                st.info("No hay datos horarios disponibles para el rango seleccionado.")
+                                       
+                            # Ocupación en tierra: aeronaves simultáneas por estación en la semana seleccionada
+                            profiler.mark("ocupación en tierra")
+                            st.subheader("Ocupación en Tierra")
+                            col_capacity, col_rotation = st.columns(2)
+                            with col_capacity:
+                                stand_capacity = st.number_input(
+                                    "Capacidad (puestos, 0 = sin límite)", min_value=0, value=0, step=1, key="stand_capacity"
+                                )
+                            with col_rotation:
+                                by_rotation = st.checkbox(
+                                    "Emparejar por rotación (nº de vuelo par/impar)", value=True, key="occupancy_rotation"
+                                )
+                            week_rows = dataset.grid.take(
+                                dataset.grid.date_rows(week_start, week_end + pd.Timedelta(days=1), filter_mask)
+                            )
+                            occupancy_df = daily_occupancy(week_rows, stand_capacity or None, by_rotation)
+                            st.dataframe(
+                                occupancy_df,
+                                column_config={
+                                    'station': 'Estación',
+                                    'date': st.column_config.DateColumn('Fecha', format="YYYY-MM-DD"),
+                                    'arrivals': 'Llegadas',
+                                    'departures': 'Salidas',
+                                    'based': 'En tierra al inicio',
+                                    'overnight': 'En tierra al final',
+                                    'peak': 'Pico',
+                                    'peak_time': 'Hora del pico',
+                                    'p50': 'P50',
+                                    'p90': 'P90',
+                                    'p95': 'P95',
+                                    'minutes_above_capacity': 'Minutos sobre capacidad'
+                                },
+                                hide_index=True,
+                                use_container_width=True
+                            )
+                            day_timeline = occupancy_timeline(week_rows[week_rows['date'] == day_start], by_rotation)
+                            if len(day_timeline) > 0:
+                                st.plotly_chart(
+                                    cached_occupancy_step(
+                                        day_timeline, f"Aeronaves en Tierra ({selected_day})", stand_capacity or None
+                                    ),
+                                    use_container_width=True
+                                )
+                       
+            # Detalles de vuelos
+            st.subheader("Detalles de Vuelos")
+            view_tabs = st.tabs(["Llegadas", "Salidas", "Buscar"])
+                       
+            with view_tabs[0]:
+                profiler.mark("llegadas")
+                render_flight_table(
+                    dataset.grid,
+                    filtered_cube,
+                    filter_mask,
+                    'A',
+                    "Llegadas",
+                    ['flight_number', 'day_name', 'date', 'arrival_time', 'origin', 'destination',
+                     'flight_type', 'station', 'aircraft_type', 'carrier', 'source_file'],
+                    "arr"
+                )
+                       
+            with view_tabs[1]:
+                profiler.mark("salidas")
+                render_flight_table(
+                    dataset.grid,
+                    filtered_cube,
+                    filter_mask,
+                    'D',
+                    "Salidas",
+                    ['flight_number', 'day_name', 'date', 'departure_time', 'origin', 'destination',
+                     'flight_type', 'station', 'aircraft_type', 'carrier', 'source_file'],
+                    "dep"
+                )
+                       
+            with view_tabs[2]:
+                profiler.mark("búsqueda")
+                render_flight_search(
+                    dataset,
+                    filter_mask,
+                    ['flight_number', 'type', 'day_name', 'date', 'arrival_time', 'departure_time', 'origin',
+                     'destination', 'flight_type', 'station', 'aircraft_type', 'carrier', 'source_file'],
+                    "search"
+                )
+     
+    # Comparación de dos versiones de un horario, sobre sus reglas sin expandir
+    with st.expander("Comparar versiones de un horario"):
+        col_old, col_new = st.columns(2)
+        with col_old:
+            old_version = st.file_uploader("Versión anterior", type=UPLOAD_TYPES, key="diff_old")
+        with col_new:
+            new_version = st.file_uploader("Versión nueva", type=UPLOAD_TYPES, key="diff_new")
+        if old_version is not None and new_version is not None:
+            profiler.mark("comparación de versiones")
+            try:
+                schedule_diff = cached_diff_schedules(
+                    old_version.getvalue(), old_version.name, new_version.getvalue(), new_version.name
+                )
+            except Exception as e:
+                st.error(f"No se pudieron comparar las versiones: {e}")
+            else:
+                changes_df = schedule_diff.operations
+                status_counts = changes_df['status'].value_counts()
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Operaciones nuevas", int(status_counts.get('nueva', 0)))
+                col2.metric("Operaciones canceladas", int(status_counts.get('cancelada', 0)))
+                col3.metric("Operaciones modificadas", int(status_counts.get('modificada', 0)))
+                col4.metric(
+                    "Diferencia de vuelos",
+                    int(changes_df['ops_after'].sum() - changes_df['ops_before'].sum()),
+                    help="Diferencia de vuelo-días de las operaciones con cambios."
+                )
+                if changes_df.empty:
+                    st.success("Las dos versiones programan los mismos vuelos.")
+                else:
+                    st.markdown("**Operaciones con cambios**")
+                    st.dataframe(
+                        changes_df,
+                        column_config={
+                            'station': 'Estación',
+                            'type': 'Tipo',
+                            'carrier': 'Compañía',
+                            'flight_number': 'Vuelo',
+                            'status': 'Estado',
+                            'changes': 'Cambios',
+                            'ops_before': 'Vuelos antes',
+                            'ops_after': 'Vuelos después',
+                            'added': 'Días añadidos',
+                            'cancelled': 'Días cancelados',
+                            'changed': 'Días cambiados',
+                            'time_before': 'Hora antes',
+                            'time_after': 'Hora después',
+                            'aircraft_before': 'Avión antes',
+                            'aircraft_after': 'Avión después'
+                        },
+                        hide_index=True,
+                        use_container_width=True
+                    )
+                    render_download(changes_df, "cambios", "cambios_horario", "diff_operations")
+                    st.markdown("**Impacto por semana y estación**")
+                    st.dataframe(
+                        schedule_diff.impact,
+                        column_config={
+                            'station': 'Estación',
+                            'week': st.column_config.DateColumn('Semana', format="YYYY-MM-DD"),
+                            'ops_before': 'Vuelos antes',
+                            'ops_after': 'Vuelos después',
+                            'added': 'Añadidos',
+                            'cancelled': 'Cancelados',
+                            'changed': 'Cambiados',
+                            'net': 'Diferencia'
+                        },
+                        hide_index=True,
+                        use_container_width=True
+                    )
+ 
+finally:
+    # Depuración de rendimiento: tiempo y memoria de cada etapa de esta ejecución
+    profile_df = profiler.finish()
+profile_log = st.session_state.setdefault('profile_log', [])
+profile_log.extend(profiler.records)
+del profile_log[:-PROFILE_LOG_RECORDS]
+if st.sidebar.checkbox("Depuración de rendimiento", key="profile_debug"):
+    st.sidebar.subheader("Tiempos por Etapa (Depuración)")
+    st.sidebar.dataframe(
+        profile_df[['stage', 'seconds', 'peak_mb']],
+        column_config={
+            'stage': 'Etapa',
+            'seconds': st.column_config.NumberColumn('Segundos', format="%.3f"),
+            'peak_mb': st.column_config.NumberColumn('Pico MB', format="%.1f")
+        },
+        hide_index=True
+    )
+    st.sidebar.caption(f"Total: {profile_df['seconds'].sum():.2f} s")
+    st.sidebar.download_button(
+        label="Descargar mediciones (JSON Lines)",
+        data=to_json_lines(profile_log),
+        file_name="horario_perfil.jsonl",
+        mime="application/x-ndjson",
+        key="profile_export"
+    )
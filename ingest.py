@@ -0,0 +1,232 @@
+"""Lectura y expansión de archivos de horarios, independiente de la interfaz."""
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from expansion import ERROR_COLUMNS, START_DATE_2025, parse_rules
+from readers import REQUIRED_COLUMNS, reader_for
+from rules import RuleSet
+
+REPORT_COLUMNS = ['source_file', 'status', 'flights', 'row_errors', 'message', 'seconds']
+
+# Resultado de leer y expandir un archivo; message sólo se rellena si el archivo no se pudo procesar
+# y flights queda a None sin mensaje si la carga se canceló antes de procesarlo. rules son las reglas
+# sin expandir y window la ventana (inicio, fin) de la que se expandieron los vuelos
+FileResult = namedtuple(
+    'FileResult', ['source_file', 'flights', 'errors', 'message', 'seconds', 'rules', 'window'],
+    defaults=(None, None)
+)
+
+
+class ScheduleFileError(ValueError):
+    """Archivo de horarios que no se puede procesar."""
+
+
+def content_hash(data):
+    """Huella SHA-256 del contenido de un archivo."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def read_schedule(data, name):
+    """Lee un archivo de horarios (Excel, CSV o Parquet) y comprueba las columnas requeridas."""
+    reader = reader_for(name)
+    if reader is None:
+        raise ScheduleFileError(f"El archivo {name} no tiene un formato soportado (xlsx, csv o parquet).")
+    df = reader(data)
+    if not all(col in df.columns for col in REQUIRED_COLUMNS):
+        raise ScheduleFileError(
+            f"El archivo {name} no contiene todas las columnas requeridas (incluyendo 'carrier')."
+        )
+    return df
+
+
+def load_rules(data, name):
+    """Lee un archivo de horarios sin expandirlo. Devuelve (reglas, errores por fila)."""
+    return parse_rules(read_schedule(data, name), name)
+
+
+def load_schedule(data, name, start_date=START_DATE_2025, end_date=None):
+    """Lee y expande un archivo de horarios entre start_date y end_date. Devuelve (vuelos, errores por fila)."""
+    rules, errors = load_rules(data, name)
+    return RuleSet([rules]).flights(start_date, end_date), errors
+
+
+def load_schedule_result(name, data, start_date=START_DATE_2025, end_date=None):
+    """Lee y expande un archivo sin lanzar excepciones: los fallos quedan en el FileResult."""
+    started = time.perf_counter()
+    rules = None
+    try:
+        rules, errors = load_rules(data, name)
+        flights = RuleSet([rules]).flights(start_date, end_date)
+        message = None
+    except ScheduleFileError as e:
+        flights, errors, message = None, None, str(e)
+    except Exception as e:
+        flights, errors, message = None, None, f"Error al procesar el archivo {name}: {e}"
+    return FileResult(
+        name, flights, errors, message, time.perf_counter() - started, rules, (start_date, end_date)
+    )
+
+
+def window_result(result, start_date, end_date=None):
+    """FileResult con los vuelos de otra ventana, expandidos de las reglas que la solapan sin volver a
+    leer el archivo."""
+    if result.rules is None or result.window == (start_date, end_date):
+        return result
+    flights = RuleSet([result.rules]).flights(start_date, end_date)
+    return result._replace(flights=flights, window=(start_date, end_date))
+
+
+def cancelled_result(name):
+    """FileResult de un archivo que no se llegó a procesar porque se canceló la carga."""
+    return FileResult(name, None, None, None, 0.0)
+
+
+def ingest_files(files, start_date=START_DATE_2025, max_workers=None, on_progress=None, cancel=None, end_date=None):
+    """Lee y expande varios archivos en paralelo, un proceso por archivo.
+
+    files es una lista de (nombre, contenido). on_progress(índice, resultado, hechos, total) se
+    llama al terminar cada archivo. Si se activa el evento cancel, los archivos que aún no han
+    empezado no se procesan. Devuelve los FileResult en el mismo orden que files.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(files))
+
+    results = {}
+    if max_workers <= 1:
+        for i, (name, data) in enumerate(files):
+            if cancel is not None and cancel.is_set():
+                break
+            results[i] = load_schedule_result(name, data, start_date, end_date)
+            if on_progress:
+                on_progress(i, results[i], len(results), len(files))
+    else:
+        # 'spawn' evita heredar los hilos del servidor web en los procesos hijos
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+            futures = {
+                pool.submit(load_schedule_result, name, data, start_date, end_date): i
+                for i, (name, data) in enumerate(files)
+            }
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                i = futures[future]
+                results[i] = future.result()
+                if on_progress:
+                    on_progress(i, results[i], len(results), len(files))
+                if cancel is not None and cancel.is_set():
+                    for pending in futures:
+                        pending.cancel()
+    return [results.get(i) or cancelled_result(name) for i, (name, _) in enumerate(files)]
+
+
+class IngestJob:
+    """Carga de archivos en segundo plano: cada resultado está disponible en cuanto termina su archivo.
+
+    Los resultados se guardan también en la caché de archivos con su clave, así que no se pierden
+    si la sesión que lanzó la carga termina antes.
+    """
+
+    def __init__(self, files, keys, cache, start_date=START_DATE_2025, max_workers=None, end_date=None):
+        self.keys = list(keys)
+        self.total = len(files)
+        self._cache = cache
+        self._results = {}
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(files, start_date, end_date, max_workers), name="ingest-job", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, files, start_date, end_date, max_workers):
+        try:
+            ingest_files(
+                files, start_date, max_workers, on_progress=self._collect, cancel=self._cancel, end_date=end_date
+            )
+        except Exception as e:
+            # Un fallo del propio pool se registra como error de cada archivo sin resultado
+            with self._lock:
+                for i, (name, _) in enumerate(files):
+                    message = f"Error al procesar el archivo {name}: {e}"
+                    self._results.setdefault(i, FileResult(name, None, None, message, 0.0))
+
+    def _collect(self, i, result, done, total):
+        self._cache.put(self.keys[i], result)
+        with self._lock:
+            self._results[i] = result
+
+    def results(self):
+        """Resultados terminados hasta ahora: {posición en files: FileResult}."""
+        with self._lock:
+            return dict(self._results)
+
+    @property
+    def done(self):
+        with self._lock:
+            return len(self._results)
+
+    @property
+    def running(self):
+        """True mientras queden archivos por procesar y la carga no se haya cancelado."""
+        return self._thread.is_alive() and not self._cancel.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def finished(self):
+        """True cuando ya no queda ningún archivo en curso (terminados, fallidos o cancelados)."""
+        return not self._thread.is_alive()
+
+    def cancel(self):
+        """Cancela los archivos que aún no han empezado; los que están en curso terminan y se guardan.
+
+        Un archivo ya enviado a un proceso de lectura no se interrumpe.
+        """
+        self._cancel.set()
+
+    def release(self):
+        """Suelta los resultados terminados: tras la carga ya están en la caché de archivos."""
+        with self._lock:
+            self._results = {}
+
+
+def ingest_report(results):
+    """Informe por archivo (estado, vuelos, filas con error, mensaje y tiempo) de una carga."""
+    rows = []
+    for result in results:
+        if result.message:
+            status, flights, row_errors = "error", 0, 0
+        elif result.flights is None:
+            status, flights, row_errors = "cancelado", 0, 0
+        else:
+            flights, row_errors = len(result.flights), len(result.errors)
+            status = "ok" if flights else "sin vuelos"
+        rows.append({
+            'source_file': result.source_file,
+            'status': status,
+            'flights': flights,
+            'row_errors': row_errors,
+            'message': result.message or (
+                f"Carga cancelada antes de procesar {result.source_file}." if status == "cancelado"
+                else f"No se generaron vuelos para el archivo {result.source_file}." if not flights else None
+            ),
+            'seconds': round(result.seconds, 3)
+        })
+    return pd.DataFrame(rows, columns=REPORT_COLUMNS)
+
+
+def ingest_errors(results):
+    """Errores por fila de todos los archivos de una carga."""
+    frames = [r.errors for r in results if r.errors is not None and not r.errors.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=ERROR_COLUMNS)
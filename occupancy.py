@@ -0,0 +1,168 @@
+"""Ocupación en tierra: aeronaves simultáneas por estación a partir de los pares llegada-salida."""
+import numpy as np
+import pandas as pd
+
+from expansion import format_minutes
+
+DAY_MINUTES = 24 * 60
+PERCENTILES = [50, 90, 95]
+OCCUPANCY_COLUMNS = [
+    'station', 'date', 'arrivals', 'departures', 'based', 'overnight', 'peak', 'peak_time',
+    'p50', 'p90', 'p95', 'minutes_above_capacity'
+]
+
+
+def flight_rotation(flight_numbers):
+    """Rotación de cada vuelo: los números consecutivos par/impar (IB3120/IB3121) comparten rotación."""
+    labels = pd.Series(flight_numbers.cat.categories.astype(str))
+    parts = labels.str.extract(r'^(\D*)(\d+)(.*)$')
+    numbered = parts[1].notna()
+    rotations = labels.copy()
+    rotations[numbered] = (
+        parts[0][numbered] + (parts[1][numbered].astype(np.int64) // 2).astype(str) + parts[2][numbered]
+    )
+    rotation_codes = np.append(pd.factorize(rotations)[0], -1)
+    # El código -1 (sin número de vuelo) apunta al -1 añadido al final
+    return rotation_codes[flight_numbers.cat.codes.to_numpy()]
+
+
+def ground_events(df, by_rotation=True):
+    """Eventos de llegada (+1) y salida (-1) de los vuelos con hora, con su grupo de emparejamiento.
+
+    Una salida se empareja con una llegada anterior del mismo día, estación y compañía (y de su
+    rotación, si by_rotation). Los vuelos sin hora no se pueden situar y se descartan.
+    """
+    arrivals = (df['type'] == 'A').to_numpy()
+    minutes = np.where(
+        arrivals,
+        df['arrival_time'].to_numpy(dtype='int32', na_value=-1),
+        df['departure_time'].to_numpy(dtype='int32', na_value=-1)
+    )
+    timed = (minutes >= 0) & (minutes < DAY_MINUTES)
+    pair = df['carrier'].cat.codes.to_numpy().astype(np.int64)
+    if by_rotation:
+        rotation = flight_rotation(df['flight_number'])
+        pair = pair * (int(rotation.max(initial=0)) + 2) + rotation + 1
+    return pd.DataFrame({
+        'station': df['station'].to_numpy()[timed],
+        'date': df['date'].to_numpy()[timed],
+        'pair': pair[timed],
+        'minute': minutes[timed],
+        'delta': np.where(arrivals[timed], 1, -1).astype(np.int8)
+    })
+
+
+def _sweep(events):
+    """Barrido de los eventos de cada estación y día en orden de minuto (llegadas antes que salidas).
+
+    Devuelve los eventos ordenados con su día ('group') y el nivel de ocupación tras cada uno, las
+    claves (station, date) de cada día y las aeronaves en tierra al empezar cada día.
+    """
+    events['group'] = events.groupby(['station', 'date'], observed=True).ngroup().to_numpy()
+    keys = events.drop_duplicates('group').sort_values('group')[['station', 'date']].reset_index(drop=True)
+
+    # Salidas sin llegada previa en su grupo de emparejamiento: estaban en tierra desde el principio
+    events = events.sort_values(['group', 'pair', 'minute', 'delta'], ascending=[True, True, True, False])
+    running = events.groupby(['group', 'pair'], sort=False)['delta'].cumsum()
+    lowest = running.groupby([events['group'], events['pair']], sort=False).min()
+    based = np.bincount(
+        lowest.index.get_level_values('group'), weights=(-lowest).clip(lower=0), minlength=len(keys)
+    ).astype(np.int64)
+
+    events = events.sort_values(['group', 'minute', 'delta'], ascending=[True, True, False], ignore_index=True)
+    group = events['group'].to_numpy()
+    events['level'] = based[group] + events.groupby('group', sort=False)['delta'].cumsum().to_numpy()
+    return events, keys, based
+
+
+def _segments(events, based):
+    """Tramos (día, minuto inicial, nivel, duración) que cubren cada día completo desde las 00:00."""
+    group = events['group'].to_numpy()
+    minute = events['minute'].to_numpy().astype(np.int64)
+    last = np.r_[group[1:] != group[:-1], True]
+    end = np.where(last, DAY_MINUTES, np.r_[minute[1:], DAY_MINUTES])
+    n_groups = len(based)
+    first_minute = np.full(n_groups, DAY_MINUTES, dtype=np.int64)
+    np.minimum.at(first_minute, group, minute)
+    return (
+        np.r_[np.arange(n_groups), group],
+        np.r_[np.zeros(n_groups, dtype=np.int64), minute],
+        np.r_[based, events['level'].to_numpy()],
+        np.r_[first_minute, end - minute]
+    )
+
+
+def daily_occupancy(df, capacity=None, by_rotation=True):
+    """Ocupación por estación y día: pico (y su hora), percentiles en el tiempo y minutos sobre la capacidad.
+
+    capacity es un número de puestos común o un dict estación -> puestos. Las llegadas sin salida
+    posterior siguen en tierra al acabar el día (overnight) y las salidas sin llegada previa ya
+    estaban en tierra al empezar (based).
+    """
+    events = ground_events(df, by_rotation)
+    if events.empty:
+        return pd.DataFrame(columns=OCCUPANCY_COLUMNS)
+    events, keys, based = _sweep(events)
+    group, start, level, minutes = _segments(events, based)
+    n_groups = len(keys)
+
+    # Pico y primer minuto en que se alcanza; los tramos de duración nula (llegada y salida en el
+    # mismo minuto) no cuentan
+    held = minutes > 0
+    peak = np.zeros(n_groups, dtype=np.int64)
+    np.maximum.at(peak, group[held], level[held])
+    at_peak = held & (level == peak[group])
+    peak_minute = np.full(n_groups, DAY_MINUTES, dtype=np.int64)
+    np.minimum.at(peak_minute, group[at_peak], start[at_peak])
+
+    # Percentiles ponderados por duración: cada día suma exactamente DAY_MINUTES minutos
+    order = np.lexsort((level, group))
+    cumulative = np.cumsum(minutes[order])
+    percentiles = {
+        f'p{q}': level[order][np.searchsorted(cumulative, np.arange(n_groups) * DAY_MINUTES + -(-q * DAY_MINUTES // 100))]
+        for q in PERCENTILES
+    }
+
+    if capacity is None:
+        above = np.zeros(n_groups, dtype=np.int64)
+    else:
+        if isinstance(capacity, dict):
+            limits = keys['station'].astype(str).map(capacity).astype(float).fillna(np.inf).to_numpy()
+        else:
+            limits = np.full(n_groups, capacity)
+        above = np.bincount(group, weights=np.where(level > limits[group], minutes, 0), minlength=n_groups)
+
+    event_group = events['group'].to_numpy()
+    arrivals = np.bincount(event_group, weights=events['delta'].to_numpy() > 0, minlength=n_groups)
+    totals = np.bincount(event_group, minlength=n_groups)
+    return pd.DataFrame({
+        'station': keys['station'].astype(str),
+        'date': keys['date'],
+        'arrivals': arrivals.astype(np.int64),
+        'departures': (totals - arrivals).astype(np.int64),
+        'based': based,
+        'overnight': events.groupby('group', sort=True)['level'].last().to_numpy(),
+        'peak': peak,
+        'peak_time': format_minutes(pd.Series(peak_minute)).to_numpy(),
+        **percentiles,
+        'minutes_above_capacity': above.astype(np.int64)
+    }, columns=OCCUPANCY_COLUMNS)
+
+
+def occupancy_timeline(df, by_rotation=True):
+    """Nivel de ocupación a lo largo de cada día, como escalones: station, date, minute, level."""
+    events = ground_events(df, by_rotation)
+    if events.empty:
+        return pd.DataFrame(columns=['station', 'date', 'minute', 'level'])
+    events, keys, based = _sweep(events)
+    group, start, level, _ = _segments(events, based)
+    timeline = pd.DataFrame({
+        'station': keys['station'].astype(str).to_numpy()[group],
+        'date': keys['date'].to_numpy()[group],
+        'minute': start,
+        'level': level
+    })
+    # El último nivel de cada día se prolonga hasta las 24:00
+    ends = timeline.iloc[np.r_[np.flatnonzero(np.diff(group[len(keys):])) + len(keys), len(group) - 1]]
+    timeline = pd.concat([timeline, ends.assign(minute=DAY_MINUTES)], ignore_index=True)
+    return timeline.sort_values(['station', 'date', 'minute'], kind='stable', ignore_index=True)
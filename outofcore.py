@@ -0,0 +1,264 @@
+"""Consultas fuera de memoria sobre el almacén Parquet: filtros y agrupaciones por lotes."""
+import functools
+import itertools
+import operator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from aggregates import CUBE_DIMENSIONS, count_by_time_bucket, flight_hours
+from expansion import add_calendar_columns, compact_flights, concat_flights
+from store import open_store, store_version
+
+# Memoria de trabajo por defecto de una consulta (MB)
+MEMORY_BUDGET_MB = 256
+# Bytes por fila de un texto sin diccionario (las columnas de partición) en la estimación del lote
+TEXT_BYTES = 16
+# Copias de cada lote vivas a la vez: el lote de Arrow, su DataFrame, las claves de la agrupación
+# y los resultados parciales
+WORKING_COPIES = 4
+MIN_BATCH_ROWS = 1_024
+MONTH_DAYS = 31
+EVENT_COLUMNS = ['type', 'arrival_time', 'departure_time']
+
+
+def _value_bytes(data_type):
+    """Bytes por fila de una columna de Arrow (los índices en las categóricas)."""
+    if pa.types.is_dictionary(data_type):
+        data_type = data_type.index_type
+    if pa.types.is_string(data_type) or pa.types.is_large_string(data_type):
+        return TEXT_BYTES
+    return max(data_type.bit_width // 8, 1)
+
+
+def _to_pandas(table):
+    # Las horas se leen como Int16 con nulos, igual que en los vuelos expandidos
+    return table.to_pandas(types_mapper={pa.int16(): pd.Int16Dtype()}.get)
+
+
+def filter_expression(filters=None, start_date=None, end_date=None):
+    """Expresión de Arrow de los filtros (columna -> valores) y del rango de fechas [start_date, end_date).
+
+    Admite las columnas de los filtros generales (fechas como texto 'YYYY-MM-DD') y las de
+    partición station y period ('YYYY-MM'). El rango se traduce también a meses, así que las
+    particiones fuera de él se descartan sin abrirlas. None si no hay ninguna condición.
+    """
+    conditions = []
+    for column, values in (filters or {}).items():
+        if not values:
+            continue
+        if column == 'date':
+            dates = pd.to_datetime(list(values))
+            conditions.append(ds.field('period').isin(sorted(set(dates.strftime('%Y-%m')))))
+            values = pa.array(dates.as_unit('ns'), type=pa.timestamp('ns'))
+        else:
+            values = [str(v) for v in values]
+        conditions.append(ds.field(column).isin(values))
+    if start_date is not None:
+        start_date = pd.Timestamp(start_date)
+        conditions.append(ds.field('period') >= start_date.strftime('%Y-%m'))
+        conditions.append(ds.field('date') >= pa.scalar(start_date.as_unit('ns'), type=pa.timestamp('ns')))
+    if end_date is not None:
+        end_date = pd.Timestamp(end_date)
+        conditions.append(ds.field('period') <= (end_date - pd.Timedelta(days=1)).strftime('%Y-%m'))
+        conditions.append(ds.field('date') < pa.scalar(end_date.as_unit('ns'), type=pa.timestamp('ns')))
+    return functools.reduce(operator.and_, conditions) if conditions else None
+
+
+def _combine(partials, by):
+    """Suma los conteos parciales de varios lotes por las columnas by."""
+    return (
+        concat_flights(partials)
+        .groupby(by, observed=True, dropna=False)['count']
+        .sum()
+        .reset_index()
+    )
+
+
+def _partition_order(fragment):
+    keys = ds.get_partition_keys(fragment.partition_expression)
+    return keys.get('period', ''), keys.get('station', ''), fragment.path
+
+
+class StoreQuery:
+    """Consultas sobre el almacén sin cargarlo: cada consulta recorre sus archivos por lotes.
+
+    Los filtros se traducen a una expresión de Arrow, así que las particiones (estación, mes) que
+    no los cumplen no se abren y de las demás sólo se leen las columnas que usa la consulta. Las
+    agrupaciones se calculan lote a lote y se combinan; a pandas sólo pasan los lotes de uno en
+    uno y el resultado agregado o la página pedida. El tamaño de lote sale de memory_budget_mb, y
+    los archivos se escriben en grupos de store.ROW_GROUP_ROWS filas, la unidad mínima de lectura.
+
+    start_date y end_date (excluida) limitan todas las consultas a una ventana de fechas.
+    """
+
+    def __init__(self, path, memory_budget_mb=MEMORY_BUDGET_MB, start_date=None, end_date=None):
+        self.path = path
+        self.version = store_version(path)
+        self.dataset = open_store(path)
+        self.memory_budget = int(memory_budget_mb * 2**20)
+        self.window = (start_date, end_date)
+
+    def batch_rows(self, columns):
+        """Filas por lote para que WORKING_COPIES copias de las columnas quepan en el presupuesto."""
+        row_bytes = sum(_value_bytes(self.dataset.schema.field(column).type) for column in columns)
+        return max(MIN_BATCH_ROWS, self.memory_budget // (max(row_bytes, 1) * WORKING_COPIES))
+
+    def expression(self, filters=None, start_date=None, end_date=None):
+        """Expresión de los filtros dentro de la ventana y del rango [start_date, end_date) si se indica."""
+        window_start, window_end = self.window
+        if window_start is not None:
+            start_date = window_start if start_date is None else max(pd.Timestamp(start_date), window_start)
+        if window_end is not None:
+            end_date = window_end if end_date is None else min(pd.Timestamp(end_date), window_end)
+        return filter_expression(filters, start_date, end_date)
+
+    def _scanner(self, columns, filters=None, start_date=None, end_date=None):
+        return self.dataset.scanner(
+            columns=columns,
+            filter=self.expression(filters, start_date, end_date),
+            batch_size=self.batch_rows(columns),
+            batch_readahead=1,
+            fragment_readahead=1,
+            use_threads=False
+        )
+
+    def batches(self, columns, filters=None, start_date=None, end_date=None):
+        """Lotes (DataFrames) de las columnas indicadas de los vuelos que cumplen los filtros."""
+        for batch in self._scanner(columns, filters, start_date, end_date).to_batches():
+            if batch.num_rows:
+                yield _to_pandas(pa.Table.from_batches([batch]))
+
+    def count(self, filters=None, start_date=None, end_date=None):
+        """Número de vuelos que cumplen los filtros (sólo se leen las columnas filtradas)."""
+        return self.dataset.count_rows(filter=self.expression(filters, start_date, end_date))
+
+    def _partition_tables(self, columns, filters=None, start_date=None, end_date=None):
+        """Tablas de Arrow de hasta batch_rows filas que juntan lotes consecutivos de una misma
+        partición (los archivos pequeños dan lotes pequeños); devuelve (partición, tabla)."""
+        limit = self.batch_rows(columns)
+        pending, pending_rows, partition = [], 0, None
+        for tagged in self._scanner(columns, filters, start_date, end_date).scan_batches():
+            batch = tagged.record_batch
+            if batch.num_rows == 0:
+                continue
+            fragment_partition = tagged.fragment.partition_expression
+            if pending and (pending_rows + batch.num_rows > limit or not fragment_partition.equals(partition)):
+                yield partition, pa.Table.from_batches(pending)
+                pending, pending_rows = [], 0
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            partition = fragment_partition
+        if pending:
+            yield partition, pa.Table.from_batches(pending)
+
+    def group_counts(self, by, filters=None, start_date=None, end_date=None):
+        """Vuelos por cada combinación de las columnas by (admite 'hour', la de aggregates.flight_hours).
+
+        Los conteos parciales de los lotes se combinan cuando ocupan más que un lote y el doble de
+        lo ya combinado. Si by incluye station y date, los grupos de particiones distintas no se
+        mezclan y los de cada partición se cierran al pasar a la siguiente.
+        """
+        columns = [column for column in by if column != 'hour']
+        if 'hour' in by:
+            columns += [column for column in EVENT_COLUMNS if column not in columns]
+        by_partition = 'station' in by and 'date' in by
+        limit = self.batch_rows(columns)
+        done, partials, partial_rows, combined_rows, current = [], [], 0, 0, None
+        for partition, table in self._partition_tables(columns, filters, start_date, end_date):
+            if by_partition and partials and not partition.equals(current):
+                done.append(_combine(partials, by))
+                partials, partial_rows, combined_rows = [], 0, 0
+            current = partition
+            batch = _to_pandas(table)
+            if 'hour' in by:
+                batch = batch.assign(hour=flight_hours(batch))
+            partial = batch.groupby(by, observed=True, dropna=False).size().reset_index(name='count')
+            partials.append(partial)
+            partial_rows += len(partial)
+            if partial_rows > max(limit, 2 * combined_rows):
+                partials = [_combine(partials, by)]
+                partial_rows = combined_rows = len(partials[0])
+        if partials:
+            done.append(_combine(partials, by))
+        if not done:
+            empty = pd.DataFrame({column: [] for column in by})
+            return empty.assign(count=np.zeros(0, dtype=np.int64))
+        return compact_flights(concat_flights(done) if by_partition else _combine(done, by))
+
+    def cube(self, filters=None):
+        """Cubo de conteos de los vuelos que cumplen los filtros, igual que aggregates.build_cube."""
+        return add_calendar_columns(self.group_counts(CUBE_DIMENSIONS, filters))
+
+    def time_buckets(self, bucket_minutes=60, filters=None, start_date=None, end_date=None):
+        """Llegadas y salidas por franja horaria en [start_date, end_date), como
+        aggregates.count_by_time_bucket, sumando los conteos de cada lote."""
+        days = 1
+        if start_date is not None and end_date is not None:
+            days = (pd.Timestamp(end_date) - pd.Timestamp(start_date)).days
+        counts = count_by_time_bucket(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool), bucket_minutes, days)
+        for batch in self.batches(EVENT_COLUMNS, filters, start_date, end_date):
+            arrivals = (batch['type'] == 'A').to_numpy()
+            minutes = batch['arrival_time'].where(arrivals, batch['departure_time']).fillna(-1).to_numpy()
+            counts['count'] += count_by_time_bucket(minutes, arrivals, bucket_minutes)['count']
+        counts['daily_mean'] = (counts['count'] / max(days, 1)).round(2)
+        return counts
+
+    def _fragment_scanner(self, fragment, columns, expression):
+        return ds.Scanner.from_fragment(
+            fragment,
+            schema=self.dataset.schema,
+            columns=columns,
+            filter=expression,
+            batch_size=self.batch_rows(columns),
+            use_threads=False
+        )
+
+    def _day_counts(self, fragment, expression, first_day):
+        """Filas de cada día del mes de un archivo, contadas por lotes de la columna date."""
+        counts = np.zeros(MONTH_DAYS, dtype=np.int64)
+        for batch in self._fragment_scanner(fragment, ['date'], expression).to_batches():
+            days = batch.column(0).to_numpy().astype('datetime64[D]') - first_day
+            counts += np.bincount(days.astype(np.int64), minlength=MONTH_DAYS)
+        return counts
+
+    def page(self, offset, limit, columns, filters=None, start_date=None, end_date=None):
+        """Vuelos offset a offset + limit de los que cumplen los filtros, en orden de fecha como la
+        vista de detalle en memoria (a igual fecha, por estación y archivo).
+
+        Cada mes es una partición, así que los meses se recorren en orden y de los anteriores a la
+        página sólo se cuentan las filas. En los de la página se cuentan las filas de cada día por
+        archivo: como cada archivo está ordenado por fecha, las de un día son un tramo contiguo y de
+        las columnas pedidas sólo se leen los tramos de la página.
+        """
+        expression = self.expression(filters, start_date, end_date)
+        fragments = sorted(self.dataset.get_fragments(filter=expression), key=_partition_order)
+        parts = []
+        for period, month in itertools.groupby(fragments, key=lambda fragment: _partition_order(fragment)[0]):
+            if limit <= 0:
+                break
+            month = list(month)
+            total = sum(self._fragment_scanner(f, [], expression).count_rows() for f in month)
+            if offset >= total:
+                offset -= total
+                continue
+            first_day = np.datetime64(f"{period}-01", 'D')
+            by_day = np.stack([self._day_counts(f, expression, first_day) for f in month])
+            day_starts = np.cumsum(by_day, axis=1) - by_day  # Primera fila de cada día en su archivo
+            # Tramos (día, archivo) en el orden de la página
+            sizes = by_day.T.ravel()
+            ends = np.cumsum(sizes)
+            for k in np.flatnonzero((sizes > 0) & (ends > offset) & (ends - sizes < offset + limit)):
+                day, i = divmod(int(k), len(month))
+                lo = max(offset - (ends[k] - sizes[k]), 0)
+                hi = min(offset + limit - (ends[k] - sizes[k]), sizes[k])
+                rows = np.arange(day_starts[i, day] + lo, day_starts[i, day] + hi)
+                parts.append(self._fragment_scanner(month[i], columns, expression).take(pa.array(rows)))
+            taken = min(total - offset, limit)
+            offset = 0
+            limit -= taken
+        if not parts:
+            return compact_flights(_to_pandas(self.dataset.schema.empty_table().select(columns)))
+        return compact_flights(_to_pandas(pa.concat_tables(parts)))
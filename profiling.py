@@ -0,0 +1,112 @@
+"""Tiempo y pico de memoria por etapa de una ejecución de la aplicación."""
+import json
+import logging
+import os
+import time
+import tracemalloc
+import uuid
+
+import pandas as pd
+
+logger = logging.getLogger("horario.profiling")
+# Nivel del log de etapas; con HORARIO_PROFILE_LOG=WARNING no se escribe nada
+PROFILE_LOG_LEVEL = os.environ.get("HORARIO_PROFILE_LOG", "INFO")
+
+PROFILE_COLUMNS = ['run_id', 'stage', 'seconds', 'peak_mb']
+MB = 1024 * 1024
+
+# True si tracemalloc lo encendió un StageProfiler (y no otro código del proceso)
+_tracing_owned = False
+
+
+def configure_logging(level=None, stream=None):
+    """Escribe los registros de cada etapa en stderr (o en stream), un objeto JSON por línea.
+
+    Sin esto los registros INFO llegan al logger raíz, que por defecto sólo emite WARNING. El
+    manejador se añade una sola vez, así que puede llamarse en cada ejecución.
+    """
+    logger.setLevel(level or PROFILE_LOG_LEVEL)
+    if not logger.handlers:
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.propagate = False
+    return logger
+
+
+def _stop_tracing():
+    """Apaga tracemalloc si lo encendió un StageProfiler."""
+    global _tracing_owned
+    if _tracing_owned and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _tracing_owned = False
+
+
+class StageProfiler:
+    """Mide etapas consecutivas de una ejecución: cada mark(nombre) cierra la etapa en curso y abre otra.
+
+    El tiempo de reloj se mide siempre. El pico de memoria (memoria asignada por Python y NumPy
+    durante la etapa) sólo si trace_memory es True, porque tracemalloc ralentiza las asignaciones;
+    no incluye la memoria de los procesos de lectura y, con varias sesiones a la vez, es aproximado.
+    Una ejecución sin trace_memory apaga el seguimiento que haya dejado una de depuración que no
+    llegó a finish().
+    """
+
+    def __init__(self, trace_memory=False):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.trace_memory = trace_memory
+        self.records = []
+        self._stage = None
+        self._started = None
+        self._baseline = 0
+        global _tracing_owned
+        # El seguimiento encendido por otro profiler se adopta; el de otro código no se toca
+        self._owns_tracing = trace_memory and (_tracing_owned or not tracemalloc.is_tracing())
+        if self._owns_tracing and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        elif not trace_memory:
+            _stop_tracing()
+
+    def mark(self, stage):
+        """Termina la etapa en curso y empieza la etapa indicada."""
+        self._close()
+        self._stage = stage
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            self._baseline = tracemalloc.get_traced_memory()[0]
+        self._started = time.perf_counter()
+
+    def _close(self):
+        if self._stage is None:
+            return
+        seconds = time.perf_counter() - self._started
+        peak_mb = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            peak_mb = round((tracemalloc.get_traced_memory()[1] - self._baseline) / MB, 2)
+        self.records.append({
+            'run_id': self.run_id,
+            'stage': self._stage,
+            'seconds': round(seconds, 4),
+            'peak_mb': peak_mb
+        })
+        self._stage = None
+
+    def finish(self):
+        """Termina la última etapa, registra la ejecución en el log y devuelve sus mediciones."""
+        self._close()
+        if self._owns_tracing:
+            _stop_tracing()
+            self._owns_tracing = False
+        for record in self.records:
+            logger.info(json.dumps(record, ensure_ascii=False))
+        return self.table()
+
+    def table(self):
+        """Mediciones de la ejecución como DataFrame."""
+        return pd.DataFrame(self.records, columns=PROFILE_COLUMNS)
+
+
+def to_json_lines(records):
+    """Mediciones en formato JSON Lines (un objeto por etapa) para descargarlas o enviarlas a un log."""
+    return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
@@ -0,0 +1,55 @@
+"""Lectores de archivos de horarios (Excel, CSV y Parquet) que leen sólo las columnas requeridas."""
+import importlib.util
+import io
+from pathlib import PurePath
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+REQUIRED_COLUMNS = ['A/D', 'fltno', 'departure_time', 'arrival_time', 'origin',
+                    'dest', 'STATION', 'weekday', 'from_date', 'until_date', 'flight_type', 'actypeadv', 'carrier']
+
+# Etiquetas y patrón de días como texto: así no dependen de cómo el formato infiere el tipo.
+# Horas y fechas se dejan al lector; expand_flight_dates las normaliza.
+TEXT_COLUMNS = ['A/D', 'fltno', 'origin', 'dest', 'STATION', 'weekday', 'flight_type', 'actypeadv', 'carrier']
+SCHEDULE_DTYPES = {col: 'str' for col in TEXT_COLUMNS}
+
+# calamine (Rust) lee el xlsx en streaming sin crear un objeto por celda; openpyxl queda de respaldo
+EXCEL_ENGINE = 'calamine' if importlib.util.find_spec('python_calamine') else 'openpyxl'
+
+
+def _is_required(column):
+    return column in REQUIRED_COLUMNS
+
+
+def read_excel_schedule(data):
+    """Lee un libro Excel con el motor más rápido disponible."""
+    return pd.read_excel(io.BytesIO(data), engine=EXCEL_ENGINE, usecols=_is_required, dtype=SCHEDULE_DTYPES)
+
+
+def read_csv_schedule(data):
+    """Lee un CSV (UTF-8, separado por comas)."""
+    return pd.read_csv(io.BytesIO(data), usecols=_is_required, dtype=SCHEDULE_DTYPES)
+
+
+def read_parquet_schedule(data):
+    """Lee un archivo Parquet, sólo las columnas requeridas que contiene."""
+    source = io.BytesIO(data)
+    columns = [c for c in pq.ParquetFile(source).schema_arrow.names if _is_required(c)]
+    df = pd.read_parquet(source, columns=columns)
+    text = [col for col in TEXT_COLUMNS if col in df.columns]
+    return df.astype({col: 'str' for col in text}).where(df.notna()) if text else df
+
+
+# Extensión del archivo -> lector
+READERS = {
+    '.xlsx': read_excel_schedule,
+    '.csv': read_csv_schedule,
+    '.parquet': read_parquet_schedule
+}
+UPLOAD_TYPES = [suffix.lstrip('.') for suffix in READERS]
+
+
+def reader_for(name):
+    """Lector adecuado para el nombre de archivo, o None si el formato no está soportado."""
+    return READERS.get(PurePath(name).suffix.lower())
@@ -0,0 +1,103 @@
+"""Registro de conjuntos de vuelos compartidos entre sesiones, con recuento de referencias."""
+import threading
+import weakref
+
+from dataset import FlightDataset
+from expansion import START_DATE_2025
+
+
+def dataset_key(files):
+    """Clave de un conjunto: pares (source_file, clave del contenido) ordenados."""
+    return tuple(sorted((source_file, key) for source_file, (key, _) in files.items()))
+
+
+class DatasetHandle:
+    """Referencia de una sesión a un conjunto del registro.
+
+    Se libera con release() o, si la sesión termina sin hacerlo, cuando el estado de la sesión se
+    recolecta.
+    """
+
+    def __init__(self, registry, key, dataset):
+        self.key = key
+        self.dataset = dataset
+        self._finalizer = weakref.finalize(self, registry.release, key)
+
+    def release(self):
+        """Suelta la referencia al conjunto (sólo la primera llamada tiene efecto)."""
+        self._finalizer()
+
+    def _detach(self):
+        """Anula la liberación: la referencia pasa a otro handle."""
+        self._finalizer.detach()
+
+
+class DatasetRegistry:
+    """Conjuntos de vuelos del proceso, por contenido de sus archivos, compartidos por todas las sesiones.
+
+    Las sesiones con los mismos archivos usan el mismo FlightDataset (una sola copia de vuelos,
+    cubo e índice) y cada una conserva sólo su handle y sus filtros. El conjunto se libera cuando
+    la última sesión que lo usa lo suelta.
+    """
+
+    def __init__(self, start_date=START_DATE_2025):
+        self.start_date = start_date
+        self._entries = {}  # clave -> [FlightDataset, referencias]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def references(self, key):
+        """Número de sesiones que usan el conjunto de la clave."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry else 0
+
+    def acquire(self, files, previous=None):
+        """Handle del conjunto para los archivos {source_file: (clave, vuelos)}.
+
+        previous es el handle actual de la sesión, que se suelta. Si nadie más usa su conjunto, se
+        actualiza en el sitio con FlightDataset.sync en vez de construir otro desde cero.
+        """
+        key = dataset_key(files)
+        if previous is not None and previous.key == key:
+            return previous
+
+        reusable = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[1] += 1
+            elif previous is not None and self._entries.get(previous.key, [None, 0])[1] == 1:
+                # La sesión era la única usuaria de su conjunto: sale del registro y se actualiza
+                reusable = self._entries.pop(previous.key)[0]
+                previous._detach()
+
+        if entry is not None:
+            if previous is not None:
+                previous.release()
+            return DatasetHandle(self, key, entry[0])
+
+        if reusable is None:
+            reusable = FlightDataset(self.start_date)
+            if previous is not None:
+                previous.release()
+        # La sincronización puede tardar: se hace fuera del bloqueo
+        reusable.sync(files)
+
+        with self._lock:
+            # Si otra sesión registró la misma clave mientras tanto, se comparte la suya
+            entry = self._entries.setdefault(key, [reusable, 0])
+            entry[1] += 1
+            return DatasetHandle(self, key, entry[0])
+
+    def release(self, key):
+        """Suelta una referencia; el conjunto se elimina al soltar la última."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self._entries[key]
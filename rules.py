@@ -0,0 +1,94 @@
+"""Reglas de horario sin expandir, indexadas por rango de fechas, para consultar cualquier ventana."""
+import numpy as np
+import pandas as pd
+
+from expansion import DAY_NS, RULE_COLUMNS, concat_flights, expand_rules
+
+
+def _days(values):
+    """Fechas como días desde 1970-01-01."""
+    return np.asarray(values, dtype='datetime64[ns]').view('int64') // DAY_NS
+
+
+class RuleSet:
+    """Reglas de varios archivos (ver expansion.parse_rules) indexadas por fecha de inicio.
+
+    La memoria es proporcional al número de reglas: una ventana se responde expandiendo sólo las
+    reglas que la solapan, y los conteos por día salen de la máscara de días sin expandir nada.
+    Las reglas conservan el orden de los archivos, así que los vuelos de una ventana salen en el
+    mismo orden que al expandirlas todas.
+    """
+
+    def __init__(self, frames):
+        frames = [f for f in frames if f is not None and len(f) > 0]
+        rules = concat_flights(frames) if frames else pd.DataFrame(columns=RULE_COLUMNS)
+        self.rules = rules.reset_index(drop=True)
+        self._from = _days(self.rules['from_date'])
+        self._until = _days(self.rules['until_date'])
+        # Orden por fecha de inicio y máximo acumulado del fin en ese orden: las reglas antes de la
+        # primera que llega a start terminan antes
+        self._by_from = np.argsort(self._from, kind='stable')
+        self._sorted_from = self._from[self._by_from]
+        sorted_until = self._until[self._by_from]
+        self._max_until = np.maximum.accumulate(sorted_until) if len(sorted_until) else sorted_until
+
+    def __len__(self):
+        return len(self.rules)
+
+    def date_range(self):
+        """Primera y última fecha de operación posibles (None si no hay reglas)."""
+        if len(self.rules) == 0:
+            return None
+        return self.rules['from_date'].min(), self.rules['until_date'].max()
+
+    def overlapping(self, start=None, end=None):
+        """Posiciones (en el orden de los archivos) de las reglas cuyo rango de fechas solapa [start, end)."""
+        lo = 0 if start is None else np.searchsorted(self._max_until, _days([start])[0], side='left')
+        hi = len(self.rules) if end is None else np.searchsorted(self._sorted_from, _days([end])[0], side='left')
+        positions = np.sort(self._by_from[lo:max(lo, hi)])
+        if start is not None:
+            positions = positions[self._until[positions] >= _days([start])[0]]
+        return positions
+
+    def flights(self, start, end=None):
+        """Vuelos de la ventana [start, end), expandiendo sólo las reglas que la solapan."""
+        return expand_rules(self.rules.iloc[self.overlapping(start, end)], start, end)
+
+    def daily_counts(self, start=None, end=None, by='type'):
+        """Vuelos por día y valor de la columna by en [start, end), sin expandir las reglas.
+
+        Cada regla suma +1 al inicio y -1 tras el fin de su rango en la serie de cada día de la
+        semana que opera; la suma acumulada de la serie del día de la semana de cada fecha es el
+        número de vuelos de esa fecha. Devuelve columnas date, by, count.
+        """
+        positions = self.overlapping(start, end)
+        if len(positions) == 0:
+            return pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'), by: [], 'count': []})
+        first = self._from[positions].min() if start is None else _days([start])[0]
+        last = self._until[positions].max() + 1 if end is None else _days([end])[0]
+        n_days = int(last - first)
+
+        # Las reglas con el fin antes del inicio no operan ningún día: su rango queda vacío
+        lo = np.minimum(np.maximum(self._from[positions], first) - first, n_days)
+        hi = np.maximum(np.minimum(self._until[positions] + 1, last) - first, lo)
+        codes, labels = pd.factorize(self.rules[by].iloc[positions], sort=True)
+        masks = self.rules['days'].to_numpy()[positions].astype(np.int64)
+
+        # Una serie de diferencias por (valor, día de la semana): bit 0 de la máscara = lunes
+        size = len(labels) * 7 * (n_days + 1)
+        delta = np.zeros(size, dtype=np.int64)
+        for weekday in range(7):
+            active = (masks >> weekday) & 1 == 1
+            base = (codes[active] * 7 + weekday) * (n_days + 1)
+            delta += np.bincount(base + lo[active], minlength=size)
+            delta -= np.bincount(base + hi[active], minlength=size)
+        running = delta.reshape(len(labels), 7, n_days + 1).cumsum(axis=2)[:, :, :n_days]
+
+        day_numbers = np.arange(first, last)
+        weekdays = (day_numbers + 3) % 7  # 1970-01-01 fue jueves
+        counts = running[:, weekdays, np.arange(n_days)]
+        return pd.DataFrame({
+            'date': np.tile(day_numbers * DAY_NS, len(labels)).view('datetime64[ns]'),
+            by: np.repeat(np.asarray(labels), n_days),
+            'count': counts.ravel()
+        })
@@ -0,0 +1,116 @@
+"""Búsqueda de vuelos por número, compañía y ruta con índices de prefijos."""
+import re
+
+import numpy as np
+import pandas as pd
+
+SEARCH_COLUMNS = ['flight_number', 'carrier', 'origin', 'destination']
+# Separadores de una ruta 'MAD-BCN', 'MAD>BCN', 'MAD→BCN' o 'MAD/BCN'
+ROUTE_PATTERN = re.compile(r'^(\w*)\s*(?:-|>|→|/)\s*(\w*)$')
+# Compañía seguida de número de vuelo: 'IB123', 'U28011'
+FLIGHT_PATTERN = re.compile(r'^([A-Z]{2,3}|[A-Z]\d|\d[A-Z])(\d+)$')
+
+
+class PrefixIndex:
+    """Etiquetas de una columna ordenadas como texto, con las filas de cada etiqueta contiguas.
+
+    Las etiquetas que empiezan por un prefijo forman un rango del orden, y sus filas un único
+    tramo de rows: una búsqueda es una búsqueda binaria y un corte, sin recorrer las filas.
+    """
+
+    def __init__(self, values):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()
+            labels = values.cat.categories
+        else:
+            codes, labels = pd.factorize(values)
+        labels = np.asarray(labels.astype(str).str.upper(), dtype=str)
+        label_order = np.argsort(labels, kind='stable')
+        self.labels = labels[label_order]
+
+        # Rango de cada etiqueta en orden de texto (las filas sin valor quedan con -1 y se descartan)
+        rank = np.empty(len(labels), dtype=np.int64)
+        rank[label_order] = np.arange(len(labels))
+        row_rank = np.where(codes >= 0, rank[codes], -1)
+        row_rank = row_rank.astype(np.int16 if len(labels) < 2**15 else np.int32)
+        counts = np.bincount(row_rank + 1, minlength=len(labels) + 1)
+        self.rows = np.argsort(row_rank, kind='stable')[counts[0]:].astype(np.int32)
+        self.offsets = np.concatenate([[0], np.cumsum(counts[1:])])
+
+    def _range(self, lo_text, hi_text):
+        lo = np.searchsorted(self.labels, lo_text, side='left')
+        hi = np.searchsorted(self.labels, hi_text, side='right')
+        return self.rows[self.offsets[lo]:self.offsets[max(lo, hi)]]
+
+    def prefix(self, text):
+        """Filas cuyo valor empieza por text."""
+        return self._range(text, text + '\uffff')
+
+    def exact(self, text):
+        """Filas cuyo valor es exactamente text."""
+        return self._range(text, text)
+
+
+class FlightSearch:
+    """Índices de prefijos de SEARCH_COLUMNS sobre los vuelos cargados.
+
+    Consultas admitidas, combinables con espacios (todas deben cumplirse):
+    'IB123' compañía y número de vuelo, '123' número de vuelo, 'MAD-BCN' ruta (origen y destino,
+    cualquiera de los dos puede faltar) y 'MAD' compañía, origen, destino o número de vuelo. Las
+    letras no distinguen mayúsculas.
+    """
+
+    def __init__(self, flights):
+        self.n_rows = len(flights)
+        self.indexes = {column: PrefixIndex(flights[column]) for column in SEARCH_COLUMNS}
+
+    def _mark(self, parts):
+        hit = np.zeros(self.n_rows, dtype=bool)
+        for part in parts:
+            hit[part] = True
+        return hit
+
+    def _union(self, parts):
+        """Filas de cualquiera de los tramos, ordenadas."""
+        return np.flatnonzero(self._mark(parts))
+
+    def _intersect(self, parts):
+        """Filas comunes a todos los tramos, ordenadas: se filtra el menor marcando cada uno de los demás."""
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        parts = sorted(parts, key=len)
+        # Un tramo grande se ordena antes marcándolo que con una ordenación
+        result = self._union(parts[:1]) if len(parts[0]) * 16 > self.n_rows else np.sort(parts[0]).astype(np.int64)
+        for part in parts[1:]:
+            result = result[self._mark([part])[result]]
+        return result
+
+    def _term(self, term):
+        route = ROUTE_PATTERN.match(term)
+        if route:
+            parts = [
+                self.indexes[column].prefix(text)
+                for column, text in zip(('origin', 'destination'), route.groups()) if text
+            ]
+            return self._intersect(parts) if parts else None
+        flight = FLIGHT_PATTERN.match(term)
+        if flight:
+            # Si el número de vuelo ya incluye la compañía ('IB123'), también se busca tal cual
+            with_carrier = self._intersect([
+                self.indexes['carrier'].exact(flight.group(1)),
+                self.indexes['flight_number'].prefix(flight.group(2))
+            ])
+            return self._union([with_carrier, self.indexes['flight_number'].prefix(term)])
+        if term.isdigit():
+            return self._intersect([self.indexes['flight_number'].prefix(term)])
+        # Los números de vuelo también pueden empezar por letras ('XY988')
+        return self._union([self.indexes[column].prefix(term) for column in SEARCH_COLUMNS])
+
+    def find(self, text):
+        """Posiciones (ordenadas) de los vuelos que cumplen la consulta; None si está vacía."""
+        text = (text or '').strip().upper()
+        if not text:
+            return None
+        # Los separadores de ruta pueden llevar espacios alrededor: 'MAD - BCN'
+        terms = re.sub(r'\s*(-|>|→|/)\s*', r'\1', text).split()
+        return self._intersect([r for r in map(self._term, terms) if r is not None])
@@ -0,0 +1,123 @@
+"""Almacén columnar (Parquet) de vuelos expandidos, particionado por estación y mes."""
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from expansion import compact_flights
+
+PARTITION_COLUMNS = ['station', 'period']
+VERSION_FILE = "_version"
+# Filas por grupo de Parquet: es la unidad mínima que se descomprime al leer por lotes
+ROW_GROUP_ROWS = 65_536
+
+
+def _partitioning():
+    return ds.partitioning(
+        pa.schema([('station', pa.string()), ('period', pa.string())]), flavor="hive"
+    )
+
+
+def open_store(path):
+    """Dataset de Arrow del almacén, sin leer datos."""
+    # Lectura con memory-map: las páginas de disco se cargan bajo demanda
+    filesystem = fs.LocalFileSystem(use_mmap=True)
+    dataset = ds.dataset(str(path), format="parquet", partitioning=_partitioning(), filesystem=filesystem)
+    # El esquema se infiere del primer archivo: los índices de las categóricas se amplían a int32
+    # para que los archivos con más categorías no fallen al leerse con él
+    schema = pa.schema([
+        pa.field(f.name, pa.dictionary(pa.int32(), f.type.value_type)) if pa.types.is_dictionary(f.type) else f
+        for f in dataset.schema
+    ])
+    return ds.dataset(
+        str(path), schema=schema, format="parquet", partitioning=_partitioning(), filesystem=filesystem
+    )
+
+
+def _write_partitions(df, path, basename_template, existing_data_behavior):
+    # Cada archivo queda ordenado por fecha (preserve_order mantiene el orden al escribir) y en grupos
+    # de ROW_GROUP_ROWS filas
+    df = df.sort_values('date', kind='stable')
+    table = pa.Table.from_pandas(
+        df.assign(period=pd.to_datetime(df['date']).dt.strftime('%Y-%m')), preserve_index=False
+    )
+    ds.write_dataset(
+        table,
+        path,
+        format="parquet",
+        partitioning=_partitioning(),
+        existing_data_behavior=existing_data_behavior,
+        basename_template=basename_template,
+        preserve_order=True,
+        min_rows_per_group=min(ROW_GROUP_ROWS, max(len(table), 1)),
+        max_rows_per_group=ROW_GROUP_ROWS
+    )
+
+
+def write_store(df, path):
+    """Escribe los vuelos en el almacén, reemplazando sólo las particiones (estación, mes) afectadas."""
+    path = Path(path)
+    _write_partitions(df, path, "part-{i}.parquet", "delete_matching")
+    (path / VERSION_FILE).write_text(str(time.time_ns()))
+
+
+def build_store(frames, path):
+    """Escribe en el almacén los vuelos de varias tandas (p. ej. un archivo cada vez), reemplazando
+    sólo las particiones (estación, mes) que reciben vuelos, igual que write_store.
+
+    Cada tanda se escribe en cuanto llega, así que nunca hay más de una en memoria; los archivos
+    anteriores de las particiones escritas se borran al terminar. Devuelve el número de vuelos escritos.
+    """
+    path = Path(path)
+    prefix = f"build-{time.time_ns()}-"
+    written = 0
+    for n, df in enumerate(frames):
+        if len(df) == 0:
+            continue
+        _write_partitions(df, path, f"{prefix}{n}-{{i}}.parquet", "overwrite_or_ignore")
+        written += len(df)
+    for partition in {f.parent for f in path.glob(f"station=*/period=*/{prefix}*.parquet")}:
+        for old in partition.glob("*.parquet"):
+            if not old.name.startswith(prefix):
+                old.unlink()
+    path.mkdir(parents=True, exist_ok=True)
+    (path / VERSION_FILE).write_text(str(time.time_ns()))
+    return written
+
+
+def store_version(path):
+    """Marca de la última escritura del almacén (None si no existe)."""
+    version_file = Path(path) / VERSION_FILE
+    return version_file.read_text() if version_file.exists() else None
+
+
+def list_partitions(path):
+    """Lista las particiones (estación, mes) disponibles sin leer datos."""
+    if store_version(path) is None:
+        return pd.DataFrame(columns=PARTITION_COLUMNS)
+    dataset = open_store(path)
+    rows = [
+        ds.get_partition_keys(fragment.partition_expression)
+        for fragment in dataset.get_fragments()
+    ]
+    return pd.DataFrame(rows, columns=PARTITION_COLUMNS).drop_duplicates().reset_index(drop=True)
+
+
+def read_store(path, stations=None, periods=None, columns=None):
+    """Lee del almacén sólo las particiones de las estaciones y meses ('YYYY-MM') indicados.
+
+    Una lista vacía o None equivale a no filtrar por esa dimensión.
+    """
+    dataset = open_store(path)
+    condition = None
+    for field, values in (('station', stations), ('period', periods)):
+        if values:
+            expr = ds.field(field).isin(list(values))
+            condition = expr if condition is None else condition & expr
+    table = dataset.to_table(columns=columns, filter=condition)
+    if 'period' in table.column_names:
+        table = table.drop_columns(['period'])
+    return compact_flights(table.to_pandas())
@@ -0,0 +1,73 @@
+"""Consultas del servicio JSON: respuestas, errores, caché y recarga de los archivos."""
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from api import QueryService, ScheduleSource
+
+
+def _write_schedule(path, flights=('IB1',), mtime=None):
+    pd.DataFrame({
+        'A/D': 'A', 'fltno': list(flights), 'departure_time': 900, 'arrival_time': 1015,
+        'origin': 'BCN', 'dest': 'MAD', 'STATION': 'MAD', 'weekday': '1234567',
+        'from_date': '2025-03-31', 'until_date': '2025-04-06',
+        'flight_type': 'PAX', 'actypeadv': 'A320', 'carrier': 'IB'
+    }).to_csv(path, index=False)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def service(tmp_path):
+    path = tmp_path / "mad.csv"
+    _write_schedule(path, mtime=1_000_000_000)
+    return QueryService(ScheduleSource([path], max_workers=1))
+
+
+def _get(service, path, **params):
+    status, body = service.handle(path, {name: [value] for name, value in params.items()})
+    return status, json.loads(body)
+
+
+def test_endpoints_answer_from_the_loaded_files(service):
+    status, health = _get(service, '/health')
+    assert status == 200 and health['flights'] == 7 and health['files'] == ['mad.csv']
+    status, flights = _get(service, '/flights', date='2025-4-1')
+    assert status == 200 and flights['total'] == 1
+    assert flights['flights'][0]['arrival_time'] == '10:15'
+    status, weekly = _get(service, '/weekly', week='2025-04-02')
+    assert status == 200 and weekly['week'] == '2025-03-31'
+    status, hourly = _get(service, '/hourly', start='2025-03-31', end='2025-04-06', bucket='60')
+    assert status == 200 and sum(row['count'] for row in hourly['rows']) == 7
+
+
+def test_invalid_queries_are_client_errors(service):
+    assert _get(service, '/weekly', week='2025-03-31', date='bad')[0] == 400
+    assert _get(service, '/daily', date='no es una fecha')[0] == 400
+    assert _get(service, '/flights', limit='diez')[0] == 400
+    assert _get(service, '/hourly', start='2025-04-01', bucket='7')[0] == 400
+    assert _get(service, '/otra')[0] == 404
+
+
+def test_unexpected_errors_are_json_server_errors(service):
+    def broken(params):
+        raise RuntimeError("fallo")
+    service.endpoints['/options'] = broken
+    status, body = _get(service, '/options')
+    assert status == 500 and 'error' in body
+
+
+def test_responses_are_cached_until_the_files_change(service, tmp_path):
+    first = service.handle('/flights', {'station': ['MAD'], 'carrier': ['IB']})
+    # Mismos parámetros en otro orden: la misma respuesta en caché
+    assert service.handle('/flights', {'carrier': ['IB'], 'station': ['MAD']})[1] is first[1]
+
+    _write_schedule(tmp_path / "mad.csv", flights=('IB1', 'IB2'), mtime=2_000_000_000)
+    assert service.source.refresh()
+    status, flights = _get(service, '/flights', station='MAD', carrier='IB')
+    assert status == 200 and flights['total'] == 14 and flights['version'] == 2
+    # Un cambio de fecha sin cambio de contenido no crea otra versión
+    os.utime(tmp_path / "mad.csv", ns=(3_000_000_000, 3_000_000_000))
+    assert not service.source.refresh()
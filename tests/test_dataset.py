@@ -0,0 +1,77 @@
+"""Mantenimiento incremental del conjunto: índice de filtros y cubo frente a reconstruirlos."""
+import numpy as np
+import pandas as pd
+
+from dataset import FlightDataset
+from expansion import expand_flight_dates
+from filters import FILTER_COLUMNS, FilterIndex, apply_filters
+
+FILTERS = [
+    {'station': ['MAD']},
+    {'carrier': ['VY', 'UX'], 'flight_type': ['PAX']},
+    {'aircraft_type': ['E190']},  # Valor poco frecuente: lista de posiciones en lugar de mapa de bits
+    {'date': ['2025-01-07', '2025-02-03'], 'source_file': ['b.xlsx', 'c.xlsx']},
+    {'station': ['OPO'], 'carrier': ['IB']},
+]
+
+
+def _flights(name, seed, stations):
+    rng = np.random.default_rng(seed)
+    n = 40
+    from_dates = pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 45, n), 'D')
+    df = pd.DataFrame({
+        'A/D': rng.choice(['A', 'D'], n),
+        'fltno': [f"IB{i}" for i in rng.integers(100, 999, n)],
+        'departure_time': rng.integers(0, 24, n) * 100,
+        'arrival_time': rng.integers(0, 24, n) * 100,
+        'origin': 'MAD', 'dest': 'BCN',
+        'STATION': rng.choice(stations, n),
+        'weekday': rng.choice(['1234567', '135', '7'], n),
+        'from_date': from_dates.astype(object),
+        'until_date': (from_dates + pd.to_timedelta(rng.integers(0, 30, n), 'D')).astype(object),
+        'flight_type': rng.choice(['PAX', 'CARGO'], n, p=[0.8, 0.2]),
+        'actypeadv': rng.choice(['A320', 'B738'], n),
+        'carrier': rng.choice(['IB', 'VY', 'UX'], n)
+    })
+    # Un único vuelo con E190 por archivo
+    df.loc[0, ['actypeadv', 'weekday', 'until_date']] = ['E190', '1234567', from_dates[0]]
+    flights, _ = expand_flight_dates(df, name)
+    return flights
+
+
+def _check(dataset):
+    flights = dataset.flights
+    rebuilt = FilterIndex(flights)
+    for filters in FILTERS:
+        expected = flights.index.isin(apply_filters(flights, filters).index)
+        assert np.array_equal(dataset.index.mask(filters), expected)
+        assert np.array_equal(rebuilt.mask(filters), expected)
+        assert apply_filters(dataset.cube, filters)['count'].sum() == expected.sum()
+    for column in FILTER_COLUMNS:
+        assert dataset.index.options(column) == rebuilt.options(column)
+
+
+def test_sync_keeps_index_and_cube_consistent():
+    a = _flights('a.xlsx', 1, ['MAD', 'BCN'])
+    b = _flights('b.xlsx', 2, ['MAD'])
+    b2 = _flights('b.xlsx', 3, ['BCN', 'LIS'])
+    c = _flights('c.xlsx', 4, ['OPO'])
+    dataset = FlightDataset()
+
+    assert dataset.sync({'a.xlsx': ('a', a), 'b.xlsx': ('b', b)})
+    _check(dataset)
+    # Mismas claves: nada cambia
+    assert not dataset.sync({'a.xlsx': ('a', a), 'b.xlsx': ('b', b)})
+    # Otra versión de b y un archivo nuevo con una estación nueva
+    assert dataset.sync({'a.xlsx': ('a', a), 'b.xlsx': ('b2', b2), 'c.xlsx': ('c', c)})
+    _check(dataset)
+    # Quitar a
+    assert dataset.sync({'b.xlsx': ('b2', b2), 'c.xlsx': ('c', c)})
+    _check(dataset)
+    assert set(dataset.flights['source_file']) == {'b.xlsx', 'c.xlsx'}
+    assert len(dataset) == len(FlightDataset()._prepare(pd.concat([b2, c])))
+    # Quitarlos todos y volver a cargar
+    assert dataset.sync({})
+    assert len(dataset) == 0 and dataset.cube.empty
+    assert dataset.sync({'c.xlsx': ('c', c)})
+    _check(dataset)
@@ -0,0 +1,77 @@
+"""Comparación de versiones con máscaras semanales frente a la expansión a vuelo-día."""
+import numpy as np
+import pandas as pd
+
+from diff import KEY_COLUMNS, compare_rules
+from expansion import expand_rules, parse_rules
+
+TOTAL_COLUMNS = ['ops_before', 'ops_after', 'added', 'cancelled', 'changed']
+ATTRIBUTES = ['time', 'aircraft_type', 'origin', 'destination']
+
+
+def _schedule(rng, n):
+    from_dates = pd.Timestamp('2025-03-01') + pd.to_timedelta(rng.integers(0, 40, n), 'D')
+    return pd.DataFrame({
+        'A/D': rng.choice(['A', 'D'], n),
+        'fltno': [f"IB{i}" for i in rng.integers(1, 6, n)],
+        'departure_time': rng.choice([600, 915, 1830], n),
+        'arrival_time': rng.choice([700, 1015, 1930], n),
+        'origin': rng.choice(['MAD', 'BCN'], n),
+        'dest': rng.choice(['LIS', 'OPO'], n),
+        'STATION': rng.choice(['MAD', 'BCN'], n),
+        'weekday': rng.choice(['1234567', '135', '246', '7', '12345'], n),
+        'from_date': from_dates.astype(object),
+        'until_date': (from_dates + pd.to_timedelta(rng.integers(-2, 50, n), 'D')).astype(object),
+        'flight_type': 'PAX',
+        'actypeadv': rng.choice(['A320', 'B738'], n),
+        'carrier': 'IB'
+    })
+
+
+def _flight_days(rules):
+    flights = expand_rules(rules, None)
+    time = flights['arrival_time'].where(flights['type'] == 'A', flights['departure_time'])
+    flights = flights.assign(time=time.fillna(-1).astype(int))
+    for column in KEY_COLUMNS + ATTRIBUTES[1:]:
+        flights[column] = flights[column].astype(str)
+    return flights[KEY_COLUMNS + ['date'] + ATTRIBUTES]
+
+
+def _brute_force(old_rules, new_rules):
+    """Totales por operación contando días expandidos: un día cambia si ninguna combinación de
+    atributos opera en ambas versiones."""
+    days = pd.concat([_flight_days(old_rules).assign(version=0), _flight_days(new_rules).assign(version=1)])
+    per_day = days.groupby(KEY_COLUMNS + ['date'])
+    before = per_day['version'].agg(lambda v: (v == 0).any())
+    after = per_day['version'].agg(lambda v: (v == 1).any())
+    shared = days.groupby(KEY_COLUMNS + ['date'] + ATTRIBUTES)['version'].nunique().eq(2)
+    same = shared.groupby(level=KEY_COLUMNS + ['date']).any().reindex(before.index, fill_value=False)
+    totals = pd.DataFrame({
+        'ops_before': before,
+        'ops_after': after,
+        'added': after & ~before,
+        'cancelled': before & ~after,
+        'changed': before & after & ~same
+    }).astype(int).groupby(level=KEY_COLUMNS).sum()
+    return totals[totals[['added', 'cancelled', 'changed']].sum(axis=1) > 0]
+
+
+def test_operation_totals_match_expanded_flight_days():
+    rng = np.random.default_rng(11)
+    old = _schedule(rng, 60)
+    new = old.copy()
+    # Cambios de hora, avión, días y fechas, filas quitadas y filas nuevas
+    new.loc[0:9, 'departure_time'] = 2000
+    new.loc[0:9, 'arrival_time'] = 2100
+    new.loc[10:19, 'actypeadv'] = 'A321'
+    new.loc[20:29, 'weekday'] = '1357'
+    new.loc[30:39, 'until_date'] = pd.to_datetime(new.loc[30:39, 'until_date']) - pd.Timedelta(days=10)
+    new = pd.concat([new.drop(index=range(40, 45)), _schedule(rng, 10)], ignore_index=True)
+    old_rules, _ = parse_rules(old, 'v1.xlsx')
+    new_rules, _ = parse_rules(new, 'v2.xlsx')
+
+    operations = compare_rules(old_rules, new_rules).operations
+    result = operations.astype({column: str for column in KEY_COLUMNS}).set_index(KEY_COLUMNS)[TOTAL_COLUMNS]
+    expected = _brute_force(old_rules, new_rules)
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(result.sort_index(), expected.sort_index(), check_dtype=False)
@@ -0,0 +1,33 @@
+"""Modo de operaciones únicas: las copias se descartan después de filtrar."""
+import pandas as pd
+
+from dataset import FlightDataset
+from expansion import expand_flight_dates
+
+
+def _schedule(station, kind):
+    return pd.DataFrame({
+        'A/D': [kind], 'fltno': ['IB1'], 'departure_time': [900], 'arrival_time': [1000],
+        'origin': ['MAD'], 'dest': ['BCN'], 'STATION': [station], 'weekday': ['1234567'],
+        'from_date': ['2025-01-06'], 'until_date': ['2025-01-12'],
+        'flight_type': ['PAX'], 'actypeadv': ['A320'], 'carrier': ['IB']
+    })
+
+
+def test_unique_operations_deduplicate_after_filtering():
+    dataset = FlightDataset()
+    # La llegada a BCN se carga antes que la salida de MAD de la misma operación
+    for name, station, kind in [('bcn.xlsx', 'BCN', 'A'), ('mad.xlsx', 'MAD', 'D')]:
+        flights, _ = expand_flight_dates(_schedule(station, kind), name)
+        dataset.add(name, name, flights)
+
+    unique, cube = dataset.unique_operations()
+    assert unique.sum() == 7
+    assert cube['count'].sum() == 7
+
+    mask = dataset.index.mask({'station': ['MAD']})
+    unique, cube = dataset.unique_operations(mask)
+    assert unique.sum() == 7
+    assert (dataset.flights.loc[unique, 'station'] == 'MAD').all()
+    assert cube['count'].sum() == 7
+    assert set(cube['station']) == {'MAD'}
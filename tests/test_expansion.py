@@ -0,0 +1,112 @@
+"""Equivalencia del motor vectorizado con la expansión fila a fila del script original."""
+import calendar
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from expansion import START_DATE_2025, expand_flight_dates, time_to_minutes, to_display
+
+COMPARED_COLUMNS = [
+    'flight_number', 'date', 'day_name', 'departure_time', 'arrival_time', 'origin',
+    'destination', 'flight_type', 'station', 'type', 'aircraft_type', 'source_file', 'carrier'
+]
+
+
+def convert_time_format(time_str):
+    """convert_time_format del script original."""
+    if pd.isna(time_str):
+        return "N/A"
+    try:
+        time_str = str(int(time_str)).zfill(4)
+        return f"{time_str[:2]}:{time_str[2:]}"
+    except (ValueError, TypeError):
+        return "N/A"
+
+
+def baseline_expand(df, source_file):
+    """expand_flight_dates del script original, sin los avisos de Streamlit."""
+    all_flights = []
+    for _, row in df.iterrows():
+        try:
+            start_date = max(pd.to_datetime(row['from_date']), START_DATE_2025)
+            end_date = pd.to_datetime(row['until_date'])
+            weekdays = [int(d) for d in str(row['weekday']) if d.isdigit()]
+            date_range = pd.date_range(start_date, end_date, freq='D')
+            for date in [d for d in date_range if (d.weekday() + 1) in weekdays]:
+                all_flights.append({
+                    'flight_number': row['fltno'],
+                    'date': date,
+                    'day_name': calendar.day_name[date.weekday()],
+                    'departure_time': convert_time_format(row['departure_time']) if row['A/D'] == 'D' else 'N/A',
+                    'arrival_time': convert_time_format(row['arrival_time']) if row['A/D'] == 'A' else 'N/A',
+                    'origin': row['origin'],
+                    'destination': row['dest'],
+                    'flight_type': row['flight_type'],
+                    'station': row['STATION'],
+                    'type': row['A/D'],
+                    'aircraft_type': row.get('actypeadv', 'N/A'),
+                    'source_file': source_file,
+                    'carrier': row['carrier']
+                })
+        except (ValueError, TypeError):
+            continue
+    return pd.DataFrame(all_flights, columns=COMPARED_COLUMNS)
+
+
+def _as_text(df):
+    df = df[COMPARED_COLUMNS].astype(str)
+    return df.sort_values(COMPARED_COLUMNS).reset_index(drop=True)
+
+
+@pytest.fixture
+def schedule():
+    rng = np.random.default_rng(7)
+    n = 200
+    from_dates = pd.Timestamp('2024-12-01') + pd.to_timedelta(rng.integers(0, 120, n), 'D')
+    df = pd.DataFrame({
+        'A/D': rng.choice(['A', 'D'], n),
+        'fltno': [f"IB{i}" for i in rng.integers(100, 999, n)],
+        'departure_time': rng.choice([0, 5, 630, 1159, 2359, 2400, np.nan], n),
+        'arrival_time': rng.choice([15, 745, 1200, 1830, 2400, np.nan], n),
+        'origin': rng.choice(['MAD', 'BCN', 'LIS'], n),
+        'dest': rng.choice(['MAD', 'BCN', 'LIS'], n),
+        'STATION': rng.choice(['MAD', 'BCN'], n),
+        'weekday': rng.choice(['1234567', '135', '7', '246', 12, np.nan], n).astype(object),
+        'from_date': from_dates.astype(object),
+        'until_date': (from_dates + pd.to_timedelta(rng.integers(-3, 60, n), 'D')).astype(object),
+        'flight_type': rng.choice(['PAX', 'CARGO'], n),
+        'actypeadv': rng.choice(['A320', 'B738'], n),
+        'carrier': rng.choice(['IB', 'VY'], n)
+    })
+    # Fechas no válidas o vacías y días de la semana vacíos
+    df.loc[3, 'from_date'] = 'no es una fecha'
+    df.loc[4, 'until_date'] = np.nan
+    df.loc[5, 'from_date'] = np.nan
+    df.loc[6, 'weekday'] = np.nan
+    return df
+
+
+def test_expansion_matches_baseline(schedule):
+    flights, errors = expand_flight_dates(schedule, 'horario.xlsx')
+    expected = baseline_expand(schedule, 'horario.xlsx')
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(_as_text(to_display(flights)), _as_text(expected))
+    assert sorted(errors['row']) == [3, 4, 5]
+
+
+def test_invalid_clock_times_are_not_available():
+    assert time_to_minutes(1275) is None
+    assert time_to_minutes(2530) is None
+    assert time_to_minutes(2400) == 24 * 60
+    assert time_to_minutes(5) == 5
+    df = pd.DataFrame({
+        'A/D': ['A', 'D'], 'fltno': ['IB1', 'IB2'], 'departure_time': [0, 2530], 'arrival_time': [1275, 0],
+        'origin': ['MAD', 'MAD'], 'dest': ['BCN', 'BCN'], 'STATION': ['MAD', 'MAD'], 'weekday': ['1', '1'],
+        'from_date': ['2025-01-06', '2025-01-06'], 'until_date': ['2025-01-06', '2025-01-06'],
+        'flight_type': ['PAX', 'PAX'], 'actypeadv': ['A320', 'A320'], 'carrier': ['IB', 'IB']
+    })
+    flights, _ = expand_flight_dates(df, 'horario.xlsx')
+    shown = to_display(flights)
+    assert list(shown['arrival_time']) == ['N/A', 'N/A']
+    assert list(shown['departure_time']) == ['N/A', 'N/A']
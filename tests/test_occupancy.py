@@ -0,0 +1,50 @@
+"""Ocupación en tierra de días construidos a mano."""
+import pandas as pd
+
+from expansion import expand_flight_dates
+from occupancy import daily_occupancy
+
+
+def _day(rows):
+    """Vuelos de IB el lunes 2025-01-06: (estación, tipo, vuelo, hora HHMM)."""
+    df = pd.DataFrame(rows, columns=['STATION', 'A/D', 'fltno', 'time'])
+    df = df.assign(
+        departure_time=df['time'], arrival_time=df['time'], origin='BCN', dest='MAD', weekday='1',
+        from_date='2025-01-06', until_date='2025-01-06', flight_type='PAX', actypeadv='A320', carrier='IB'
+    )
+    flights, _ = expand_flight_dates(df.drop(columns='time'), 'horario.xlsx')
+    return flights
+
+
+FLIGHTS = [
+    ['MAD', 'D', 'IB200', 700],   # Salida sin llegada previa: estaba en tierra desde las 00:00
+    ['MAD', 'A', 'IB100', 800],
+    ['MAD', 'A', 'IB400', 900],
+    ['MAD', 'D', 'IB101', 1000],  # Misma rotación que IB100
+    ['MAD', 'D', 'IB401', 1100],
+    ['MAD', 'A', 'IB300', 2200],  # Llegada sin salida posterior: pasa la noche en tierra
+    ['BCN', 'A', 'IB500', 1200],
+    ['BCN', 'D', 'IB501', 1300],
+]
+
+
+def test_daily_occupancy_of_a_hand_built_day():
+    occupancy = daily_occupancy(_day(FLIGHTS), capacity={'MAD': 1, 'BCN': 0}).set_index('station')
+    mad = occupancy.loc['MAD']
+    # Niveles: 1 hasta 07:00, 0, 1 desde 08:00, 2 de 09:00 a 10:00, 1 hasta 11:00, 0, 1 desde 22:00
+    assert (mad['arrivals'], mad['departures'], mad['based'], mad['overnight']) == (3, 3, 1, 1)
+    assert (mad['peak'], mad['peak_time']) == (2, '09:00')
+    # 720 minutos con 0, 660 con 1 y 60 con 2
+    assert (mad['p50'], mad['p90'], mad['p95']) == (0, 1, 1)
+    assert mad['minutes_above_capacity'] == 60
+
+    bcn = occupancy.loc['BCN']
+    assert (bcn['based'], bcn['overnight'], bcn['peak'], bcn['peak_time']) == (0, 0, 1, '12:00')
+    assert bcn['minutes_above_capacity'] == 60
+
+
+def test_common_capacity_and_no_capacity():
+    flights = _day(FLIGHTS)
+    above = daily_occupancy(flights, capacity=1).set_index('station')['minutes_above_capacity']
+    assert above.to_dict() == {'BCN': 0, 'MAD': 60}
+    assert (daily_occupancy(flights)['minutes_above_capacity'] == 0).all()
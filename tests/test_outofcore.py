@@ -0,0 +1,49 @@
+"""Páginas del almacén en el mismo orden de fecha que la vista de detalle en memoria."""
+import numpy as np
+import pandas as pd
+
+from expansion import expand_flight_dates
+from outofcore import StoreQuery
+from store import build_store
+
+COLUMNS = ['flight_number', 'date', 'station', 'type', 'arrival_time', 'departure_time']
+
+
+def _flights(station, seed):
+    rng = np.random.default_rng(seed)
+    n = 60
+    from_dates = pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 90, n), 'D')
+    df = pd.DataFrame({
+        'A/D': rng.choice(['A', 'D'], n),
+        'fltno': [f"IB{i}" for i in range(n)],
+        'departure_time': rng.integers(0, 24, n) * 100,
+        'arrival_time': rng.integers(0, 24, n) * 100,
+        'origin': 'MAD', 'dest': 'BCN', 'STATION': station,
+        'weekday': rng.choice(['1234567', '135', '7'], n),
+        'from_date': from_dates.astype(object),
+        'until_date': (from_dates + pd.to_timedelta(rng.integers(0, 40, n), 'D')).astype(object),
+        'flight_type': 'PAX', 'actypeadv': 'A320', 'carrier': 'IB'
+    })
+    flights, _ = expand_flight_dates(df, f"{station.lower()}.xlsx")
+    return flights
+
+
+def _as_text(df):
+    return df[COLUMNS].astype(str).reset_index(drop=True)
+
+
+def test_page_follows_date_order(tmp_path):
+    frames = [_flights('MAD', 1), _flights('BCN', 2)]
+    build_store(iter(frames), tmp_path / "store")
+    query = StoreQuery(tmp_path / "store", memory_budget_mb=1)
+    # Orden de la vista en memoria: por fecha y, a igual fecha, por estación
+    flights = pd.concat(frames).sort_values(['station', 'date'], kind='stable')
+    expected = flights.sort_values('date', kind='stable')
+    assert query.count() == len(expected)
+    for offset, limit in [(0, 50), (len(expected) // 3, 700), (len(expected) - 5, 50)]:
+        page = query.page(offset, limit, COLUMNS)
+        pd.testing.assert_frame_equal(_as_text(page), _as_text(expected.iloc[offset:offset + limit]))
+
+    departures = expected[expected['type'] == 'D']
+    page = query.page(10, 300, COLUMNS, {'type': ['D']})
+    pd.testing.assert_frame_equal(_as_text(page), _as_text(departures.iloc[10:310]))
@@ -0,0 +1,41 @@
+"""Registros JSON de las etapas de una ejecución."""
+import io
+import json
+import tracemalloc
+
+from profiling import StageProfiler, configure_logging, logger
+
+
+def test_stage_records_reach_the_configured_handler():
+    stream = io.StringIO()
+    configure_logging("INFO", stream)
+    handler = logger.handlers[0]
+    handler.setStream(stream)
+    profiler = StageProfiler()
+    profiler.mark("filtros")
+    profiler.mark("tabla semanal")
+    table = profiler.finish()
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line['stage'] for line in lines] == ["filtros", "tabla semanal"]
+    assert list(table['stage']) == ["filtros", "tabla semanal"]
+    # Llamarla de nuevo no duplica el manejador
+    configure_logging("INFO")
+    assert len(logger.handlers) == 1
+
+
+def test_interrupted_debug_run_does_not_leave_tracing_on():
+    # Una ejecución de depuración que no llega a finish() (st.rerun a mitad de la ejecución)
+    StageProfiler(trace_memory=True).mark("lectura y expansión")
+    assert tracemalloc.is_tracing()
+    StageProfiler().finish()
+    assert not tracemalloc.is_tracing()
+
+
+def test_tracing_started_elsewhere_is_left_on():
+    tracemalloc.start()
+    try:
+        StageProfiler(trace_memory=True).finish()
+        StageProfiler().finish()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,68 @@
+"""Conjuntos compartidos entre sesiones: recuento de referencias, reutilización y liberación."""
+import gc
+
+import pandas as pd
+
+from expansion import expand_flight_dates
+from registry import DatasetRegistry, dataset_key
+
+
+def _files(*names):
+    files = {}
+    for name in names:
+        df = pd.DataFrame({
+            'A/D': ['A'], 'fltno': ['IB1'], 'departure_time': [900], 'arrival_time': [1000],
+            'origin': ['BCN'], 'dest': ['MAD'], 'STATION': ['MAD'], 'weekday': ['1234567'],
+            'from_date': ['2025-01-06'], 'until_date': ['2025-01-12'],
+            'flight_type': ['PAX'], 'actypeadv': ['A320'], 'carrier': ['IB']
+        })
+        flights, _ = expand_flight_dates(df, name)
+        files[name] = (f"hash-{name}", flights)
+    return files
+
+
+def test_sessions_share_split_and_release_datasets():
+    registry = DatasetRegistry()
+    a, ab = _files('a.xlsx'), _files('a.xlsx', 'b.xlsx')
+
+    # Dos sesiones con los mismos archivos comparten el conjunto
+    first = registry.acquire(a)
+    second = registry.acquire(a)
+    assert first.dataset is second.dataset
+    assert registry.references(dataset_key(a)) == 2
+
+    # Una sesión cambia de archivos: el conjunto compartido no se toca y se crea otro
+    second = registry.acquire(ab, second)
+    assert second.dataset is not first.dataset
+    assert len(first.dataset) == 7 and len(second.dataset) == 14
+    assert registry.references(dataset_key(a)) == 1
+    assert registry.references(dataset_key(ab)) == 1
+
+    # La otra sesión pasa a los mismos archivos: vuelven a compartir y el conjunto anterior se libera
+    first = registry.acquire(ab, first)
+    assert first.dataset is second.dataset
+    assert registry.references(dataset_key(ab)) == 2
+    assert len(registry) == 1
+
+    # Sesiones terminadas sin release(): sus handles se recolectan
+    del first, second
+    gc.collect()
+    assert len(registry) == 0
+
+
+def test_single_session_updates_its_dataset_in_place():
+    registry = DatasetRegistry()
+    a, ab = _files('a.xlsx'), _files('a.xlsx', 'b.xlsx')
+    handle = registry.acquire(a)
+    dataset = handle.dataset
+    handle = registry.acquire(ab, handle)
+    assert handle.dataset is dataset
+    assert len(dataset) == 14
+    assert registry.references(dataset_key(a)) == 0
+    assert registry.references(dataset_key(ab)) == 1
+    # Los mismos archivos devuelven el mismo handle
+    assert registry.acquire(ab, handle) is handle
+
+    handle.release()
+    handle.release()  # Sólo la primera llamada tiene efecto
+    assert len(registry) == 0
@@ -0,0 +1,51 @@
+"""Conteos por día de las reglas sin expandir frente a los vuelos expandidos."""
+import pandas as pd
+
+from expansion import expand_rules, parse_rules
+from rules import RuleSet
+
+
+def _schedule(rows):
+    columns = ['A/D', 'weekday', 'from_date', 'until_date']
+    df = pd.DataFrame(rows, columns=columns)
+    return df.assign(
+        fltno='IB1', departure_time=900, arrival_time=1000, origin='MAD', dest='BCN', STATION='MAD',
+        flight_type='PAX', actypeadv='A320', carrier='IB'
+    )
+
+
+def test_daily_counts_match_expanded_flights():
+    rules, _ = parse_rules(_schedule([
+        ['A', '1234567', '2025-01-01', '2025-01-20'],
+        ['D', '135', '2025-01-05', '2025-02-10'],
+        # Fin antes del inicio: la regla no opera ningún día
+        ['A', '1234567', '2025-03-10', '2025-03-01'],
+        ['D', '7', '2025-02-01', '2025-01-15'],
+    ]), 'horario.xlsx')
+    rule_set = RuleSet([rules])
+    counts = rule_set.daily_counts()
+    assert (counts['count'] >= 0).all()
+
+    first, last = rule_set.date_range()
+    flights = rule_set.flights(first, last + pd.Timedelta(days=1))
+    expected = flights.groupby(['date', 'type'], observed=True).size()
+    counts = counts.set_index(['date', 'type'])['count']
+    assert counts.sum() == len(flights)
+    assert (counts.reindex(expected.index) == expected).all()
+
+
+def test_window_flights_match_full_expansion_in_file_order():
+    rules, _ = parse_rules(_schedule([
+        ['A', '1234567', '2025-02-20', '2025-04-10'],
+        ['D', '135', '2025-01-05', '2025-03-02'],
+        ['A', '246', '2025-03-15', '2025-03-20'],
+        ['D', '7', '2025-05-01', '2025-06-01'],
+    ]), 'horario.xlsx')
+    rule_set = RuleSet([rules])
+    start, end = pd.Timestamp('2025-03-01'), pd.Timestamp('2025-04-01')
+    assert list(rule_set.overlapping(start, end)) == [0, 1, 2]
+
+    window = rule_set.flights(start, end).reset_index(drop=True)
+    everything = expand_rules(rules, None)
+    expected = everything[(everything['date'] >= start) & (everything['date'] < end)].reset_index(drop=True)
+    pd.testing.assert_frame_equal(window.astype(str), expected.astype(str))
@@ -0,0 +1,39 @@
+"""Escritura del almacén: sólo se reemplazan las particiones (estación, mes) escritas."""
+import pandas as pd
+
+from expansion import expand_flight_dates
+from store import build_store, read_store, write_store
+
+
+def _flights(station, start, end, name, flights=('IB1',)):
+    df = pd.DataFrame({
+        'A/D': 'A', 'fltno': list(flights), 'departure_time': 900, 'arrival_time': 1015,
+        'origin': 'BCN', 'dest': station, 'STATION': station, 'weekday': '1234567',
+        'from_date': start, 'until_date': end, 'flight_type': 'PAX', 'actypeadv': 'A320', 'carrier': 'IB'
+    })
+    flights, _ = expand_flight_dates(df, name)
+    return flights
+
+
+def _counts(path):
+    df = read_store(path)
+    return df.groupby(['station', df['date'].dt.strftime('%Y-%m')], observed=True).size().to_dict()
+
+
+def test_build_store_replaces_only_the_written_partitions(tmp_path):
+    path = tmp_path / "store"
+    write_store(pd.concat([
+        _flights('MAD', '2025-01-01', '2025-02-28', 'mad.xlsx'),
+        _flights('LIS', '2025-01-01', '2025-01-31', 'lis.xlsx')
+    ]), path)
+
+    # Dos tandas en la misma partición (MAD, enero) y otra en una partición nueva
+    written = build_store(iter([
+        _flights('MAD', '2025-01-01', '2025-01-10', 'mad.xlsx'),
+        _flights('MAD', '2025-01-20', '2025-01-21', 'mad2.xlsx'),
+        _flights('BCN', '2025-01-01', '2025-01-31', 'bcn.xlsx')
+    ]), path)
+    assert written == 10 + 2 + 31
+    assert _counts(path) == {
+        ('MAD', '2025-01'): 12, ('MAD', '2025-02'): 28, ('LIS', '2025-01'): 31, ('BCN', '2025-01'): 31
+    }